@@ -1,74 +1,118 @@
+from __future__ import annotations
+
 from typing import Optional
+import hashlib
+import json
 import re
 import os
 from datetime import datetime
 import streamlit as st
 import polars as pl
 import hrelectviz.hrelection as hre
+import hrelectviz.tracing as tracing
+from hrelectviz.districtsgeodata import DistrictsGeoData
 from hrelectviz.gerrymeter import shorten_column_name, gm_column_names
+from hrelectviz.lazyimport import lazy_import
+from hrelectviz.multiyear import MultiYearHrElection
 from scripts.gerrymander_metrics_plotly import (
-    get_gerrymander_metrics, get_districts_geodata, get_plot_df_for_metric,
-    make_plotly_representation_of_metric
+    apply_metric, get_districts_geodata, get_plot_df_for_metric,
+    make_base_figure,
 )
 
+# plotly, like pyproj, shapely and pyshp behind DistrictsGeoData, is
+# loaded when the first map is built, after the sidebar has rendered.
+go = lazy_import('plotly.graph_objects')
+
+STATE_SHP_PATH = './map-data-census/tl_2024_us_state.shp'
+# Served by Streamlit at app/static/ when server.enableStaticServing is set
+# (see .streamlit/config.toml).
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+
 os.environ['LANG'] = 'en_US.UTF-8'
 os.environ['LC_ALL'] = 'en_US.UTF-8'
 
 
+@st.cache_resource
+def load_all_years() -> MultiYearHrElection:
+    multi_year = MultiYearHrElection()
+    multi_year.get_gerrymander_metrics()
+    return multi_year
+
+
 @st.cache_data
-def load_data(columns: Optional[list[str]] = None) -> pl.DataFrame:
-    metric_df = get_gerrymander_metrics()
+def load_data(
+    year: int, columns: Optional[list[str]] = None
+) -> pl.DataFrame:
+    metric_df = load_all_years().get_gerrymander_metrics_for_year(year)
     if columns:
         metric_df = metric_df.select(columns)
     return metric_df
 
 
-if __name__ == '__main__':
-    st.markdown('''
-        <style>
-            .block-container {
-                 padding-top: 2rem; padding-bottom: 0rem;
-                 padding-left: 0rem; padding-right: 0rem;
-                 text-align: center
-            }
-            .stDataFrame thead th {
-                white-space: pre-line !important;
-            }  
-        </style>
-    ''',
-        unsafe_allow_html=True,
+@st.cache_resource
+def load_geodata() -> DistrictsGeoData:
+    return get_districts_geodata(STATE_SHP_PATH, 'epsg:4269')
+
+
+@st.cache_resource
+def load_geojson() -> dict | str:
+    # The processed geometry is written once to the static folder, and
+    # figures refer to it by URL: plotly.js fetches it once and the browser
+    # caches it, so a rerun sends only the metric values. Without static
+    # serving the GeoJSON is embedded in the figure.
+    geojson_data = load_geodata().geojson_data
+    if not st.get_option('server.enableStaticServing'):
+        return geojson_data
+    text = json.dumps(geojson_data, separators=(',', ':'))
+    fname = f'states-{hashlib.sha256(text.encode()).hexdigest()[:16]}.geojson'
+    path = os.path.join(STATIC_DIR, fname)
+    if not os.path.exists(path):
+        os.makedirs(STATIC_DIR, exist_ok=True)
+        with open(f'{path}.tmp', 'w') as fh:
+            fh.write(text)
+        os.replace(f'{path}.tmp', path)
+    return f'app/static/{fname}'
+
+
+@st.cache_resource
+def load_base_figure() -> go.Figure:
+    return make_base_figure(load_geojson())
+
+
+@st.cache_resource(max_entries=64)
+def load_metric_figure(year: int, metric_code: str, party: str) -> go.Figure:
+    plot_df = get_plot_df_for_metric(load_data(year), metric_code, party)
+    return apply_metric(
+        go.Figure(load_base_figure()), plot_df, metric_code, party, year
     )
 
-    st.set_page_config(layout='wide')
-    with st.sidebar:
-        year = st.number_input('Election year:',
-            value=hre.get_most_recent_house_election_year()
-        )
-        if year % 2 == 1 or year < 2010 or year > datetime.now().year:
-            st.error('Please enter an even-numbered past year')
-            st.stop()
+
+@st.fragment
+def metric_view(year: int) -> None:
+    # Changing the metric or party reruns only this fragment.
+    radio_col1, radio_col2 = st.columns(2)
+    with radio_col1:
         metric_name = st.radio(
             'Choose metric to map:',
             options=[
                 'partisan skew', 'efficiency gap', 'mean-median difference',
             ],
-            index=0
+            index=0,
+            horizontal=True,
         )
-        metric_code = re.sub('[- ]', '_', metric_name)
+    metric_code = re.sub('[- ]', '_', metric_name)
+    with radio_col2:
         party = st.radio(
             'Major Party',
             options=['Democrat', 'Republican'],
-            index=0
+            index=0,
+            horizontal=True,
         )
     st.html(f'<h3>Gerrymandering: {year} U.S. House Elections<br>'
             f'<h3>Lower 48 map of {metric_name} metric</h3>')
     col1, col2 = st.columns(2)
-    metric_df = load_data()
-    plot_df = get_plot_df_for_metric(metric_df, metric_code, party)
-    gd = get_districts_geodata(
-        './map-data-census/tl_2024_us_state.shp', 'epsg:4269')
-    fig = make_plotly_representation_of_metric(
-        plot_df, gd, metric_code, party, year)
+    metric_df = load_data(year)
+    fig = load_metric_figure(year, metric_code, party)
 
     with col1:
         colnames = gm_column_names[metric_code]
@@ -80,4 +124,39 @@ if __name__ == '__main__':
             column_config=col_config,
         )
     with col2:
-        st.plotly_chart(fig)
\ No newline at end of file
+        st.plotly_chart(fig, key='metric_map')
+
+    # The Streamlit server runs until killed, so with HRELECTVIZ_TRACE set
+    # the trace so far is rewritten after every rerun.
+    if (tracer := tracing.get_tracer()) is not None:
+        tracer.write_chrome_trace(tracing.trace_path())
+
+
+if __name__ == '__main__':
+    st.markdown('''
+        <style>
+            .block-container {
+                 padding-top: 2rem; padding-bottom: 0rem;
+                 padding-left: 0rem; padding-right: 0rem;
+                 text-align: center
+            }
+            .stDataFrame thead th {
+                white-space: pre-line !important;
+            }  
+        </style>
+    ''',
+        unsafe_allow_html=True,
+    )
+
+    st.set_page_config(layout='wide')
+    with st.sidebar:
+        year = st.number_input('Election year:',
+            value=hre.get_most_recent_house_election_year()
+        )
+        if year % 2 == 1 or year < 2010 or year > datetime.now().year:
+            st.error('Please enter an even-numbered past year')
+            st.stop()
+        if year not in load_all_years().years:
+            st.error(f'No election data for {year}')
+            st.stop()
+    metric_view(year)
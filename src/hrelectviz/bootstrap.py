@@ -0,0 +1,123 @@
+import warnings
+from typing import NamedTuple
+
+import numpy as np
+import polars as pl
+
+# Bootstrap confidence intervals for the efficiency gap and the
+# mean-median difference of each state. All replicates of all states are
+# drawn as one (nreplicates, ndistricts) array, with the districts
+# grouped by state, so that a state's replicate values are reductions
+# over a contiguous column segment (np.add.reduceat), and medians are
+# read off one row-wise sort. Replicates are either
+#   'resample': the state's districts drawn with replacement, or
+#   'swing':    every district's Democratic two-party share shifted by
+#               independent normal noise of sd sigma, turnout unchanged.
+
+
+class Bootstrap(NamedTuple):
+    replicates: int = 2000
+    method: str = 'resample'
+    sigma: float = 0.05
+    level: float = 0.95
+    seed: int | None = None
+
+
+class Replicates(NamedTuple):
+    states: list[str]
+    starts: np.ndarray   # (nstates,) first column of each state
+    dem: np.ndarray      # (nreplicates, ndistricts) Democratic vote
+    rep: np.ndarray      # (nreplicates, ndistricts) Republican vote
+
+
+def draw_replicates(aggregate_vote_by_district: pl.DataFrame,
+                    bootstrap: Bootstrap) -> Replicates:
+    df = aggregate_vote_by_district.sort('State\nAbbr')
+    states, starts, counts = np.unique(
+        df['State\nAbbr'].to_numpy(), return_index=True, return_counts=True
+    )
+    dem = df['District Vote\nDemocrat'].to_numpy().astype(np.float64)
+    rep = df['District Vote\nRepublican'].to_numpy().astype(np.float64)
+    rng = np.random.default_rng(bootstrap.seed)
+    shape = (bootstrap.replicates, len(df))
+    match bootstrap.method:
+        case 'resample':
+            # Column j of state s draws from the n_s districts of s.
+            state_ix = np.repeat(np.arange(len(states)), counts)
+            picks = (
+                starts[state_ix]
+                + (rng.random(shape) * counts[state_ix]).astype(np.int64)
+            )
+            return Replicates(states.tolist(), starts, dem[picks], rep[picks])
+        case 'swing':
+            major = dem + rep
+            with np.errstate(divide='ignore', invalid='ignore'):
+                share = np.where(major > 0, dem / major, 0.0)
+            noise = rng.normal(0.0, bootstrap.sigma, shape)
+            new_dem = np.round(np.clip(share + noise, 0.0, 1.0) * major)
+            return Replicates(states.tolist(), starts, new_dem,
+                              major - new_dem)
+        case _:
+            raise ValueError(f'Unknown bootstrap method {bootstrap.method}')
+
+
+def efficiency_gaps(reps: Replicates) -> np.ndarray:
+    # (nreplicates, nstates) Democrat-leaning efficiency gap, as in
+    # gerrymeter.efficiency_gap_f.
+    major = reps.dem + reps.rep
+    needed = np.floor((major + 1.0) / 2.0)
+    wasted_dem = np.where(reps.dem >= needed, reps.dem - needed, reps.dem)
+    wasted_rep = np.where(reps.rep >= needed, reps.rep - needed, reps.rep)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (
+            np.add.reduceat(wasted_rep - wasted_dem, reps.starts, axis=1)
+            / np.add.reduceat(major, reps.starts, axis=1)
+        )
+
+
+def mean_median_differences(reps: Replicates,
+                            votes: np.ndarray) -> np.ndarray:
+    # (nreplicates, nstates) mean minus median of votes per district, as
+    # in gerrymeter.mean_median_difference_f. Offsetting each state's
+    # votes past the largest vote of the previous state makes a row sort
+    # keep the states' segments in place.
+    ncols = votes.shape[1]
+    counts = np.diff(np.append(reps.starts, ncols))
+    state_ix = np.repeat(np.arange(len(counts)), counts)
+    offset = state_ix * (votes.max() + 1.0)
+    ordered = np.sort(votes + offset, axis=1) - offset
+    median = (
+        ordered[:, reps.starts + (counts - 1) // 2]
+        + ordered[:, reps.starts + counts // 2]
+    ) / 2.0
+    mean = np.add.reduceat(votes, reps.starts, axis=1) / counts
+    return mean - median
+
+
+def bootstrap_intervals_f(aggregate_vote_by_district: pl.DataFrame,
+                          bootstrap: Bootstrap = Bootstrap()
+                          ) -> pl.DataFrame:
+    # Per state, the low and high ends of the central bootstrap.level
+    # interval of each efficiency gap and mean-median difference column,
+    # named after the column with '\nCI low' and '\nCI high' appended.
+    reps = draw_replicates(aggregate_vote_by_district, bootstrap)
+    eg = efficiency_gaps(reps)
+    values = {
+        'Democrat-leaning\nefficiency gap': (eg, 2),
+        'Republican-leaning\nefficiency gap': (-eg, 2),
+        'Mean-median difference\n(+ favors Republicans)':
+            (mean_median_differences(reps, reps.dem), 1),
+        'Mean-median difference\n(+ favors Democrats)':
+            (mean_median_differences(reps, reps.rep), 1),
+    }
+    tail = (1.0 - bootstrap.level) / 2.0
+    columns: dict[str, object] = {'State\nAbbr': reps.states}
+    for name, (replicate_values, places) in values.items():
+        with warnings.catch_warnings():
+            # e.g. Puerto Rico, without major-party votes: all-NaN.
+            warnings.simplefilter('ignore', RuntimeWarning)
+            low, high = np.nanquantile(replicate_values,
+                                       [tail, 1.0 - tail], axis=0)
+        columns[f'{name}\nCI low'] = low.round(places)
+        columns[f'{name}\nCI high'] = high.round(places)
+    return pl.DataFrame(columns).fill_nan(None)
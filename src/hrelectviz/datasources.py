@@ -1,17 +1,37 @@
+import hashlib
+import json
 import os
+import shutil
+import sys
+import tempfile
+import threading
 import zipfile as zf
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
 
 import requests
 
+from hrelectviz.geocache import DEFAULT_CACHE_DIR
 
-def us_house_election_stats_url(year: str) -> str:
-    house_clerk_root = 'https://clerk.house.gov/member_info/electionInfo'
-    return f'{house_clerk_root}/{year}/statistics{year}.pdf'
+HOUSE_CLERK_ROOT = 'https://clerk.house.gov/member_info/electionInfo'
+TIGER_ROOT = 'https://www2.census.gov/geo/tiger'
+MIRROR_DIR = os.path.join(DEFAULT_CACHE_DIR, 'mirror')
 
 
-def us_census_states_shp_url(year: str) -> str:
-    tiger_root = 'https://www2.census.gov/geo/tiger'
-    return f'{tiger_root}/TIGER{year}/STATE/tl_{year}_us_state.zip'
+def us_house_election_stats_url(year: str, root: str = HOUSE_CLERK_ROOT
+                                ) -> str:
+    return f'{root}/{year}/statistics{year}.pdf'
+
+
+def us_census_states_shp_url(year: str, root: str = TIGER_ROOT) -> str:
+    return f'{root}/TIGER{year}/STATE/tl_{year}_us_state.zip'
+
+
+def us_census_cd_shp_url(year: str, root: str = TIGER_ROOT) -> str:
+    # TIGER<year> carries the districts of the Congress elected that year.
+    congress = (int(year) - 1786) // 2
+    return f'{root}/TIGER{year}/CD/tl_{year}_us_cd{congress}.zip'
 
 
 def download(url: str, dest_path: str) -> None:
@@ -21,25 +41,208 @@ def download(url: str, dest_path: str) -> None:
         exit(1)
 
 
+class Artifact(NamedTuple):
+    url: str
+    dest_dir: str
+    unzip: bool = False
+
+
+def artifacts_for_year(year: str, dest_dir: str,
+                       clerk_root: str = HOUSE_CLERK_ROOT,
+                       tiger_root: str = TIGER_ROOT) -> list[Artifact]:
+    return [
+        Artifact(us_house_election_stats_url(year, clerk_root), dest_dir),
+        Artifact(us_census_states_shp_url(year, tiger_root), dest_dir, True),
+        Artifact(us_census_cd_shp_url(year, tiger_root), dest_dir, True),
+    ]
+
+
+def filename_from_response(url: str, response: requests.Response) -> str:
+    # Extract filename from URL or Content-Disposition header if available
+    # Example: attachment; filename="example.pdf"
+    filename = os.path.basename(url)
+    cd = response.headers.get('Content-Disposition', '')
+    if 'filename=' in cd:
+        filename = cd.split('filename=')[1].strip('"')
+    return filename
+
+
+def file_sha256(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        while chunk := fh.read(1 << 20):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def member_is_intact(info: zf.ZipInfo, dest_dir: str) -> bool:
+    path = os.path.join(dest_dir, info.filename)
+    if info.is_dir():
+        return os.path.isdir(path)
+    if not os.path.isfile(path) or os.path.getsize(path) != info.file_size:
+        return False
+    crc = 0
+    with open(path, 'rb') as fh:
+        while chunk := fh.read(1 << 20):
+            crc = zlib.crc32(chunk, crc)
+    return crc == info.CRC
+
+
+def write_json_atomically(path: str, obj: dict) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as fh:
+        json.dump(obj, fh)
+    os.replace(tmp_path, path)
+
+
+class DownloadManager:
+    # Downloads are kept in a content-addressed mirror:
+    #   blobs/<sha256[:2]>/<sha256>  downloaded bodies
+    #   urls/<sha256(url)>.json      ETag, Last-Modified, blob digest
+    #   partial/<sha256(url)>.part   interrupted downloads
+    # A URL already in the mirror is revalidated with If-None-Match /
+    # If-Modified-Since, and an interrupted download resumes with a Range
+    # request. Files in dest_dir are copies of blobs, not links, so that
+    # changing them (or extracting over them) cannot corrupt the mirror.
+
+    def __init__(self, mirror_dir: str = MIRROR_DIR, max_workers: int = 8,
+                 chunk_size: int = 1 << 16, timeout: float = 60.0):
+        self.mirror_dir = mirror_dir
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self._local = threading.local()
+        for subdir in ['blobs', 'urls', 'partial']:
+            os.makedirs(os.path.join(mirror_dir, subdir), exist_ok=True)
+
+    @property
+    def session(self) -> requests.Session:
+        if not hasattr(self._local, 'session'):
+            self._local.session = requests.Session()
+        return self._local.session
+
+    def _url_paths(self, url: str) -> tuple[str, str]:
+        url_key = hashlib.sha256(url.encode()).hexdigest()
+        return (
+            os.path.join(self.mirror_dir, 'urls', f'{url_key}.json'),
+            os.path.join(self.mirror_dir, 'partial', f'{url_key}.part'),
+        )
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self.mirror_dir, 'blobs', digest[:2], digest)
+
+    def fetch(self, url: str) -> dict:
+        # Returns the mirror metadata of url: its blob digest, size,
+        # filename and validators, downloading the body if it changed.
+        meta_path, part_path = self._url_paths(url)
+        meta: dict = {}
+        if os.path.exists(meta_path):
+            with open(meta_path) as fh:
+                meta = json.load(fh)
+
+        headers: dict[str, str] = {}
+        if 'sha256' in meta and os.path.exists(self.blob_path(meta['sha256'])):
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+            if meta.get('part_etag'):
+                headers['If-Range'] = meta['part_etag']
+
+        with self.session.get(url, headers=headers, stream=True,
+                              timeout=self.timeout) as response:
+            if response.status_code == requests.codes.not_modified:
+                return meta
+            if response.status_code == 416:  # stale partial download
+                os.unlink(part_path)
+                return self.fetch(url)
+            response.raise_for_status()
+
+            validators = {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+            }
+            if response.status_code != requests.codes.partial_content:
+                offset = 0
+            # Remember the validator of the partial body so that a resumed
+            # request only appends to it if the resource is unchanged.
+            write_json_atomically(
+                meta_path, {**meta, 'part_etag': validators['etag']}
+            )
+            with open(part_path, 'ab' if offset else 'wb') as fh:
+                for chunk in response.iter_content(self.chunk_size):
+                    fh.write(chunk)
+            filename = filename_from_response(url, response)
+
+        digest = file_sha256(part_path)
+        blob = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        os.replace(part_path, blob)
+        meta = {
+            **validators, 'sha256': digest, 'size': os.path.getsize(blob),
+            'filename': filename, 'url': url,
+        }
+        write_json_atomically(meta_path, meta)
+        return meta
+
+    def download(self, url: str, dest_dir: str) -> tuple[str, str]:
+        # Returns the path of the downloaded file in dest_dir and its
+        # sha256 digest.
+        meta = self.fetch(url)
+        blob = self.blob_path(meta['sha256'])
+        full_path = os.path.join(dest_dir, meta['filename'])
+        os.makedirs(dest_dir, exist_ok=True)
+        if not (os.path.exists(full_path)
+                and os.path.getsize(full_path) == meta['size']
+                and file_sha256(full_path) == meta['sha256']):
+            tmp_path = f'{full_path}.tmp'
+            shutil.copyfile(blob, tmp_path)
+            os.replace(tmp_path, full_path)
+        return full_path, meta['sha256']
+
+    def download_and_unzip(self, url: str, dest_dir: str) -> str:
+        # Extraction is skipped when the zip has the same digest as the
+        # one last extracted into dest_dir and its members are all there,
+        # unchanged (by size and CRC); otherwise those missing or changed
+        # are extracted again.
+        zip_path, digest = self.download(url, dest_dir)
+        marker = os.path.join(
+            dest_dir, f'.{os.path.basename(zip_path)}.extracted'
+        )
+        extracted = False
+        if os.path.exists(marker):
+            with open(marker) as fh:
+                extracted = fh.read().strip() == digest
+        with zf.ZipFile(zip_path, 'r') as zfh:
+            members = zfh.infolist()
+            if extracted:
+                members = [
+                    info for info in members
+                    if not member_is_intact(info, dest_dir)
+                ]
+                if not members:
+                    return zip_path
+            zfh.extractall(dest_dir, members)
+        with open(marker, 'w') as fh:
+            fh.write(digest)
+        return zip_path
+
+    def fetch_artifact(self, artifact: Artifact) -> str:
+        if artifact.unzip:
+            return self.download_and_unzip(artifact.url, artifact.dest_dir)
+        return self.download(artifact.url, artifact.dest_dir)[0]
+
+    def fetch_all(self, artifacts: list[Artifact]) -> list[str]:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(self.fetch_artifact, artifacts))
+
+
 def download_file(url: str, dest_dir: str):
     try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-
-        # Extract filename from URL or Content-Disposition header if available
-        filename = os.path.basename(url)
-        if 'Content-Disposition' in response.headers:
-            # Attempt to get filename from Content-Disposition header
-            # Example: attachment; filename="example.pdf"
-            cd = response.headers['Content-Disposition']
-            if 'filename=' in cd:
-                filename = cd.split('filename=')[1].strip('"')
-
-        full_path = os.path.join(dest_dir, filename)
-
-        with open(full_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        full_path, _ = DownloadManager().download(url, dest_dir)
         print(f'File downloaded successfully to: {full_path}')
         return full_path
 
@@ -50,19 +253,22 @@ def download_file(url: str, dest_dir: str):
 
 
 def download_and_unzip(url: str, dest_dir: str) -> None:
-    dest_path = download_file(url, dest_dir)
     try:
-        with zf.ZipFile(dest_path, 'r') as zfh:
-            zfh.extractall(dest_dir)
+        DownloadManager().download_and_unzip(url, dest_dir)
     except Exception as e:
         print(f'Unzipping problem: {e}')
         exit(1)
 
 
 if __name__ == '__main__':
-    url_geo = us_census_states_shp_url('2024')
+    # usage: datasources.py [year ...]
+    years = sys.argv[1:] or ['2024']
     dest_dir = './data'
-    download_and_unzip(url_geo, dest_dir)
-
-    url_elect = us_house_election_stats_url('2024')
-    download_file(url_elect, dest_dir)
+    manager = DownloadManager()
+    artifacts = [
+        artifact
+        for year in years
+        for artifact in artifacts_for_year(year, dest_dir)
+    ]
+    for path in manager.fetch_all(artifacts):
+        print(path)
@@ -1,13 +1,31 @@
 #!/usr/bin/env python
 # coding: utf-8
 
-import json
+from __future__ import annotations
 
-import shapefile as shpf
-from pyproj import Transformer
-from shapely.geometry import mapping, shape
+import io
+import itertools
+from collections.abc import Sequence
+from functools import lru_cache
 
 import hrelectviz.ushelper as ush
+from hrelectviz.geocache import GeometryCache
+from hrelectviz.geojsonio import read_geojson, write_features, write_geojson
+from hrelectviz.geosimplify import features_to_geometries, simplify_features
+from hrelectviz.lazyimport import lazy_import
+from hrelectviz.shpreader import read_features
+from hrelectviz.topojson import (
+    DEFAULT_QUANTIZATION, Topology, geojson_to_topology, read_topology,
+    simplify_topology, topology_to_geojson, write_topology,
+)
+from hrelectviz.topojson import dumps as topojson_dumps
+from hrelectviz.tracing import span
+
+np = lazy_import('numpy')
+pl = lazy_import('polars')
+pyproj = lazy_import('pyproj')
+shapely = lazy_import('shapely')
+shpf = lazy_import('shapefile')
 
 type GeoJSONfcb = shpf.GeoJSONFeatureCollectionWithBBox
 
@@ -27,8 +45,10 @@ def transform_coords(coords, transformer):
         ]
 
 
-def transform_geometry(geom: GeoJSONfcb, src_epsg: str, dest_epsg: str) -> None:
-    xform = Transformer.from_crs(src_epsg, dest_epsg, always_xy=True)
+def transform_geometry_per_point(
+    geom: GeoJSONfcb, src_epsg: str, dest_epsg: str
+) -> None:
+    xform = pyproj.Transformer.from_crs(src_epsg, dest_epsg, always_xy=True)
     for feature in geom['features']:
         if 'geometry' in feature and 'coordinates' in feature['geometry']:
             feature['geometry']['coordinates'] = transform_coords(
@@ -36,6 +56,86 @@ def transform_geometry(geom: GeoJSONfcb, src_epsg: str, dest_epsg: str) -> None:
             )
 
 
+@lru_cache(maxsize=None)
+def get_transformer(src_epsg: str, dest_epsg: str) -> pyproj.Transformer:
+    return pyproj.Transformer.from_crs(src_epsg, dest_epsg, always_xy=True)
+
+
+# The vectorized path below replaces every innermost coordinate sequence
+# (a ring, a LineString or a lone Point) with its index into a flat list
+# of sequences, so that the nesting can be rebuilt after all vertices of
+# all features have been transformed by one pyproj call.
+
+
+def flatten_coords(coords, seqs: list, points: set[int]):
+    if not coords:
+        return []
+    if isinstance(coords[0], (float, int)):  # Point
+        points.add(len(seqs))
+        seqs.append([coords])
+        return len(seqs) - 1
+    elif isinstance(coords[0][0], (float, int)):  # LineString or ring
+        seqs.append(coords)
+        return len(seqs) - 1
+    else:  # MultiLineString or (Multi)Polygon
+        return [flatten_coords(sub, seqs, points) for sub in coords]
+
+
+def unflatten_coords(template, seqs: list[list], points: set[int]):
+    if isinstance(template, int):
+        return seqs[template][0] if template in points else seqs[template]
+    return [unflatten_coords(sub, seqs, points) for sub in template]
+
+
+def round_like_builtin(values: np.ndarray, places: int) -> list:
+    # np.round rounds values * 10**places, which is inexact: a value just
+    # below a half (e.g. 3533696.526075 is 3533696.5260749999...) can
+    # round up where round() rounds the exact value down, a difference of
+    # 10**-places at some 1 in 10,000 vertices. Values scaled to within a
+    # few ulps of a half are rounded again with round(), so that this
+    # matches transform_geometry_per_point exactly.
+    scaled = values * 10.0 ** places
+    rounded = np.round(values, places)
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) \
+        <= 4 * np.spacing(np.abs(scaled))
+    rounded[near_half] = [
+        round(v, places) for v in values[near_half].tolist()
+    ]
+    return rounded.tolist()
+
+
+def transform_geometry(
+    geom: GeoJSONfcb, src_epsg: str, dest_epsg: str, places: int = 5
+) -> None:
+    seqs: list = []
+    points: set[int] = set()
+    templates = []
+    for feature in geom['features']:
+        if 'geometry' in feature and 'coordinates' in feature['geometry']:
+            coords = feature['geometry']['coordinates']
+            templates.append((feature, flatten_coords(coords, seqs, points)))
+    if not seqs:
+        return
+
+    lengths = np.fromiter(map(len, seqs), dtype=np.int64, count=len(seqs))
+    offsets = np.zeros(len(seqs) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    xy = np.fromiter(
+        itertools.chain.from_iterable(itertools.chain.from_iterable(seqs)),
+        dtype=np.float64,
+        count=2 * int(offsets[-1]),
+    ).reshape(-1, 2)
+
+    xs, ys = get_transformer(src_epsg, dest_epsg).transform(xy[:, 0], xy[:, 1])
+    xy = round_like_builtin(np.column_stack((xs, ys)), places)
+
+    new_seqs = [xy[start:stop] for start, stop in itertools.pairwise(offsets)]
+    for feature, template in templates:
+        feature['geometry']['coordinates'] = unflatten_coords(
+            template, new_seqs, points
+        )
+
+
 def filter_by_state_f(
     data: GeoJSONfcb, state_abbrs: list[str], exclude: bool
 ) -> None:
@@ -63,24 +163,225 @@ def parse_geoid(geoid: str) -> tuple[str, int]:
     return state, district_no
 
 
+class DistrictLocator:
+    # Point-in-district lookup over the features of a FeatureCollection.
+    # An STRtree over the (prepared) feature geometries narrows each point
+    # to the features whose bounding box holds it, and the candidates are
+    # tested all at once with shapely.intersects_xy. Points are processed
+    # chunk_size at a time to bound memory.
+
+    def __init__(self, geojson_data: GeoJSONfcb, epsg: str,
+                 chunk_size: int = 1_000_000):
+        features = geojson_data['features']
+        self.epsg = epsg
+        self.chunk_size = chunk_size
+        self.properties = [feature['properties'] for feature in features]
+        self.geoms = features_to_geometries(features)
+        shapely.prepare(self.geoms)
+        self.tree = shapely.STRtree(self.geoms)
+
+    def feature_index(self, x, y, epsg: str | None = None) -> np.ndarray:
+        # Index of the feature holding each point (x[i], y[i]) given in
+        # epsg (by default that of the features), or -1. A point on a
+        # border shared by several features goes to the first of them.
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if epsg and epsg.lower() != self.epsg.lower():
+            x, y = get_transformer(epsg, self.epsg).transform(x, y)
+        nfeatures = len(self.geoms)
+        result = np.full(len(x), nfeatures, dtype=np.int64)
+        for start in range(0, len(x), self.chunk_size):
+            stop = min(start + self.chunk_size, len(x))
+            points = shapely.points(x[start:stop], y[start:stop])
+            point_ix, feature_ix = self.tree.query(points)
+            hit = shapely.intersects_xy(
+                self.geoms[feature_ix], x[start:stop][point_ix],
+                y[start:stop][point_ix],
+            )
+            np.minimum.at(result, start + point_ix[hit], feature_ix[hit])
+        result[result == nfeatures] = -1
+        return result
+
+    def lookup(self, x, y, epsg: str | None = None,
+               prop: str = 'GEOID') -> np.ndarray:
+        # Property prop of the feature holding each point, or None.
+        values = np.array(
+            [props[prop] for props in self.properties] + [None],
+            dtype=object,
+        )
+        return values[self.feature_index(x, y, epsg)]
+
+
 class DistrictsGeoData:
-    def __init__(self, shp_path: str, src_epsg: str):
-        self.geojson_data = shpf.Reader(shp_path).__geo_interface__
+    def __init__(self, shp_path: str, src_epsg: str,
+                 state_abbrs: list[str] | None = None):
+        # shp_path may point into a zip (see shpreader). With state_abbrs,
+        # only the shapes of those states are decoded.
+        select = None
+        if state_abbrs:
+            statefps = {ush.abbr_to_fips[abbr] for abbr in state_abbrs}
+            select = lambda rec: rec['STATEFP'] in statefps  # noqa: E731
+        with span('DistrictsGeoData.read_shapefile', path=shp_path) as sp:
+            self.geojson_data = read_features(shp_path, ['STATEFP'], select)
+            sp.frame(self.geojson_data)
         self.epsg = src_epsg
+        self._locator: DistrictLocator | None = None
+
+    @classmethod
+    def from_geojson(cls, geojson_data: GeoJSONfcb, epsg: str):
+        gd = cls.__new__(cls)
+        gd.geojson_data = geojson_data
+        gd.epsg = epsg
+        gd._locator = None
+        return gd
+
+    @classmethod
+    def load_processed(
+        cls, shp_path: str, src_epsg: str, state_abbrs: list[str] | None,
+        tolerance: float, work_epsg: str = 'epsg:3857',
+        dest_epsg: str | None = None, cache: GeometryCache | None = None,
+    ):
+        # Filter to state_abbrs, simplify in work_epsg (a projection in
+        # meters) and reproject to dest_epsg, reusing a cached result of
+        # the same pipeline on the same shapefile contents if one exists.
+        dest_epsg = dest_epsg or src_epsg
+        cache = cache or GeometryCache()
+        key = cache.key(
+            shp_path, state_abbrs, src_epsg, work_epsg, dest_epsg, tolerance
+        )
+        with span('GeometryCache.get') as sp:
+            data = cache.get(key)
+            sp.set(hit=data is not None)
+        if data is not None:
+            return cls.from_geojson(data, dest_epsg)
+
+        gd = cls(shp_path, src_epsg, state_abbrs)
+        if gd.epsg != work_epsg:
+            gd.xform_geometry(work_epsg)
+        gd.simplify(tolerance)
+        if gd.epsg != dest_epsg:
+            gd.xform_geometry(dest_epsg)
+        cache.put(key, gd.geojson_data)
+        return gd
+
+    @classmethod
+    def from_topojson(cls, topology: str | Topology, epsg: str,
+                      object_name: str | None = None):
+        # topology is a TopoJSON file path or an already parsed topology.
+        if isinstance(topology, str):
+            topology = read_topology(topology)
+        return cls.from_geojson(
+            topology_to_geojson(topology, object_name), epsg
+        )
 
-    def as_str(self) -> str:
-        return json.dumps(self.geojson_data, indent=4)
+    @classmethod
+    def from_file(cls, path: str, epsg: str, seq: bool | None = None):
+        # A GeoJSON FeatureCollection or feature sequence (see geojsonio),
+        # e.g. one written by to_file.
+        with span('DistrictsGeoData.read_geojson', path=path) as sp:
+            gd = cls.from_geojson(read_geojson(path, seq), epsg)
+            sp.frame(gd.geojson_data)
+        return gd
 
-    def to_file(self, path: str) -> None:
-        with open(path, 'w') as outfile:
-            json.dump(self.geojson_data, outfile, indent=4)
+    def as_str(self, places: int | None = None) -> str:
+        buffer = io.StringIO()
+        write_features(buffer, self.geojson_data['features'], places,
+                       bbox=self.geojson_data.get('bbox'))
+        return buffer.getvalue()
+
+    def to_file(self, path: str, places: int | None = None,
+                seq: bool | None = None) -> None:
+        # Streamed out feature by feature, compact, with coordinates
+        # rounded to places decimals if given; gzip-compressed when path
+        # ends in .gz, one feature per line when seq (or when path has a
+        # GeoJSON-seq extension).
+        with span('DistrictsGeoData.write_geojson', path=path) as sp:
+            write_geojson(path, self.geojson_data['features'], places, seq,
+                          bbox=self.geojson_data.get('bbox'))
+            sp.frame(self.geojson_data)
+
+    def to_topology(
+        self, quantization: int = DEFAULT_QUANTIZATION,
+        tolerance: float | None = None, object_name: str = 'districts',
+    ) -> Topology:
+        # Shared borders are stored once; with a tolerance (in the units
+        # of self.epsg) they are simplified once, keeping neighbours
+        # gap-free.
+        topology = geojson_to_topology(
+            self.geojson_data, object_name, quantization, id_property='GEOID'
+        )
+        if tolerance:
+            topology = simplify_topology(topology, tolerance)
+        return topology
+
+    def as_topojson_str(self, **kwargs) -> str:
+        return topojson_dumps(self.to_topology(**kwargs))
+
+    def to_topojson_file(self, path: str, **kwargs) -> None:
+        write_topology(self.to_topology(**kwargs), path)
+
+    def simplify_topology(
+        self, tolerance: float, quantization: int = DEFAULT_QUANTIZATION
+    ) -> None:
+        # Like simplify, but borders shared by neighbouring features are
+        # simplified identically, so no gaps or overlaps open between them.
+        self._locator = None
+        with span('DistrictsGeoData.simplify_topology',
+                  tolerance=tolerance) as sp:
+            self.geojson_data['features'] = topology_to_geojson(
+                self.to_topology(quantization, tolerance)
+            )['features']
+            sp.frame(self.geojson_data)
+
+    @property
+    def locator(self) -> DistrictLocator:
+        # Built on first use, and rebuilt after the geometry changes.
+        if self._locator is None:
+            with span('DistrictsGeoData.build_locator'):
+                self._locator = DistrictLocator(self.geojson_data, self.epsg)
+        return self._locator
+
+    def lookup_points(self, x, y, epsg: str | None = None,
+                      prop: str = 'GEOID') -> np.ndarray:
+        # e.g. gd.lookup_points(lons, lats, 'epsg:4326') -> GEOIDs or None
+        with span('DistrictsGeoData.lookup_points', npoints=len(x)):
+            return self.locator.lookup(x, y, epsg, prop)
+
+    def tag_points(
+        self, df: pl.DataFrame, x_col: str = 'lon', y_col: str = 'lat',
+        epsg: str | None = None, props: Sequence[str] = ('STATEFP', 'GEOID'),
+    ) -> pl.DataFrame:
+        # df with the given properties of the feature holding each row's
+        # point added as columns (null where no feature holds it).
+        with span('DistrictsGeoData.tag_points', npoints=len(df)):
+            feature_ix = self.locator.feature_index(
+                df[x_col].to_numpy(), df[y_col].to_numpy(), epsg
+            )
+            found = feature_ix >= 0
+            columns = []
+            for prop in props:
+                values = np.array(
+                    [p[prop] for p in self.locator.properties],
+                    dtype=object,
+                )
+                column = np.full(len(df), None, dtype=object)
+                column[found] = values[feature_ix[found]]
+                columns.append(pl.Series(prop, column.tolist()))
+            return df.with_columns(columns)
 
     def xform_geometry(self, dest_epsg: str) -> None:
-        transform_geometry(self.geojson_data, self.epsg, dest_epsg)
+        self._locator = None
+        with span('DistrictsGeoData.xform_geometry', src=self.epsg,
+                  dest=dest_epsg) as sp:
+            transform_geometry(self.geojson_data, self.epsg, dest_epsg)
+            sp.frame(self.geojson_data)
         self.epsg = dest_epsg
 
     def filter_by_state(self, state_abbrs: list[str], exclude=False) -> None:
-        filter_by_state_f(self.geojson_data, state_abbrs, exclude)
+        self._locator = None
+        with span('DistrictsGeoData.filter_by_state') as sp:
+            filter_by_state_f(self.geojson_data, state_abbrs, exclude)
+            sp.frame(self.geojson_data)
 
     def get_props(self, props: list[str]) -> dict[str, list]:
         props_full = [prop for prop in props if prop != 'GEOID']
@@ -95,19 +396,16 @@ class DistrictsGeoData:
         }
         return col_dict
 
-    def simplify(self, tolerance):
-        simplified_features = []
-        for feature in self.geojson_data['features']:
-            geometry = shape(feature['geometry'])
-            simplified_geometry = geometry.simplify(
-                tolerance, preserve_topology=True
-            )  # preserve_topology is crucial for polygon simplification
-
-            simplified_feature = {
-                'type': 'Feature',
-                'geometry': mapping(simplified_geometry),
-                'properties': feature['properties'],
-            }
-            simplified_features.append(simplified_feature)
-
-        self.geojson_data['features'] = simplified_features
+    def simplify(self, tolerance, mode: str = 'compat',
+                 workers: int | None = None):
+        # mode 'compat' simplifies each feature on its own, topology
+        # preserving (as shape(g).simplify(tolerance, True) would), in
+        # shards on up to workers threads; 'coverage' simplifies shared
+        # borders once, so neighbours stay gap-free (see geosimplify).
+        self._locator = None
+        with span('DistrictsGeoData.simplify', tolerance=tolerance,
+                  mode=mode) as sp:
+            self.geojson_data['features'] = simplify_features(
+                self.geojson_data['features'], tolerance, mode, workers
+            )
+            sp.frame(self.geojson_data)
@@ -0,0 +1,191 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+import polars as pl
+
+from hrelectviz.bootstrap import (
+    Replicates, efficiency_gaps, mean_median_differences,
+)
+from hrelectviz.hrelection import x_is_affiliate_of
+from hrelectviz.tracing import span
+
+# Metrics of ensembles of alternative districting plans of one state.
+# An ensemble is a plans x units matrix of district numbers 0..k-1
+# (int16, k <= 32767), best kept in a .npy file and opened memory-mapped
+# (open_ensemble), so that worker processes each map it rather than
+# receive a copy. District totals of a chunk of plans are one weighted
+# np.bincount over (plan, district) cells, i.e. the product of the unit
+# votes with the sparse one-hot plan matrices; efficiency gaps and
+# mean-median differences are then computed for the whole chunk as
+# bootstrap replicates are.
+
+CHUNK_PLANS = 2000
+
+METRIC_COLUMNS = [
+    'Democrat\nseats', 'Democrat-leaning\nefficiency gap',
+    'Mean-median difference\n(+ favors Republicans)',
+]
+
+
+class UnitVotes(NamedTuple):
+    units: np.ndarray   # (nunits,) unit ids, in assignment column order
+    dem: np.ndarray     # (nunits,) Democratic vote
+    rep: np.ndarray     # (nunits,) Republican vote
+
+
+def unit_votes_f(frame: pl.DataFrame | pl.LazyFrame, unit: str,
+                 party: str = 'Party', vote: str = 'Vote') -> UnitVotes:
+    # Major-party votes per unit (e.g. precinct) of results at the unit
+    # level or below, ordered by unit id.
+    df = (
+        frame.lazy()
+        .rename({party: 'Party'} if party != 'Party' else {})
+        .group_by(unit)
+        .agg(
+            pl.col(vote).filter(x_is_affiliate_of(major)).sum()
+            .cast(pl.Float64).alias(major)
+            for major in ['Democrat', 'Republican']
+        )
+        .sort(unit)
+        .collect()
+    )
+    return UnitVotes(df[unit].to_numpy(), df['Democrat'].to_numpy(),
+                     df['Republican'].to_numpy())
+
+
+def check_assignments(assignments: np.ndarray, ndistricts: int) -> None:
+    # An id out of range would be counted in another plan's districts
+    # (or fail deep in np.bincount), so it is refused up front.
+    if assignments.size == 0:
+        return
+    low, high = assignments.min(), assignments.max()
+    if low < 0 or high >= ndistricts:
+        raise ValueError(
+            f'District ids must be in 0..{ndistricts - 1}, '
+            f'got {low}..{high}'
+        )
+
+
+def save_ensemble(path: str, assignments: np.ndarray,
+                  ndistricts: int | None = None) -> None:
+    # Without ndistricts, ids are only checked to fit in int16.
+    assignments = np.asarray(assignments)
+    check_assignments(assignments, ndistricts or np.iinfo(np.int16).max + 1)
+    tmp_path = f'{path}.tmp.npy'
+    np.save(tmp_path, assignments.astype(np.int16))
+    os.replace(tmp_path, path)
+
+
+def open_ensemble(path: str) -> np.ndarray:
+    return np.load(path, mmap_mode='r')
+
+
+def district_votes(assignments: np.ndarray, votes: np.ndarray,
+                   ndistricts: int) -> np.ndarray:
+    # (nplans, ndistricts) totals of votes (nunits,) per district, for
+    # assignments already checked with check_assignments.
+    nplans, nunits = assignments.shape
+    cells = (
+        np.arange(nplans, dtype=np.int64)[:, None] * ndistricts
+        + assignments
+    ).ravel()
+    return np.bincount(
+        cells, weights=np.broadcast_to(votes, (nplans, nunits)).ravel(),
+        minlength=nplans * ndistricts,
+    ).reshape(nplans, ndistricts)
+
+
+def plan_metrics(assignments: np.ndarray, votes: UnitVotes,
+                 ndistricts: int) -> np.ndarray:
+    # (nplans, 3) seats, efficiency gap and mean-median difference, in
+    # the order of METRIC_COLUMNS. Raises ValueError for district ids out
+    # of 0..ndistricts-1.
+    assignments = np.asarray(assignments)
+    check_assignments(assignments, ndistricts)
+    reps = Replicates(
+        ['plan'], np.zeros(1, dtype=np.int64),
+        district_votes(assignments, votes.dem, ndistricts),
+        district_votes(assignments, votes.rep, ndistricts),
+    )
+    tied = (reps.dem == reps.rep) & (reps.dem > 0)
+    seats = (reps.dem > reps.rep).sum(axis=1) + 0.5 * tied.sum(axis=1)
+    return np.column_stack([
+        seats, efficiency_gaps(reps)[:, 0],
+        mean_median_differences(reps, reps.dem)[:, 0],
+    ])
+
+
+# Per worker process: the unit votes and the memory-mapped ensemble.
+_votes: UnitVotes | None = None
+_ensemble: np.ndarray | None = None
+
+
+def init_worker(votes: UnitVotes, path: str) -> None:
+    global _votes, _ensemble
+    _votes = votes
+    _ensemble = open_ensemble(path)
+
+
+def chunk_metrics(start: int, stop: int, ndistricts: int) -> np.ndarray:
+    assert _votes is not None and _ensemble is not None
+    return plan_metrics(_ensemble[start:stop], _votes, ndistricts)
+
+
+def evaluate_ensemble(
+    votes: UnitVotes, ensemble: str | np.ndarray, ndistricts: int,
+    chunk_plans: int = CHUNK_PLANS, workers: int | None = None,
+) -> pl.DataFrame:
+    # One row per plan. An ensemble given as a .npy path is evaluated in
+    # chunks on worker processes; an array, in chunks in this process.
+    assignments = open_ensemble(ensemble) if isinstance(ensemble, str) \
+        else ensemble
+    nplans = len(assignments)
+    bounds = [(start, min(start + chunk_plans, nplans))
+              for start in range(0, nplans, chunk_plans)]
+    nworkers = min(workers or os.cpu_count() or 1, len(bounds))
+    with span('ensemble.evaluate', plans=nplans, workers=nworkers):
+        if isinstance(ensemble, str) and nworkers > 1:
+            with ProcessPoolExecutor(
+                # Forking after polars has started its thread pool can
+                # deadlock the children.
+                mp_context=multiprocessing.get_context('spawn'),
+                max_workers=nworkers, initializer=init_worker,
+                initargs=(votes, ensemble),
+            ) as executor:
+                chunks = list(executor.map(
+                    chunk_metrics, *zip(*bounds),
+                    [ndistricts] * len(bounds),
+                ))
+        else:
+            chunks = [
+                plan_metrics(assignments[start:stop], votes, ndistricts)
+                for start, stop in bounds
+            ]
+    metrics = np.vstack(chunks) if chunks else np.empty((0, 3))
+    return pl.DataFrame({
+        'Plan': np.arange(nplans, dtype=np.int64),
+        **{name: metrics[:, col] for col, name in enumerate(METRIC_COLUMNS)},
+    }).fill_nan(None)
+
+
+def percentile_ranks_f(ensemble_df: pl.DataFrame, enacted: np.ndarray,
+                       votes: UnitVotes, ndistricts: int) -> pl.DataFrame:
+    # One row per metric: the value of the enacted plan (an assignment of
+    # the units), the ensemble's distribution, and the percentage of
+    # ensemble plans below the enacted value (ties counting half).
+    enacted_values = plan_metrics(enacted[None, :], votes, ndistricts)[0]
+    rows = []
+    for name, value in zip(METRIC_COLUMNS, enacted_values):
+        values = ensemble_df[name].drop_nulls().to_numpy()
+        below = (values < value).sum() + 0.5 * (values == value).sum()
+        p05, p50, p95 = np.quantile(values, [0.05, 0.5, 0.95])
+        rows.append({
+            'Metric': name, 'Enacted': value, 'Ensemble\nmean': values.mean(),
+            'Ensemble\n5%': p05, 'Ensemble\nmedian': p50,
+            'Ensemble\n95%': p95,
+            'Percentile\nrank': 100.0 * below / len(values),
+        })
+    return pl.DataFrame(rows)
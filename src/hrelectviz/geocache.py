@@ -0,0 +1,138 @@
+import hashlib
+import importlib.util
+import os
+import pickle
+import tempfile
+from typing import Any
+
+from hrelectviz.shpreader import split_zip_path
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    'HRELECTVIZ_CACHE_DIR', os.path.join('.cache', 'hrelectviz')
+)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+SHAPEFILE_PARTS = ['.shp', '.shx', '.dbf']
+# The code producing cached geometry, part of every key so that a change
+# to it is not answered with geometry it would no longer produce.
+GEOMETRY_MODULES = [
+    'hrelectviz.districtsgeodata', 'hrelectviz.geosimplify',
+    'hrelectviz.shpreader', 'hrelectviz.ushelper',
+]
+
+# Content hashes are memoized per (path, size, mtime) so that a warm start
+# does not have to re-read a large shapefile just to compute its cache key.
+_digest_memo: dict[tuple[str, int, int], str] = {}
+
+
+def file_digest(path: str) -> str:
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if memo_key not in _digest_memo:
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as fh:
+            while chunk := fh.read(1 << 20):
+                hasher.update(chunk)
+        _digest_memo[memo_key] = hasher.hexdigest()
+    return _digest_memo[memo_key]
+
+
+def shapefile_digest(shp_path: str) -> str:
+    # A shapefile read out of a zip (see shpreader) is keyed by the zip
+    # and the member named.
+    if (zip_parts := split_zip_path(shp_path)) is not None:
+        zip_path, member = zip_parts
+        return hashlib.sha256(
+            f'{file_digest(zip_path)}|{member or ""}'.encode()
+        ).hexdigest()
+    base, ext = os.path.splitext(shp_path)
+    if ext.lower() not in SHAPEFILE_PARTS:
+        base = shp_path
+    hasher = hashlib.sha256()
+    for part in SHAPEFILE_PARTS:
+        if os.path.exists(base + part):
+            hasher.update(part.encode())
+            hasher.update(file_digest(base + part).encode())
+    return hasher.hexdigest()
+
+
+def source_digest(*modules: str) -> str:
+    # Of the source files of modules (dotted names), e.g. the params of a
+    # pipeline stage whose outputs depend on that code, so that a change
+    # to it rebuilds the stage.
+    hasher = hashlib.sha256()
+    for module in modules:
+        spec = importlib.util.find_spec(module)
+        assert spec is not None and spec.origin is not None, module
+        with open(spec.origin, 'rb') as fh:
+            hasher.update(fh.read())
+    return hasher.hexdigest()
+
+
+class GeometryCache:
+    def __init__(
+        self, cache_dir: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        self.cache_dir = os.path.join(cache_dir, 'geometry')
+        self.max_bytes = max_bytes
+
+    def key(
+        self, shp_path: str, state_abbrs: list[str] | None,
+        src_epsg: str, work_epsg: str, dest_epsg: str, tolerance: float,
+    ) -> str:
+        states = ','.join(sorted(state_abbrs)) if state_abbrs else '*'
+        parts = [
+            shapefile_digest(shp_path), states, src_epsg.lower(),
+            work_epsg.lower(), dest_epsg.lower(), repr(float(tolerance)),
+            source_digest(*GEOMETRY_MODULES),
+        ]
+        return hashlib.sha256('|'.join(parts).encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.pickle')
+
+    def get(self, key: str) -> Any | None:
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as fh:
+                data = pickle.load(fh)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(path)  # mark as most recently used
+        return data
+
+    def put(self, key: str, data: Any) -> None:
+        os.makedirs(self.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                pickle.dump(data, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.pickle'):
+                    st = entry.stat()
+                    entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        # Oldest first; the most recently used entry is always kept.
+        for _, size, path in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                os.unlink(os.path.join(self.cache_dir, name))
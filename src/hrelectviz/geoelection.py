@@ -0,0 +1,144 @@
+from collections.abc import Sequence
+from typing import NamedTuple
+
+import polars as pl
+
+from hrelectviz.gerrymeter import (
+    efficiency_gap_f, gerrymander_metrics_f, mean_median_difference_f,
+    partisan_skew_f,
+)
+from hrelectviz.hrelection import (
+    SD_COLS, aggregate_vote_by_district_f, aggregate_vote_by_state_f,
+    major_party_selector, state_nwinners_by_party_f,
+)
+from hrelectviz.tracing import span
+
+
+class GeoLevels(NamedTuple):
+    # The columns of a results table naming its levels of geography. Rows
+    # may be at any finer level (candidates, precincts, ...); their votes
+    # are summed up to districts, and districts up to states. A state is
+    # districted once per value of the plan columns (e.g. a legislative
+    # chamber, or a year). state holds postal abbreviations.
+    state: str = 'State\nAbbr'
+    district: str = 'District\nNumber'
+    plan: tuple[str, ...] = ()
+    party: str = 'Party'
+    vote: str = 'Vote'
+
+
+HOUSE = GeoLevels()
+STATE_LEGISLATURES = GeoLevels('State', 'District', ('Chamber',))
+
+
+def scan_results(path: str) -> pl.LazyFrame:
+    # One file or a glob of Parquet or CSV files.
+    if path.endswith('.csv'):
+        return pl.scan_csv(path)
+    return pl.scan_parquet(path)
+
+
+# The roll-up to districts renames the levels to the columns of the
+# HrElection tables ('State\nAbbr', 'District\nNumber'), with the plan
+# columns as the `by` keys, so that the table and metric functions of
+# hrelection and gerrymeter apply unchanged from there on.
+
+
+def district_party_vote_f[F: (pl.DataFrame, pl.LazyFrame)](
+    frame: F, levels: GeoLevels = HOUSE,
+) -> F:
+    return (
+        frame
+        .select(
+            *levels.plan,
+            pl.col(levels.state).alias('State\nAbbr'),
+            pl.col(levels.district).alias('District\nNumber'),
+            pl.col(levels.party).alias('Party'),
+            pl.col(levels.vote).cast(pl.Int64).alias('Vote'),
+        )
+        .with_columns(major_party_selector.alias('Party'))
+        .group_by([*levels.plan, *SD_COLS, 'Party'])
+        .agg(pl.col('Vote').sum())
+    )
+
+
+def district_party_winners_f[F: (pl.DataFrame, pl.LazyFrame)](
+    district_party_vote: F, by: Sequence[str] = (),
+) -> F:
+    # The party with the most votes in each district (ties go to the
+    # first party name).
+    return (
+        district_party_vote
+        .sort([*by, *SD_COLS])
+        .group_by([*by, *SD_COLS], maintain_order=True)
+        .agg(
+            pl.col('Party')
+            .sort_by(['Vote', 'Party'], descending=[True, False])
+            .first()
+        )
+    )
+
+
+class GeoElection:
+    # Results at any level of geography, e.g. precinct returns of state
+    # legislative races:
+    #   GeoElection('precincts/*.parquet', STATE_LEGISLATURES)
+    # The source is read in one pass on the streaming engine, summing it
+    # up by district and party; memory is bounded by the number of
+    # districts, not of rows. Every state-level table and metric is then
+    # computed from that small table.
+
+    def __init__(self, source: pl.LazyFrame | str,
+                 levels: GeoLevels = HOUSE):
+        self.source = scan_results(source) if isinstance(source, str) \
+            else source
+        self.levels = levels
+        self.by = list(levels.plan)
+        self.dfs: dict[str, pl.DataFrame] = {}
+
+    def get_district_party_vote(self) -> pl.DataFrame:
+        if 'district_party_vote' not in self.dfs:
+            with span('GeoElection.rollup', plan=self.by) as sp:
+                self.dfs['district_party_vote'] = district_party_vote_f(
+                    self.source, self.levels
+                ).collect(engine='streaming').sort(
+                    [*self.by, *SD_COLS, 'Party']
+                )
+                sp.frame(self.dfs['district_party_vote'])
+        return self.dfs['district_party_vote']
+
+    def plan_gerrymander_metrics(self) -> pl.LazyFrame:
+        by = self.by
+        source = self.get_district_party_vote().lazy()
+        by_district = aggregate_vote_by_district_f(source, by)
+        return gerrymander_metrics_f(
+            partisan_skew_f(
+                state_nwinners_by_party_f(
+                    district_party_winners_f(source, by), by
+                ),
+                aggregate_vote_by_state_f(source, by),
+                by,
+            ),
+            mean_median_difference_f(by_district, by),
+            efficiency_gap_f(by_district, by),
+            by,
+        )
+
+    def get_aggregate_vote_by_district(self) -> pl.DataFrame:
+        return aggregate_vote_by_district_f(
+            self.get_district_party_vote(), self.by
+        )
+
+    def get_aggregate_vote_by_state(self) -> pl.DataFrame:
+        return aggregate_vote_by_state_f(
+            self.get_district_party_vote(), self.by
+        )
+
+    def get_gerrymander_metrics(self) -> pl.DataFrame:
+        if 'gerrymander_metrics' not in self.dfs:
+            with span('GeoElection.get_gerrymander_metrics') as sp:
+                self.dfs['gerrymander_metrics'] = (
+                    self.plan_gerrymander_metrics().collect()
+                )
+                sp.frame(self.dfs['gerrymander_metrics'])
+        return self.dfs['gerrymander_metrics']
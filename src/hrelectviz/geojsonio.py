@@ -0,0 +1,170 @@
+import gzip
+import json
+import os
+from collections.abc import Iterable, Iterator
+from typing import IO
+
+# Streaming GeoJSON output and input. Features are written one at a time
+# with compact separators and optionally rounded coordinates, either as
+# a FeatureCollection or as GeoJSON text sequences (one feature per line,
+# https://datatracker.ietf.org/doc/html/rfc8142 without the RS prefix
+# unless asked for). A path ending in .gz is gzip-compressed. Reading
+# yields one feature at a time in both forms, so neither side holds the
+# whole document in memory.
+
+SEQ_SUFFIXES = ('.geojsons', '.geojsonl', '.geojsonseq', '.jsonl', '.ndjson')
+RS = '\x1e'
+READ_CHUNK = 1 << 20
+GZIP_LEVEL = 6
+
+SEPARATORS = (',', ':')
+
+
+def is_seq_path(path: str) -> bool:
+    return path.removesuffix('.gz').lower().endswith(SEQ_SUFFIXES)
+
+
+def open_text(path: str, mode: str, compress: bool | None = None) -> IO[str]:
+    if compress is None:
+        compress = path.endswith('.gz')
+    if compress:
+        return gzip.open(path, f'{mode}t', encoding='utf-8',
+                         compresslevel=GZIP_LEVEL)
+    return open(path, mode, encoding='utf-8')
+
+
+def round_coords(coords, places: int):
+    if not coords:
+        return coords
+    if isinstance(coords[0], (float, int)):  # Point
+        return [round(c, places) for c in coords]
+    if isinstance(coords[0][0], (float, int)):  # LineString or ring
+        return [[round(c, places) for c in pt] for pt in coords]
+    return [round_coords(sub, places) for sub in coords]
+
+
+def round_geometry(geometry: dict | None, places: int) -> dict | None:
+    if not geometry:
+        return geometry
+    if geometry.get('type') == 'GeometryCollection':
+        return {**geometry, 'geometries': [
+            round_geometry(sub, places) for sub in geometry['geometries']
+        ]}
+    return {**geometry,
+            'coordinates': round_coords(geometry['coordinates'], places)}
+
+
+def feature_json(feature: dict, places: int | None = None) -> str:
+    if places is not None:
+        feature = {**feature,
+                   'geometry': round_geometry(feature.get('geometry'), places)}
+    return json.dumps(feature, separators=SEPARATORS)
+
+
+def write_features(
+    fh: IO[str], features: Iterable[dict], places: int | None = None,
+    seq: bool = False, rs: bool = False, bbox: list[float] | None = None,
+) -> int:
+    # Writes features to fh, returning how many were written.
+    count = 0
+    if seq:
+        prefix = RS if rs else ''
+        for feature in features:
+            fh.write(f'{prefix}{feature_json(feature, places)}\n')
+            count += 1
+        return count
+    fh.write('{"type":"FeatureCollection",')
+    if bbox is not None:
+        fh.write(f'"bbox":{json.dumps(list(bbox), separators=SEPARATORS)},')
+    fh.write('"features":[')
+    for feature in features:
+        if count:
+            fh.write(',')
+        fh.write(feature_json(feature, places))
+        count += 1
+    fh.write(']}')
+    return count
+
+
+def write_geojson(
+    path: str, features: Iterable[dict], places: int | None = None,
+    seq: bool | None = None, **kwargs,
+) -> int:
+    # seq defaults to what the extension of path says (see SEQ_SUFFIXES).
+    # The file is written under a temporary name and renamed when done.
+    if seq is None:
+        seq = is_seq_path(path)
+    tmp_path = f'{path}.tmp'
+    with open_text(tmp_path, 'w', compress=path.endswith('.gz')) as fh:
+        count = write_features(fh, features, places, seq, **kwargs)
+    os.replace(tmp_path, path)
+    return count
+
+
+def iter_seq_features(fh: IO[str]) -> Iterator[dict]:
+    for line in fh:
+        line = line.strip().lstrip(RS)
+        if line:
+            yield json.loads(line)
+
+
+def iter_collection_features(
+    fh: IO[str], chunk_size: int = READ_CHUNK
+) -> Iterator[dict]:
+    # Features of a FeatureCollection, decoded one at a time from chunks
+    # of the text. Only the features array is read; members after it
+    # (and a "features" key nested in a member before it) are not
+    # expected in the files this writes.
+    decoder = json.JSONDecoder()
+    buffer = ''
+
+    def fill() -> bool:
+        nonlocal buffer
+        chunk = fh.read(chunk_size)
+        buffer += chunk
+        return bool(chunk)
+
+    while (start := buffer.find('"features"')) < 0:
+        if not fill():
+            raise ValueError('No "features" array in GeoJSON input')
+    while (pos := buffer.find('[', start)) < 0:
+        if not fill():
+            raise ValueError('Truncated GeoJSON input')
+    pos += 1
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos >= len(buffer):
+            if not fill():
+                raise ValueError('Truncated GeoJSON input')
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            feature, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if not fill():
+                raise
+            continue
+        yield feature
+        pos = end
+        if pos > chunk_size:
+            # Drop consumed text so the buffer stays about a chunk long.
+            buffer, pos = buffer[pos:], 0
+
+
+def iter_geojson(path: str, seq: bool | None = None) -> Iterator[dict]:
+    # The features of a GeoJSON file written by write_geojson (or any
+    # FeatureCollection or feature sequence), one at a time.
+    if seq is None:
+        seq = is_seq_path(path)
+    with open_text(path, 'r') as fh:
+        if seq:
+            yield from iter_seq_features(fh)
+        else:
+            yield from iter_collection_features(fh)
+
+
+def read_geojson(path: str, seq: bool | None = None) -> dict:
+    return {'type': 'FeatureCollection',
+            'features': list(iter_geojson(path, seq))}
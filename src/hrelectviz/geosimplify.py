@@ -0,0 +1,194 @@
+from __future__ import annotations
+
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from hrelectviz.lazyimport import lazy_import
+
+np = lazy_import('numpy')
+shapely = lazy_import('shapely')
+
+# Simplification of whole FeatureCollections with shapely 2's vectorized
+# functions. Polygon and MultiPolygon features are converted to and from
+# shapely geometry arrays in bulk (through shapely's ragged-array form),
+# other geometry types one by one with shape() / mapping(). The GEOS
+# work is done by ufuncs that release the GIL, so large arrays are
+# simplified in shards on a thread pool rather than on a process pool,
+# which would have to serialize every geometry both ways.
+#
+# Modes:
+#   'compat'    per-geometry topology-preserving Douglas-Peucker, the same
+#               GEOS call as DistrictsGeoData's original loop; its output
+#               equals that loop's output.
+#   'coverage'  shapely.coverage_simplify over all features together, so
+#               borders shared by neighbours are simplified once and stay
+#               shared (the input must be a valid polygonal coverage).
+
+SHARD_SIZE = 256
+
+
+def flat_xy(rings) -> tuple[np.ndarray, np.ndarray]:
+    # Vertices of a sequence of rings as an (n, 2) array, and ring offsets.
+    lengths = np.fromiter(map(len, rings), dtype=np.int64, count=len(rings))
+    offsets = np.zeros(len(rings) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    xy = np.fromiter(
+        itertools.chain.from_iterable(itertools.chain.from_iterable(rings)),
+        dtype=np.float64, count=2 * int(offsets[-1]),
+    ).reshape(-1, 2)
+    return xy, offsets
+
+
+def polygons_from_coordinates(polygons: list) -> np.ndarray:
+    rings = [ring for polygon in polygons for ring in polygon]
+    xy, ring_offsets = flat_xy(rings)
+    poly_offsets = np.zeros(len(polygons) + 1, dtype=np.int64)
+    np.cumsum([len(polygon) for polygon in polygons], out=poly_offsets[1:])
+    return shapely.from_ragged_array(
+        shapely.GeometryType.POLYGON, xy, (ring_offsets, poly_offsets)
+    )
+
+
+def multipolygons_from_coordinates(multipolygons: list) -> np.ndarray:
+    polygons = [polygon for multi in multipolygons for polygon in multi]
+    rings = [ring for polygon in polygons for ring in polygon]
+    xy, ring_offsets = flat_xy(rings)
+    poly_offsets = np.zeros(len(polygons) + 1, dtype=np.int64)
+    np.cumsum([len(polygon) for polygon in polygons], out=poly_offsets[1:])
+    multi_offsets = np.zeros(len(multipolygons) + 1, dtype=np.int64)
+    np.cumsum([len(multi) for multi in multipolygons], out=multi_offsets[1:])
+    return shapely.from_ragged_array(
+        shapely.GeometryType.MULTIPOLYGON, xy,
+        (ring_offsets, poly_offsets, multi_offsets),
+    )
+
+
+def is_simple_polygonal(geometry: dict | None, geom_type: str) -> bool:
+    # Bulk conversion handles non-empty 2D (Multi)Polygons.
+    if not geometry or geometry.get('type') != geom_type:
+        return False
+    coords = geometry['coordinates']
+    if geom_type == 'MultiPolygon':
+        return all(coords) and all(
+            polygon and all(len(pt) == 2 for pt in polygon[0][:1])
+            for polygon in coords
+        )
+    return bool(coords) and all(len(pt) == 2 for pt in coords[0][:1])
+
+
+def features_to_geometries(features: list[dict]) -> np.ndarray:
+    geoms = np.empty(len(features), dtype=object)
+    by_type: dict[str, list[int]] = {'Polygon': [], 'MultiPolygon': []}
+    for featno, feature in enumerate(features):
+        geometry = feature.get('geometry')
+        for geom_type, featnos in by_type.items():
+            if is_simple_polygonal(geometry, geom_type):
+                featnos.append(featno)
+                break
+        else:
+            geoms[featno] = (
+                shapely.geometry.shape(geometry) if geometry else None
+            )
+    for geom_type, from_coords in [
+        ('Polygon', polygons_from_coordinates),
+        ('MultiPolygon', multipolygons_from_coordinates),
+    ]:
+        if featnos := by_type[geom_type]:
+            geoms[featnos] = from_coords([
+                features[featno]['geometry']['coordinates']
+                for featno in featnos
+            ])
+    return geoms
+
+
+def point_tuples(xy: np.ndarray) -> list[tuple[float, float]]:
+    return list(zip(xy[:, 0].tolist(), xy[:, 1].tolist()))
+
+
+def geometries_to_mappings(geoms: np.ndarray) -> list[dict | None]:
+    # The same structures as shapely.geometry.mapping() builds: a Polygon's
+    # coordinates are a tuple of ring tuples of point tuples, those of a
+    # MultiPolygon a list of such polygon tuples.
+    result: list[dict | None] = [None] * len(geoms)
+    type_ids = shapely.get_type_id(geoms)
+    nonempty = ~shapely.is_empty(geoms) & ~shapely.has_z(geoms)
+    polygon, multipolygon = (shapely.GeometryType.POLYGON,
+                             shapely.GeometryType.MULTIPOLYGON)
+    for type_id in [polygon, multipolygon]:
+        featnos = np.flatnonzero((type_ids == type_id) & nonempty)
+        if not len(featnos):
+            continue
+        _, xy, offsets = shapely.to_ragged_array(geoms[featnos])
+        points = point_tuples(xy)
+        rings = [
+            tuple(points[start:stop])
+            for start, stop in itertools.pairwise(offsets[0].tolist())
+        ]
+        polygons = [
+            tuple(rings[start:stop])
+            for start, stop in itertools.pairwise(offsets[1].tolist())
+        ]
+        if type_id == polygon:
+            for featno, polygon in zip(featnos.tolist(), polygons):
+                result[featno] = {'type': 'Polygon', 'coordinates': polygon}
+        else:
+            for featno, (start, stop) in zip(
+                featnos.tolist(), itertools.pairwise(offsets[2].tolist())
+            ):
+                result[featno] = {
+                    'type': 'MultiPolygon',
+                    'coordinates': polygons[start:stop],
+                }
+    for featno, geom in enumerate(geoms):
+        if result[featno] is None and geom is not None:
+            result[featno] = shapely.geometry.mapping(geom)
+    return result
+
+
+def simplify_geometries(
+    geoms: np.ndarray, tolerance: float, mode: str = 'compat',
+    workers: int | None = None, shard_size: int = SHARD_SIZE,
+) -> np.ndarray:
+    match mode:
+        case 'compat':
+            if workers == 1 or len(geoms) <= shard_size:
+                return shapely.simplify(
+                    geoms, tolerance, preserve_topology=True
+                )
+            shards = [
+                geoms[start:start + shard_size]
+                for start in range(0, len(geoms), shard_size)
+            ]
+            with ThreadPoolExecutor(
+                max_workers=workers or os.cpu_count()
+            ) as executor:
+                return np.concatenate(list(executor.map(
+                    lambda shard: shapely.simplify(
+                        shard, tolerance, preserve_topology=True
+                    ),
+                    shards,
+                )))
+        case 'coverage':
+            # One coverage: neighbours across shards share borders, so it
+            # is not sharded.
+            return shapely.coverage_simplify(geoms, tolerance)
+        case _:
+            raise ValueError(f'Unknown simplification mode {mode}')
+
+
+def simplify_features(
+    features: list[dict], tolerance: float, mode: str = 'compat',
+    workers: int | None = None,
+) -> list[dict]:
+    geoms = simplify_geometries(
+        features_to_geometries(features), tolerance, mode, workers
+    )
+    return [
+        {
+            'type': 'Feature',
+            'geometry': geometry,
+            'properties': feature['properties'],
+        }
+        for feature, geometry in zip(features, geometries_to_mappings(geoms))
+    ]
@@ -1,7 +1,15 @@
 import re
+from collections.abc import Sequence
+
 import polars as pl
 
+from hrelectviz.bootstrap import Bootstrap, bootstrap_intervals_f
 from hrelectviz.hrelection import HrElection, std_polars_config
+from hrelectviz.seatsvotes import (
+    SWINGS, SeatsVotes, seats_votes_f, seats_votes_metrics_f,
+)
+from hrelectviz.tablecache import DEFAULT_MAX_BYTES, TableCache, TableGraph
+from hrelectviz.tracing import traced
 
 major_parties = ['Democrat', 'Republican']
 gm_column_names = {
@@ -29,146 +37,222 @@ def shorten_column_name(col: str) -> str:
         'Democrat', 'D').replace('Republican', 'R')
     return col
 
-class GerryMeter:
-    def __init__(self, hr_elect: HrElection):
-        self.hr_elect = hr_elect
-        self.dfs: dict[str, pl.DataFrame] = {}
+# The metric functions below take the HrElection tables they depend on
+# and return a DataFrame or LazyFrame of the same kind. As with the table
+# functions of hrelection, `by` holds extra grouping keys (e.g. 'Year')
+# placed in front of 'State\nAbbr'.
 
-    def get_partisan_skew(self) -> pl.DataFrame:
-        if 'state_nwinners_by_party' not in self.hr_elect.dfs:
-            self.hr_elect.get_state_nwinners_by_party()
-        if 'aggregate_vote_by_state' not in self.hr_elect.dfs:
-            self.hr_elect.get_aggregate_vote_by_state()
-#        for name in ['state_nwinners_by_party', 'aggregate_vote_by_state']:
-#            frame = self.hr_elect.dfs[name]
-#            print(name, frame.columns)
-
-        df: pl.DataFrame = (
-            self.hr_elect.dfs['state_nwinners_by_party']
-            .select([
-                'State\nAbbr', 'State\nFIPS', 'Republican\ndelegate\ncount',
-                'Republican\ndelegate %', 'Democrat\ndelegate\ncount',
-                'Democrat\ndelegate %',
-            ])
-            .join(
-                self.hr_elect.dfs['aggregate_vote_by_state'].select([
-                    'State\nAbbr', 'State Vote %\nRepublican', 'State Vote %\nDemocrat',
-                ]),
-                on='State\nAbbr',
-            )
-            .with_columns(
-                (
-                    pl.col('Republican\ndelegate %')
-                    - pl.col('State Vote %\nRepublican')
-                ).alias('Skew towards\nRepublican'),
-                (
-                    pl.col('Democrat\ndelegate %') - pl.col('State Vote %\nDemocrat')
-                ).alias('Skew towards\nDemocrat'),
-            )
+
+def partisan_skew_f[F: (pl.DataFrame, pl.LazyFrame)](
+    state_nwinners_by_party: F, aggregate_vote_by_state: F,
+    by: Sequence[str] = (),
+) -> F:
+    return (
+        state_nwinners_by_party
+        .select([
+            *by,
+            'State\nAbbr', 'State\nFIPS', 'Republican\ndelegate\ncount',
+            'Republican\ndelegate %', 'Democrat\ndelegate\ncount',
+            'Democrat\ndelegate %',
+        ])
+        .join(
+            aggregate_vote_by_state.select([
+                *by,
+                'State\nAbbr', 'State Vote %\nRepublican', 'State Vote %\nDemocrat',
+            ]),
+            on=[*by, 'State\nAbbr'],
+        )
+        .with_columns(
+            (
+                pl.col('Republican\ndelegate %')
+                - pl.col('State Vote %\nRepublican')
+            ).alias('Skew towards\nRepublican'),
+            (
+                pl.col('Democrat\ndelegate %') - pl.col('State Vote %\nDemocrat')
+            ).alias('Skew towards\nDemocrat'),
         )
-        self.dfs['partisan_skew'] = df
-        return df
+    )
 
-    def get_mean_median_difference(self) -> pl.DataFrame:
 
-        nl = '\n'
-        def mean_median_cols(party: str) -> list[pl.Expr]:
-            return [
-                pl.col(f'District Vote{nl}{party}').mean(
-                ).round(1).alias(f'Mean share{nl}{party}'),
-                pl.col(f'District Vote{nl}{party}').median(
-                ).round(1).alias(f'Median share{nl}{party}'),
-            ]
-
-        def mean_median_difference_col(party: str) -> pl.Expr:
-            x: pl.Expr = (
-              pl.col(f'Mean share{nl}{party}') - pl.col(f'Median share{nl}{party}')
-              .round(1).alias('Mean-median\ndifference,\n{party}'))
-            return x
-
-        if 'aggregate_vote_by_district' not in self.hr_elect.dfs:
-            self.hr_elect.get_aggregate_vote_by_district().filter(
-                pl.col('State\nAbbr') != 'PR'
-            )
-        df: pl.DataFrame = (
-            self.hr_elect.dfs['aggregate_vote_by_district']
-            .group_by(pl.col('State\nAbbr'), maintain_order=True)
-            .agg(*mean_median_cols('Democrat'), *mean_median_cols('Republican'))
-        )
-        df = df.with_columns(
+def mean_median_difference_f[F: (pl.DataFrame, pl.LazyFrame)](
+    aggregate_vote_by_district: F, by: Sequence[str] = (),
+) -> F:
+    nl = '\n'
+    def mean_median_cols(party: str) -> list[pl.Expr]:
+        return [
+            pl.col(f'District Vote{nl}{party}').mean(
+            ).round(1).alias(f'Mean share{nl}{party}'),
+            pl.col(f'District Vote{nl}{party}').median(
+            ).round(1).alias(f'Median share{nl}{party}'),
+        ]
+
+    # Puerto Rico elects a resident commissioner by plurality, without
+    # major-party candidates.
+    return (
+        aggregate_vote_by_district
+        .filter(pl.col('State\nAbbr') != 'PR')
+        .group_by([*by, 'State\nAbbr'], maintain_order=True)
+        .agg(*mean_median_cols('Democrat'), *mean_median_cols('Republican'))
+        .with_columns(
             (pl.col('Mean share\nDemocrat') - pl.col('Median share\nDemocrat')
              ).alias('Mean-median difference\n(+ favors Republicans)'),
             (pl.col('Mean share\nRepublican') - pl.col('Median share\nRepublican')
              ).alias('Mean-median difference\n(+ favors Democrats)'),
         )
-        self.dfs['mean_median_difference'] = df
-        return df
-
-    def get_efficiency_gap(self) -> pl.DataFrame:
-        def x_wasted_vote(party: str) -> pl.Expr:
-            nl = '\n'
-            return (
-                pl.when(pl.col(f'District Vote{nl}{party}') >= pl.col('Needed\nto win'))
-                .then(pl.col(f'District Vote{nl}{party}') - pl.col('Needed\nto win'))
-                .otherwise(pl.col(f'District Vote{nl}{party}'))
-                .alias(f'Wasted{nl}{party}{nl}Votes')
-            )
+    )
 
-        def x_efficiency_gap_favoring(party: str) -> pl.Expr:
-            nl = '\n'
-            parties: list[str] = []
-            other_party = 'Republican' if party == 'Democrat' else 'Democrat'
-            return (
-                ((pl.col(f'Wasted{nl}{other_party}{nl}Votes')
-                    - pl.col(f'Wasted{nl}{party}{nl}Votes'))
-                  / pl.col('District Vote\nMajor Parties')
-                ).round(2).alias(f'{party}-leaning{nl}efficiency gap')
-            )
 
-        if 'aggregate_vote_by_district' not in self.hr_elect.dfs:
-            self.hr_elect.get_aggregate_vote_by_district()
-        x_needed_to_win = (
-            ((pl.col('District Vote\nMajor Parties') + 1.0) / 2.0)
-            .floor()
-            .cast(pl.Int32)
-            .alias('Needed\nto win')
+def efficiency_gap_f[F: (pl.DataFrame, pl.LazyFrame)](
+    aggregate_vote_by_district: F, by: Sequence[str] = (),
+) -> F:
+    def x_wasted_vote(party: str) -> pl.Expr:
+        nl = '\n'
+        return (
+            pl.when(pl.col(f'District Vote{nl}{party}') >= pl.col('Needed\nto win'))
+            .then(pl.col(f'District Vote{nl}{party}') - pl.col('Needed\nto win'))
+            .otherwise(pl.col(f'District Vote{nl}{party}'))
+            .alias(f'Wasted{nl}{party}{nl}Votes')
         )
-        df = (
-            self.hr_elect.dfs['aggregate_vote_by_district']
-            .with_columns(x_needed_to_win)
-            .with_columns(
-                x_wasted_vote('Republican'), x_wasted_vote('Democrat')
-            )
-            .group_by('State\nAbbr', maintain_order=True)
-            .agg(
-                pl.col('District Vote\nRepublican').sum(),
-                pl.col('District Vote\nDemocrat').sum(),
-                pl.col('District Vote\nMajor Parties').sum(),
-                pl.col('Wasted\nRepublican\nVotes').sum(),
-                pl.col('Wasted\nDemocrat\nVotes').sum(),
-            )
-            .with_columns(
-                x_efficiency_gap_favoring('Democrat'),
-                x_efficiency_gap_favoring('Republican'),
-            ).rename(lambda col: col.replace('District', 'State'))
+
+    def x_efficiency_gap_favoring(party: str) -> pl.Expr:
+        nl = '\n'
+        other_party = 'Republican' if party == 'Democrat' else 'Democrat'
+        return (
+            ((pl.col(f'Wasted{nl}{other_party}{nl}Votes')
+                - pl.col(f'Wasted{nl}{party}{nl}Votes'))
+              / pl.col('District Vote\nMajor Parties')
+            ).round(2).alias(f'{party}-leaning{nl}efficiency gap')
+        )
+
+    x_needed_to_win = (
+        ((pl.col('District Vote\nMajor Parties') + 1.0) / 2.0)
+        .floor()
+        .cast(pl.Int32)
+        .alias('Needed\nto win')
+    )
+    return (
+        aggregate_vote_by_district
+        .with_columns(x_needed_to_win)
+        .with_columns(
+            x_wasted_vote('Republican'), x_wasted_vote('Democrat')
+        )
+        .group_by([*by, 'State\nAbbr'], maintain_order=True)
+        .agg(
+            pl.col('District Vote\nRepublican').sum(),
+            pl.col('District Vote\nDemocrat').sum(),
+            pl.col('District Vote\nMajor Parties').sum(),
+            pl.col('Wasted\nRepublican\nVotes').sum(),
+            pl.col('Wasted\nDemocrat\nVotes').sum(),
+        )
+        .with_columns(
+            x_efficiency_gap_favoring('Democrat'),
+            x_efficiency_gap_favoring('Republican'),
+        ).rename(lambda col: col.replace('District', 'State'))
+    )
+
+
+def gerrymander_metrics_f[F: (pl.DataFrame, pl.LazyFrame)](
+    partisan_skew: F, mean_median_difference: F, efficiency_gap: F,
+    by: Sequence[str] = (),
+) -> F:
+    on = [*by, 'State\nAbbr']
+    return (
+        partisan_skew
+        .join(mean_median_difference, on=on)
+        .join(efficiency_gap, on=on)
+    )
+
+
+# metric name -> (names of input tables, function computing it from them)
+METRICS: TableGraph = {
+    'partisan_skew': (
+        ('state_nwinners_by_party', 'aggregate_vote_by_state'),
+        partisan_skew_f,
+    ),
+    'mean_median_difference':
+        (('aggregate_vote_by_district',), mean_median_difference_f),
+    'efficiency_gap': (('aggregate_vote_by_district',), efficiency_gap_f),
+    'gerrymander_metrics': (
+        ('partisan_skew', 'mean_median_difference', 'efficiency_gap'),
+        gerrymander_metrics_f,
+    ),
+    # with the default swings and uniform swing
+    'seats_votes_metrics': (
+        ('aggregate_vote_by_district',),
+        lambda df: seats_votes_metrics_f(seats_votes_f(df)),
+    ),
+}
+
+
+class GerryMeter:
+    def __init__(self, hr_elect: HrElection,
+                 max_bytes: int | None = DEFAULT_MAX_BYTES):
+        # Metrics are computed on first access from the tables of
+        # hr_elect, and dropped when the tables they depend on change.
+        self.hr_elect = hr_elect
+        self.dfs = TableCache(
+            METRICS, 'GerryMeter', upstream=hr_elect.dfs, max_bytes=max_bytes
+        )
+
+    def get_partisan_skew(self) -> pl.DataFrame:
+        return self.dfs['partisan_skew']
+
+    def get_mean_median_difference(
+        self, bootstrap: Bootstrap | None = None
+    ) -> pl.DataFrame:
+        return self.with_intervals('mean_median_difference', bootstrap)
+
+    def get_efficiency_gap(
+        self, bootstrap: Bootstrap | None = None
+    ) -> pl.DataFrame:
+        return self.with_intervals('efficiency_gap', bootstrap)
+
+    @traced()
+    def get_bootstrap_intervals(
+        self, bootstrap: Bootstrap = Bootstrap()
+    ) -> pl.DataFrame:
+        return bootstrap_intervals_f(
+            self.hr_elect.dfs['aggregate_vote_by_district'], bootstrap
+        )
+
+    def with_intervals(self, name: str, bootstrap: Bootstrap | None
+                       ) -> pl.DataFrame:
+        # The metric table name, with the confidence interval columns of
+        # its metrics after the existing columns when bootstrap is given.
+        df = self.dfs[name]
+        if bootstrap is None:
+            return df
+        intervals = self.get_bootstrap_intervals(bootstrap)
+        return df.join(
+            intervals.select(
+                'State\nAbbr',
+                *[f'{col}\nCI {end}' for col in df.columns
+                  for end in ['low', 'high']
+                  if f'{col}\nCI {end}' in intervals.columns],
+            ),
+            on='State\nAbbr', how='left',
         )
-        self.dfs['efficiency_gap'] = df
-        return df
 
     def get_gerrymander_metrics(self) -> pl.DataFrame:
-        if 'partisan_skew' not in self.dfs:
-            self.get_partisan_skew()
-        if 'mean_median_difference' not in self.dfs:
-            self.get_mean_median_difference()
-        if 'efficiency_gap' not in self.dfs:
-            self.get_efficiency_gap()
-        df: pl.DataFrame = (
-            self.dfs['partisan_skew']
-            .join(self.dfs['mean_median_difference'], on='State\nAbbr')
-            .join(self.dfs['efficiency_gap'], on='State\nAbbr')
+        if self.hr_elect.lazy and 'gerrymander_metrics' not in self.dfs:
+            self.hr_elect.collect(
+                'state_nwinners_by_party', 'aggregate_vote_by_state',
+                'aggregate_vote_by_district',
+            )
+        return self.dfs['gerrymander_metrics']
+
+    @traced()
+    def get_seats_votes(self, swings=SWINGS, method='uniform') -> SeatsVotes:
+        return seats_votes_f(
+            self.hr_elect.dfs['aggregate_vote_by_district'], swings, method
         )
-        self.dfs['gerrymander_metrics'] = df
-        return df
+
+    def get_seats_votes_metrics(
+        self, swings=SWINGS, method='uniform'
+    ) -> pl.DataFrame:
+        if swings is SWINGS and method == 'uniform':
+            return self.dfs['seats_votes_metrics']
+        return seats_votes_metrics_f(self.get_seats_votes(swings, method))
 
 def get_color_col_name(df_name: str, party: str) -> str:
     match df_name:
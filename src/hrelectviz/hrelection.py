@@ -1,6 +1,12 @@
+from collections.abc import Sequence
 from datetime import datetime
 import polars as pl
 import hrelectviz.ushelper as ush
+from hrelectviz.resultstore import (
+    ELECTION_DATA_DIR, RESULT_STORE_DIR, scan_election_results,
+)
+from hrelectviz.tablecache import DEFAULT_MAX_BYTES, TableCache, TableGraph
+from hrelectviz.tracing import span
 
 
 def get_most_recent_house_election_year() -> int:
@@ -53,121 +59,101 @@ def std_polars_config() -> pl.Config:
     )
 
 
-class HrElection:
-    def __init__(self, year=2024):
-        is_at_large_x = pl.col('State\nAbbr').is_in(ush.at_large_states_abbrs)
-        is_territory_x = pl.col('State\nAbbr').is_in(ush.territory_abbrs)
-
-        house_clerk_csv_path = f'./election-data/elections{year}.csv'
-        self.dfs = {}
-        df = (
-            pl.read_csv(house_clerk_csv_path)
-            .with_columns(
-                pl.col('StateTerritory')
-                .replace(ush.ucname_to_abbr)
-                .alias('State\nAbbr'),
-                pl.col('StateTerritory')
-                .replace(ush.ucname_to_fips)
-                .alias('State\nFIPS'),
-            )
-            .with_columns(
-                pl.when(is_at_large_x | is_territory_x)
-                .then(pl.lit('1'))
-                .otherwise(pl.col('District'))
-                .alias('d_number_'),
-                pl.when(is_at_large_x)
-                .then(pl.lit('00'))
-                .otherwise(
-                    pl.when(is_territory_x)
-                    .then(pl.lit('98'))
-                    .otherwise(pl.col('District').str.zfill(2))
-                )
-                .alias('District\nFIPS'),
-            )
-        )
-        df = df.with_columns(
-            pl.col('d_number_').cast(pl.Int8).alias('District\nNumber'),
+# Each derived table is computed by one of the functions below from a
+# single input table. They accept either a DataFrame or a LazyFrame, so
+# the eager getters of HrElection and its lazy plans share one definition.
+# The optional `by` columns (e.g. 'Year') are extra grouping keys placed
+# in front of the state and district keys, so that several elections
+# held in one frame are computed in a single pass.
+
+
+def states_f[F: (pl.DataFrame, pl.LazyFrame)](frame: F) -> F:
+    return frame.filter(pl.col('State\nAbbr').is_in(ush.state_abbrs))
+
+
+def ndistricts_per_state_f[F: (pl.DataFrame, pl.LazyFrame)](
+    frame: F, by: Sequence[str] = (),
+) -> F:
+    return (
+        frame.select([*by, *SD_COLS]).unique()
+        .group_by([*by, 'State\nAbbr'])
+        .agg(pl.len().alias('Number of\nDistricts'))
+    )
+
+
+def districts_ranked_by_vote_f[F: (pl.DataFrame, pl.LazyFrame)](
+    frame: F, by: Sequence[str] = (),
+) -> F:
+    return (
+        frame
+        .sort(
+            [*by, *SD_COLS, 'Vote'],
+            descending=[False] * (len(by) + len(SD_COLS)) + [True],
         )
-        self.dfs['states_and_territories'] = df
-        self.dfs['states'] = df.filter(
-            pl.col('State\nAbbr').is_in(ush.state_abbrs)
+        .select(
+            [*by, *SD_COLS]
+            + ['State\nFIPS', 'District\nFIPS', 'Party', 'Name', 'Vote']
         )
+    )
 
-    def get_ndistricts_per_state(self) -> pl.DataFrame:
-        df: pl.DataFrame = (
-            self.dfs['states_and_territories'].select(SD_COLS).unique()
-            .group_by('State\nAbbr')
-            .agg(pl.len().alias('Number of\nDistricts'))
-        )
-        self.dfs['districts_per_state'] = df
-        return df
 
-    def get_districts_ranked_by_vote(self) -> pl.DataFrame:
-        df: pl.DataFrame = (
-            self.dfs['states_and_territories']
-            .sort(SD_COLS + ['Vote'], descending=[False, False, True])
-            .select(
-                SD_COLS
-                + ['State\nFIPS', 'District\nFIPS', 'Party', 'Name', 'Vote']
-            )
+def district_winners_f[F: (pl.DataFrame, pl.LazyFrame)](
+    frame: F, by: Sequence[str] = (),
+) -> F:
+    return (
+        frame
+        .group_by([*by, *SD_COLS], maintain_order=True)
+        .first()
+        .select(
+            [*by, *SD_COLS]
+            + ['State\nFIPS', 'District\nFIPS', 'Party', 'Name']
         )
-        self.dfs['districts_ranked_by_vote'] = df
-        return df
+    )
 
-    def get_district_winners(self) -> pl.DataFrame:
-        if 'districts_ranked_by_vote' not in self.dfs:
-            self.get_districts_ranked_by_vote()
-        df: pl.DataFrame = (
-            self.dfs['districts_ranked_by_vote']
-            .group_by(SD_COLS, maintain_order=True)
-            .first()
-            .select(SD_COLS + ['State\nFIPS', 'District\nFIPS', 'Party', 'Name'])
-        )
-        self.dfs['district_winners'] = df
-        return df
 
-    def get_district_major_party_vote(self) -> pl.DataFrame:
-        if 'districts_ranked_by_vote' not in self.dfs:
-            self.get_districts_ranked_by_vote()
-        df: pl.DataFrame = (
-            self.dfs['districts_ranked_by_vote']
-            .select(['State\nAbbr', 'District\nNumber', 'Party', 'Vote'])
-            .with_columns(major_party_selector.alias('Party'))
-            .group_by(
-                ['State\nAbbr', 'District\nNumber', 'Party'],
-                maintain_order=True,
-            )
-            .sum()
-            .filter(pl.col('Party').is_in(['Republican', 'Democrat']))
-            .pivot('Party', index=SD_COLS)
-            .fill_null(0)
-        ).rename({x: f'Total vote for\n{x} candidates'
-                 for x in ['Democrat', 'Republican']})
-        self.dfs['district_major_party_vote'] = df
-        return df
+# The two tables below were formerly built with DataFrame.pivot. They use
+# one filtered aggregation per party instead, which needs no knowledge of
+# the pivoted values and so also works on a LazyFrame.
 
-    def get_district_winners_with_major_party(self) -> pl.DataFrame:
-        if 'district_winners' not in self.dfs:
-            self.get_district_winners()
-        df: pl.DataFrame = self.dfs['district_winners'].with_columns(
-            major_party_selector.alias('Party')
+
+def district_major_party_vote_f[F: (pl.DataFrame, pl.LazyFrame)](
+    frame: F, by: Sequence[str] = (),
+) -> F:
+    parties = ['Democrat', 'Republican']
+    return (
+        frame
+        .select([*by, 'State\nAbbr', 'District\nNumber', 'Party', 'Vote'])
+        .with_columns(major_party_selector.alias('Party'))
+        .filter(pl.col('Party').is_in(parties))
+        .group_by([*by, *SD_COLS], maintain_order=True)
+        .agg(
+            pl.col('Vote').filter(pl.col('Party') == party).sum()
+            .alias(f'Total vote for\n{party} candidates')
+            for party in parties
         )
-        self.dfs['district_winners_with_major_party'] = df
-        return df
+    )
 
-    def get_state_nwinners_by_party(self) -> pl.DataFrame:
-        x_total_delegates = pl.col('Republican') + pl.col('Democrat')
-        if 'district_winners_with_major_party' not in self.dfs:
-            self.get_district_winners_with_major_party()
-        df: pl.DataFrame = (
-            self.dfs['district_winners_with_major_party']
-            .group_by(['State\nAbbr', 'Party'], maintain_order=True)
-            .len()
-            .pivot('Party', index=['State\nAbbr'], values='len')
-            .fill_null(0)
+
+def district_winners_with_major_party_f[F: (pl.DataFrame, pl.LazyFrame)](
+    frame: F,
+) -> F:
+    return frame.with_columns(major_party_selector.alias('Party'))
+
+
+def state_nwinners_by_party_f[F: (pl.DataFrame, pl.LazyFrame)](
+    frame: F, by: Sequence[str] = (),
+) -> F:
+    x_total_delegates = pl.col('Republican') + pl.col('Democrat')
+    return (
+        frame
+        .group_by([*by, 'State\nAbbr'], maintain_order=True)
+        .agg(
+            (pl.col('Party') == party).sum().alias(party)
+            for party in ['Republican', 'Democrat']
         )
-        df = df.with_columns(
-            pl.col('State\nAbbr').replace(ush.abbr_to_fips).alias('State\nFIPS'),
+        .with_columns(
+            pl.col('State\nAbbr').replace(ush.abbr_to_fips)
+            .alias('State\nFIPS'),
             ((pl.col('Republican') * 100) / x_total_delegates)
             .round(1)
             .alias('Republican\ndelegate %'),
@@ -175,6 +161,7 @@ class HrElection:
             .round(1)
             .alias('Democrat\ndelegate %'),
         ).select(
+            *by,
             pl.col('State\nAbbr'),
             pl.col('State\nFIPS'),
             pl.col('Republican').alias('Republican\ndelegate\ncount'),
@@ -182,69 +169,192 @@ class HrElection:
             pl.col('Republican\ndelegate %'),
             pl.col('Democrat\ndelegate %'),
         )
-        print('state_nwinners_by_party', df.columns)
-        self.dfs['state_nwinners_by_party'] = df
-        return df
+    )
 
-    def get_aggregate_vote_by_state(self) -> pl.DataFrame:
-        df: pl.DataFrame = (
-            self.dfs['states_and_territories']
-            .group_by('State\nAbbr', maintain_order=True)
-            .agg(
-                [
-                    pl.col('Vote')
-                    .filter(x_is_affiliate_of('Democrat'))
-                    .sum()
-                    .alias('State Vote\nDemocrat'),
-                    pl.col('Vote')
-                    .filter(x_is_affiliate_of('Republican'))
-                    .sum()
-                    .alias('State Vote\nRepublican'),
-                    pl.col('Vote').sum().alias('State Vote\nAll Parties'),
-                ]
+
+def aggregate_vote_by_state_f[F: (pl.DataFrame, pl.LazyFrame)](
+    frame: F, by: Sequence[str] = (),
+) -> F:
+    return (
+        frame
+        .group_by([*by, 'State\nAbbr'], maintain_order=True)
+        .agg(
+            [
+                pl.col('Vote')
+                .filter(x_is_affiliate_of('Democrat'))
+                .sum()
+                .alias('State Vote\nDemocrat'),
+                pl.col('Vote')
+                .filter(x_is_affiliate_of('Republican'))
+                .sum()
+                .alias('State Vote\nRepublican'),
+                pl.col('Vote').sum().alias('State Vote\nAll Parties'),
+            ]
+        )
+        .with_columns(
+            (pl.col('State Vote\nDemocrat') + pl.col('State Vote\nRepublican'))
+            .alias('State Vote\nMajor Parties'),
+            (
+                pl.col('State Vote\nDemocrat')
+                / pl.col('State Vote\nAll Parties') * 100
             )
-            .with_columns(
-                pl.col('State Vote\nDemocrat') + pl.col('State Vote\nRepublican')
-                    .sum().alias('State Vote\nMajor Parties'),
-                (pl.col('State Vote\nDemocrat') / pl.col('State Vote\nAll Parties') * 100)
-                .round(1).alias('State Vote %\nDemocrat'),
-                (pl.col('State Vote\nRepublican') / pl.col('State Vote\nAll Parties') * 100)
-                .round(1).alias('State Vote %\nRepublican'),
+            .round(1).alias('State Vote %\nDemocrat'),
+            (
+                pl.col('State Vote\nRepublican')
+                / pl.col('State Vote\nAll Parties') * 100
             )
+            .round(1).alias('State Vote %\nRepublican'),
         )
-        self.dfs['aggregate_vote_by_state'] = df
-        return df
+    )
 
-    def get_aggregate_vote_by_district(self) -> pl.DataFrame:
-        df: pl.DataFrame = (
-            self.dfs['states_and_territories']
-            .group_by(SD_COLS, maintain_order=True)
-            .agg(
-                [
-                    pl.col('Vote')
-                    .filter(x_is_affiliate_of('Democrat'))
-                    .sum()
-                    .alias('District Vote\nDemocrat'),
-                    pl.col('Vote')
-                    .filter(x_is_affiliate_of('Republican'))
-                    .sum()
-                    .alias('District Vote\nRepublican'),
-                ]
-            )
-            .with_columns(
-                (pl.col('District Vote\nDemocrat')
-                    + pl.col('District Vote\nRepublican')).alias(
-                    'District Vote\nMajor Parties'
-                )
-            )
-            .with_columns(
-                ((pl.col('District Vote\nDemocrat')
-                    / pl.col('District Vote\nMajor Parties'))
-                  * 100).round(1).alias('District Vote %\nDemocrat'),
-                ((pl.col('District Vote\nRepublican')
-                  / pl.col('District Vote\nMajor Parties'))
-                  * 100).round(1).alias('District Vote %\nRepublican')
+
+def aggregate_vote_by_district_f[F: (pl.DataFrame, pl.LazyFrame)](
+    frame: F, by: Sequence[str] = (),
+) -> F:
+    return (
+        frame
+        .group_by([*by, *SD_COLS], maintain_order=True)
+        .agg(
+            [
+                pl.col('Vote')
+                .filter(x_is_affiliate_of('Democrat'))
+                .sum()
+                .alias('District Vote\nDemocrat'),
+                pl.col('Vote')
+                .filter(x_is_affiliate_of('Republican'))
+                .sum()
+                .alias('District Vote\nRepublican'),
+            ]
+        )
+        .with_columns(
+            (pl.col('District Vote\nDemocrat')
+                + pl.col('District Vote\nRepublican')).alias(
+                'District Vote\nMajor Parties'
             )
         )
-        self.dfs['aggregate_vote_by_district'] = df
-        return df
\ No newline at end of file
+        .with_columns(
+            ((pl.col('District Vote\nDemocrat')
+                / pl.col('District Vote\nMajor Parties'))
+              * 100).round(1).alias('District Vote %\nDemocrat'),
+            ((pl.col('District Vote\nRepublican')
+              / pl.col('District Vote\nMajor Parties'))
+              * 100).round(1).alias('District Vote %\nRepublican')
+        )
+    )
+
+
+# table name -> (names of input tables, function computing it from them)
+TABLES: TableGraph = {
+    'states': (('states_and_territories',), states_f),
+    'ndistricts_per_state':
+        (('states_and_territories',), ndistricts_per_state_f),
+    'districts_ranked_by_vote':
+        (('states_and_territories',), districts_ranked_by_vote_f),
+    'district_winners': (('districts_ranked_by_vote',), district_winners_f),
+    'district_major_party_vote':
+        (('districts_ranked_by_vote',), district_major_party_vote_f),
+    'district_winners_with_major_party':
+        (('district_winners',), district_winners_with_major_party_f),
+    'state_nwinners_by_party':
+        (('district_winners_with_major_party',), state_nwinners_by_party_f),
+    'aggregate_vote_by_state':
+        (('states_and_territories',), aggregate_vote_by_state_f),
+    'aggregate_vote_by_district':
+        (('states_and_territories',), aggregate_vote_by_district_f),
+}
+
+SHARED_INPUTS = {
+    input_name for inputs, _ in TABLES.values() for input_name in inputs
+}
+
+
+class HrElection:
+    def __init__(
+        self, year=2024, lazy=False, data_dir=ELECTION_DATA_DIR,
+        store_dir=RESULT_STORE_DIR, states: list[str] | None = None,
+        max_bytes: int | None = DEFAULT_MAX_BYTES,
+    ):
+        # Results are read from the Parquet result store when the year has
+        # been ingested there, and from the House Clerk CSV otherwise.
+        # `states` restricts the load to the given state abbreviations.
+        # Derived tables are held in self.dfs, computed on first access
+        # and evicted (least recently used first) beyond max_bytes; in lazy
+        # mode they are collected from the plans in self.lfs.
+        self.lazy = lazy
+        self.lfs: dict[str, pl.LazyFrame] = {}
+        self.dfs = TableCache(
+            TABLES, 'HrElection', max_bytes=max_bytes,
+            compute=self.collect_plans if lazy else None,
+            on_invalidate=self.drop_plan,
+        )
+        lf = scan_election_results(year, states, data_dir=data_dir,
+                                   store_dir=store_dir)
+        if lazy:
+            self.lfs['states_and_territories'] = lf.cache()
+            return
+        with span('HrElection.load', year=year) as sp:
+            df = lf.collect()
+            sp.frame(df)
+        self.dfs['states_and_territories'] = df
+
+    def drop_plan(self, name: str) -> None:
+        # The plan of a source table stays: it is the scan to fall back
+        # on. Plans built on it are rebuilt from the current table.
+        if name in TABLES:
+            self.lfs.pop(name, None)
+
+    def plan(self, name: str) -> pl.LazyFrame:
+        if name in self.dfs:
+            return self.dfs[name].lazy()
+        if name not in self.lfs:
+            inputs, table_f = TABLES[name]
+            lf = table_f(*[self.plan(input_name) for input_name in inputs])
+            # Tables feeding other tables are computed once per collect.
+            if name in SHARED_INPUTS:
+                lf = lf.cache()
+            self.lfs[name] = lf
+        return self.lfs[name]
+
+    def collect_plans(self, names: list[str]) -> dict[str, pl.DataFrame]:
+        with span('HrElection.collect', tables=names):
+            frames = pl.collect_all([self.plan(name) for name in names])
+        return dict(zip(names, frames))
+
+    def collect(self, *names: str) -> dict[str, pl.DataFrame]:
+        # All plans not yet materialized are collected together, so that
+        # their common subplans (the CSV scan, the ranking sort, ...) run
+        # only once.
+        collected = self.collect_plans(
+            [name for name in names if name not in self.dfs]
+        ) if self.lazy else {}
+        for name, df in collected.items():
+            self.dfs.store(name, df)
+        self.dfs.evict()
+        return {
+            name: collected[name] if name in collected else self.dfs[name]
+            for name in names
+        }
+
+    def get_ndistricts_per_state(self) -> pl.DataFrame:
+        return self.dfs['ndistricts_per_state']
+
+    def get_districts_ranked_by_vote(self) -> pl.DataFrame:
+        return self.dfs['districts_ranked_by_vote']
+
+    def get_district_winners(self) -> pl.DataFrame:
+        return self.dfs['district_winners']
+
+    def get_district_major_party_vote(self) -> pl.DataFrame:
+        return self.dfs['district_major_party_vote']
+
+    def get_district_winners_with_major_party(self) -> pl.DataFrame:
+        return self.dfs['district_winners_with_major_party']
+
+    def get_state_nwinners_by_party(self) -> pl.DataFrame:
+        return self.dfs['state_nwinners_by_party']
+
+    def get_aggregate_vote_by_state(self) -> pl.DataFrame:
+        return self.dfs['aggregate_vote_by_state']
+
+    def get_aggregate_vote_by_district(self) -> pl.DataFrame:
+        return self.dfs['aggregate_vote_by_district']
@@ -0,0 +1,25 @@
+import importlib.util
+import sys
+from types import ModuleType
+
+# Deferred imports of heavy dependencies (shapely, pyproj, pyshp, plotly):
+#   shapely = lazy_import('shapely')
+# binds a module object that is executed on first attribute access, so
+# importing a module of this package costs nothing for the dependencies
+# only some of its functions use. Annotations that name such a module
+# must not be evaluated at import time (from __future__ import
+# annotations), or the first def would load it.
+
+
+def lazy_import(name: str) -> ModuleType:
+    if (module := sys.modules.get(name)) is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f'No module named {name!r}', name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
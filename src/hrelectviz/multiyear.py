@@ -0,0 +1,107 @@
+import polars as pl
+
+from hrelectviz.gerrymeter import (
+    efficiency_gap_f, gerrymander_metrics_f, mean_median_difference_f,
+    partisan_skew_f,
+)
+from hrelectviz.hrelection import (
+    aggregate_vote_by_district_f, aggregate_vote_by_state_f,
+    district_winners_f, district_winners_with_major_party_f,
+    districts_ranked_by_vote_f, state_nwinners_by_party_f,
+)
+from hrelectviz.resultstore import (
+    ELECTION_DATA_DIR, RESULT_STORE_DIR, available_years,
+    scan_election_results,
+)
+from hrelectviz.tracing import span
+
+BY_YEAR = ['Year']
+
+
+def scan_election_year(
+    year: int, data_dir: str = ELECTION_DATA_DIR,
+    store_dir: str = RESULT_STORE_DIR,
+) -> pl.LazyFrame:
+    return scan_election_results(
+        year, data_dir=data_dir, store_dir=store_dir
+    ).select(pl.lit(year, dtype=pl.Int16).alias('Year'), pl.all())
+
+
+class MultiYearHrElection:
+    # All House elections found in data_dir, held in one long frame with a
+    # 'Year' column. Metrics for every cycle come out of one grouped query.
+
+    def __init__(
+        self, years: list[int] | None = None,
+        data_dir: str = ELECTION_DATA_DIR,
+        store_dir: str = RESULT_STORE_DIR,
+    ):
+        self.years = sorted(years or available_years(data_dir, store_dir))
+        self.dfs: dict[str, pl.DataFrame] = {}
+        # The inputs of a concat are scanned in parallel by polars.
+        with span('MultiYearHrElection.load', years=self.years) as sp:
+            self.dfs['states_and_territories'] = pl.concat(
+                [
+                    scan_election_year(year, data_dir, store_dir)
+                    for year in self.years
+                ],
+                how='diagonal_relaxed',
+            ).collect()
+            sp.frame(self.dfs['states_and_territories'])
+
+    def plan_gerrymander_metrics(self) -> pl.LazyFrame:
+        source = self.dfs['states_and_territories'].lazy()
+        winners = district_winners_with_major_party_f(
+            district_winners_f(
+                districts_ranked_by_vote_f(source, BY_YEAR), BY_YEAR
+            )
+        )
+        by_district = aggregate_vote_by_district_f(source, BY_YEAR)
+        return gerrymander_metrics_f(
+            partisan_skew_f(
+                state_nwinners_by_party_f(winners, BY_YEAR),
+                aggregate_vote_by_state_f(source, BY_YEAR),
+                BY_YEAR,
+            ),
+            mean_median_difference_f(by_district, BY_YEAR),
+            efficiency_gap_f(by_district, BY_YEAR),
+            BY_YEAR,
+        )
+
+    def get_gerrymander_metrics(self) -> pl.DataFrame:
+        if 'gerrymander_metrics' not in self.dfs:
+            with span('MultiYearHrElection.get_gerrymander_metrics') as sp:
+                self.dfs['gerrymander_metrics'] = (
+                    self.plan_gerrymander_metrics().collect()
+                )
+                sp.frame(self.dfs['gerrymander_metrics'])
+        return self.dfs['gerrymander_metrics']
+
+    def get_gerrymander_metrics_for_year(self, year: int) -> pl.DataFrame:
+        return (
+            self.get_gerrymander_metrics()
+            .filter(pl.col('Year') == year)
+            .drop('Year')
+        )
+
+    def trend(
+        self, column: str, state_abbr: str,
+        first_year: int | None = None, last_year: int | None = None,
+    ) -> pl.DataFrame:
+        # e.g. trend('Democrat-leaning\nefficiency gap', 'NC', 2012, 2024)
+        first_year = first_year or self.years[0]
+        last_year = last_year or self.years[-1]
+        return (
+            self.get_gerrymander_metrics()
+            .filter(
+                (pl.col('State\nAbbr') == state_abbr)
+                & pl.col('Year').is_between(first_year, last_year)
+            )
+            .select('Year', column)
+            .sort('Year')
+        )
+
+
+if __name__ == '__main__':
+    multi_year = MultiYearHrElection()
+    print(multi_year.trend('Democrat-leaning\nefficiency gap', 'NC'))
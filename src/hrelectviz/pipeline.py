@@ -0,0 +1,247 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import NamedTuple
+
+from hrelectviz.geocache import (  # noqa: F401
+    DEFAULT_CACHE_DIR, file_digest, source_digest,
+)
+from hrelectviz.tracing import span
+
+# An incremental build of file artifacts. A stage declares the files it
+# reads and writes; stages that read a file another stage writes run
+# after it. The content digest of every input and output of a stage is
+# recorded when it succeeds, and a later run rebuilds a stage only when
+# one of its inputs (or its params) changed, or an output is missing or
+# was changed by hand. A rebuilt stage whose outputs come out identical
+# leaves the stages after it untouched. Stages not ordered by their
+# files run in parallel on a thread pool (stages are I/O, polars and
+# subprocess bound).
+
+DEFAULT_STATE_PATH = os.path.join(DEFAULT_CACHE_DIR, 'pipeline', 'state.json')
+
+
+class Stage(NamedTuple):
+    name: str
+    inputs: tuple[str, ...]
+    outputs: tuple[str, ...]
+    run: Callable[[], object]
+    # Whatever else the outputs depend on, e.g. a URL or a tolerance.
+    params: str = ''
+    # Run every time, e.g. a download revalidated against its server;
+    # unchanged outputs still leave later stages untouched.
+    volatile: bool = False
+
+
+def norm(path: str) -> str:
+    return os.path.normpath(path)
+
+
+def digests(paths: Iterable[str]) -> dict[str, str | None]:
+    return {
+        path: file_digest(path) if os.path.exists(path) else None
+        for path in paths
+    }
+
+
+class Pipeline:
+    def __init__(self, stages: Iterable[Stage],
+                 state_path: str = DEFAULT_STATE_PATH,
+                 max_workers: int | None = None):
+        self.stages: dict[str, Stage] = {}
+        self.producer: dict[str, str] = {}
+        for stage in stages:
+            stage = stage._replace(
+                inputs=tuple(map(norm, stage.inputs)),
+                outputs=tuple(map(norm, stage.outputs)),
+            )
+            if stage.name in self.stages:
+                raise ValueError(f'Duplicate stage {stage.name}')
+            self.stages[stage.name] = stage
+            for output in stage.outputs:
+                if output in self.producer:
+                    raise ValueError(
+                        f'{output} is written by both '
+                        f'{self.producer[output]} and {stage.name}'
+                    )
+                self.producer[output] = stage.name
+        self.upstream: dict[str, set[str]] = {
+            name: {
+                self.producer[path] for path in stage.inputs
+                if path in self.producer
+            }
+            for name, stage in self.stages.items()
+        }
+        self.check_acyclic()
+        self.state_path = state_path
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+        self.state: dict[str, dict] = self.load_state()
+
+    def check_acyclic(self) -> None:
+        done: set[str] = set()
+        visiting: set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f'Stage {name} depends on itself')
+            visiting.add(name)
+            for dep in self.upstream[name]:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def load_state(self) -> dict[str, dict]:
+        try:
+            with open(self.state_path) as fh:
+                return json.load(fh)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def save_state(self) -> None:
+        # Called with self.lock held.
+        state_dir = os.path.dirname(self.state_path) or '.'
+        os.makedirs(state_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=state_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as fh:
+            json.dump(self.state, fh, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.state_path)
+
+    def select(self, patterns: Iterable[str] = ()) -> set[str]:
+        # The stages whose names contain one of patterns (all stages if
+        # none), with every stage they depend on.
+        patterns = list(patterns)
+        selected = {
+            name for name in self.stages
+            if not patterns or any(pattern in name for pattern in patterns)
+        }
+        todo = list(selected)
+        while todo:
+            for dep in self.upstream[todo.pop()]:
+                if dep not in selected:
+                    selected.add(dep)
+                    todo.append(dep)
+        return selected
+
+    def stale_reason(self, stage: Stage) -> str | None:
+        # Why stage must run, or None when its outputs are up to date.
+        if stage.volatile:
+            return 'volatile'
+        record = self.state.get(stage.name)
+        if record is None:
+            return 'never built'
+        if record.get('params') != stage.params:
+            return 'params changed'
+        for path, digest in digests(stage.inputs).items():
+            if digest is None:
+                return f'missing input {path}'
+            if record['inputs'].get(path) != digest:
+                return f'input changed: {path}'
+        for path, digest in digests(stage.outputs).items():
+            if digest is None:
+                return f'missing output {path}'
+            if record['outputs'].get(path) != digest:
+                return f'output changed: {path}'
+        return None
+
+    def build(self, stage: Stage, force: bool) -> str:
+        reason = 'forced' if force else self.stale_reason(stage)
+        if reason is None:
+            return 'fresh'
+        missing = [path for path in stage.inputs if not os.path.exists(path)]
+        if missing:
+            # Nothing to build from (e.g. only the scraped CSV of a year
+            # is at hand): the existing outputs, if any, stand, and later
+            # stages build from whatever they find.
+            print(f'{stage.name}: not building, missing {missing[0]}',
+                  file=sys.stderr)
+            if all(os.path.exists(path) for path in stage.outputs):
+                return 'fresh'
+            return 'missing'
+        print(f'{stage.name}: building ({reason})', file=sys.stderr)
+        with span('Pipeline.stage', stage=stage.name, reason=reason):
+            input_digests = digests(stage.inputs)
+            stage.run()
+        output_digests = digests(stage.outputs)
+        if missing := [p for p, d in output_digests.items() if d is None]:
+            raise FileNotFoundError(
+                f'{stage.name}: did not write {missing[0]}'
+            )
+        with self.lock:
+            changed = (
+                self.state.get(stage.name, {}).get('outputs')
+                != output_digests
+            )
+            self.state[stage.name] = {
+                'inputs': input_digests, 'outputs': output_digests,
+                'params': stage.params,
+            }
+            self.save_state()
+        return 'built' if changed else 'unchanged'
+
+    def run(self, patterns: Iterable[str] = (), force: bool = False,
+            dry_run: bool = False) -> dict[str, str]:
+        # Status of each selected stage: 'built', 'unchanged' (rebuilt,
+        # same outputs), 'fresh', 'missing' (no inputs to build from),
+        # 'failed', or 'skipped' (after a failed stage); with dry_run,
+        # why each stage would run.
+        selected = self.select(patterns)
+        status: dict[str, str] = {}
+        if dry_run:
+            for name in self.order(selected):
+                stage = self.stages[name]
+                stale = any(
+                    status[dep] != 'fresh' for dep in self.upstream[name]
+                )
+                reason = ('forced' if force else self.stale_reason(stage)
+                          or ('upstream' if stale else None))
+                status[name] = reason or 'fresh'
+            return status
+
+        pending = set(selected)
+        running: dict = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name in sorted(pending):
+                    deps = self.upstream[name] & selected
+                    if any(status.get(dep) in ('failed', 'skipped')
+                           for dep in deps):
+                        status[name] = 'skipped'
+                        pending.discard(name)
+                    elif all(dep in status for dep in deps):
+                        pending.discard(name)
+                        future = executor.submit(
+                            self.build, self.stages[name], force
+                        )
+                        running[future] = name
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        status[name] = future.result()
+                    except Exception as exc:
+                        print(f'{name}: failed: {exc}', file=sys.stderr)
+                        status[name] = 'failed'
+        return status
+
+    def order(self, names: set[str]) -> list[str]:
+        # names in an order where every stage follows its upstream stages.
+        ordered: list[str] = []
+        placed: set[str] = set()
+        while len(ordered) < len(names):
+            for name in sorted(names - placed):
+                if self.upstream[name] & names <= placed:
+                    ordered.append(name)
+                    placed.add(name)
+        return ordered
@@ -0,0 +1,196 @@
+import os
+import re
+import sys
+import warnings
+
+import polars as pl
+
+from hrelectviz.geocache import file_digest
+import hrelectviz.ushelper as ush
+
+ELECTION_DATA_DIR = './election-data'
+RESULT_STORE_DIR = os.path.join(ELECTION_DATA_DIR, 'store')
+
+# Columns of the normalized per-candidate table as stored in Parquet. The
+# derived state and district columns are computed once, at ingest time.
+RESULT_SCHEMA: dict[str, type[pl.DataType] | pl.DataType] = {
+    'StateTerritory': pl.String,
+    'District': pl.String,
+    'Name': pl.String,
+    'Party': pl.String,
+    'Vote': pl.Int64,
+    'State\nAbbr': pl.String,
+    'State\nFIPS': pl.String,
+    'd_number_': pl.String,
+    'District\nFIPS': pl.String,
+    'District\nNumber': pl.Int8,
+}
+
+
+def election_csv_path(year: int, data_dir: str = ELECTION_DATA_DIR) -> str:
+    return os.path.join(data_dir, f'elections{year}.csv')
+
+
+def result_store_path(year: int, store_dir: str = RESULT_STORE_DIR) -> str:
+    # Hive-style partitions, so the whole store can also be scanned with
+    # pl.scan_parquet(store_dir, hive_partitioning=True).
+    return os.path.join(store_dir, f'Year={year}', 'results.parquet')
+
+
+def source_digest_path(store_path: str) -> str:
+    # Digest of the CSV a store file was ingested from, next to it.
+    return os.path.join(os.path.dirname(store_path), 'source.sha256')
+
+
+def store_is_current(year: int, data_dir: str = ELECTION_DATA_DIR,
+                     store_dir: str = RESULT_STORE_DIR) -> bool:
+    # Whether the store holds the year's CSV as it is now. Without the
+    # CSV, the store is all there is.
+    store_path = result_store_path(year, store_dir)
+    if not os.path.exists(store_path):
+        return False
+    csv_path = election_csv_path(year, data_dir)
+    if not os.path.exists(csv_path):
+        return True
+    try:
+        with open(source_digest_path(store_path)) as fh:
+            return fh.read().strip() == file_digest(csv_path)
+    except FileNotFoundError:
+        return False
+
+
+def results_path(year: int, data_dir: str = ELECTION_DATA_DIR,
+                 store_dir: str = RESULT_STORE_DIR) -> str | None:
+    # The file scan_election_results reads, None without results.
+    if store_is_current(year, data_dir, store_dir):
+        return result_store_path(year, store_dir)
+    csv_path = election_csv_path(year, data_dir)
+    return csv_path if os.path.exists(csv_path) else None
+
+
+def available_years(
+    data_dir: str = ELECTION_DATA_DIR, store_dir: str = RESULT_STORE_DIR
+) -> list[int]:
+    years: set[int] = set()
+    if os.path.isdir(data_dir):
+        for fname in os.listdir(data_dir):
+            if matchobj := re.fullmatch(r'elections(\d{4})\.csv', fname):
+                years.add(int(matchobj.group(1)))
+    if os.path.isdir(store_dir):
+        for dname in os.listdir(store_dir):
+            matchobj = re.fullmatch(r'Year=(\d{4})', dname)
+            if matchobj and os.path.exists(
+                result_store_path(int(matchobj.group(1)), store_dir)
+            ):
+                years.add(int(matchobj.group(1)))
+    return sorted(years)
+
+
+def normalize_clerk_results[F: (pl.DataFrame, pl.LazyFrame)](
+    frame: F, district_dtype: pl.DataType | type[pl.DataType] = pl.Int8,
+) -> F:
+    # district_dtype is widened only for synthetic elections with more
+    # districts per state than Int8 holds (see scripts/bench_suite.py).
+    is_at_large_x = pl.col('State\nAbbr').is_in(ush.at_large_states_abbrs)
+    is_territory_x = pl.col('State\nAbbr').is_in(ush.territory_abbrs)
+    return (
+        frame
+        .with_columns(
+            pl.col('StateTerritory')
+            .replace(ush.ucname_to_abbr)
+            .alias('State\nAbbr'),
+            pl.col('StateTerritory')
+            .replace(ush.ucname_to_fips)
+            .alias('State\nFIPS'),
+        )
+        .with_columns(
+            pl.when(is_at_large_x | is_territory_x)
+            .then(pl.lit('1'))
+            .otherwise(pl.col('District'))
+            .alias('d_number_'),
+            pl.when(is_at_large_x)
+            .then(pl.lit('00'))
+            .otherwise(
+                pl.when(is_territory_x)
+                .then(pl.lit('98'))
+                .otherwise(pl.col('District').str.zfill(2))
+            )
+            .alias('District\nFIPS'),
+        )
+        .with_columns(
+            pl.col('d_number_').cast(district_dtype)
+            .alias('District\nNumber'),
+        )
+    )
+
+
+def scan_clerk_csv(
+    year: int, data_dir: str = ELECTION_DATA_DIR,
+    district_dtype: pl.DataType | type[pl.DataType] = pl.Int8,
+) -> pl.LazyFrame:
+    return normalize_clerk_results(
+        pl.scan_csv(
+            election_csv_path(year, data_dir),
+            schema_overrides={'District': pl.String, 'Vote': pl.Int64},
+        ),
+        district_dtype,
+    ).cast({**RESULT_SCHEMA, 'District\nNumber': district_dtype})
+
+
+def scan_election_results(
+    year: int, states: list[str] | None = None,
+    columns: list[str] | None = None, data_dir: str = ELECTION_DATA_DIR,
+    store_dir: str = RESULT_STORE_DIR,
+) -> pl.LazyFrame:
+    # The state filter and column selection are pushed down into the
+    # Parquet scan, which then skips row groups and columns it does not
+    # need. Years not yet ingested, or whose CSV changed since, fall back
+    # to the House Clerk CSV.
+    store_path = result_store_path(year, store_dir)
+    if store_is_current(year, data_dir, store_dir):
+        lf = pl.scan_parquet(store_path)
+    else:
+        if os.path.exists(store_path):
+            warnings.warn(
+                f'{store_path} is out of date with '
+                f'{election_csv_path(year, data_dir)}; reading the CSV '
+                f'(re-ingest with python -m hrelectviz.resultstore {year})',
+                stacklevel=2,
+            )
+        lf = scan_clerk_csv(year, data_dir)
+    if states:
+        lf = lf.filter(pl.col('State\nAbbr').is_in(states))
+    if columns:
+        lf = lf.select(columns)
+    return lf
+
+
+def ingest_year(
+    year: int, data_dir: str = ELECTION_DATA_DIR,
+    store_dir: str = RESULT_STORE_DIR,
+    district_dtype: pl.DataType | type[pl.DataType] = pl.Int8,
+) -> str:
+    # The digest of the CSV is recorded once the store file is in place;
+    # until then the store reads as out of date.
+    store_path = result_store_path(year, store_dir)
+    digest_path = source_digest_path(store_path)
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    digest = file_digest(election_csv_path(year, data_dir))
+    tmp_path = f'{store_path}.tmp'
+    scan_clerk_csv(year, data_dir, district_dtype).collect().write_parquet(
+        tmp_path, compression='zstd', statistics=True
+    )
+    if os.path.exists(digest_path):
+        os.remove(digest_path)
+    os.replace(tmp_path, store_path)
+    with open(f'{digest_path}.tmp', 'w') as fh:
+        fh.write(digest + '\n')
+    os.replace(f'{digest_path}.tmp', digest_path)
+    return store_path
+
+
+if __name__ == '__main__':
+    years = [int(arg) for arg in sys.argv[1:]] or available_years()
+    for year in years:
+        path = ingest_year(year)
+        print(f'{year}: {path} ({os.path.getsize(path):,} bytes)')
@@ -0,0 +1,130 @@
+from typing import NamedTuple
+
+import numpy as np
+import polars as pl
+
+import hrelectviz.ushelper as ush
+
+# Seats-votes curves under uniform or proportional swing. Every district's
+# Democratic share of the two-party vote is shifted by every swing in one
+# broadcast (districts x swings), and seats per state are one matrix
+# product of a states x districts membership matrix with the win matrix.
+
+NATION = 'US'
+SWINGS = np.linspace(-0.5, 0.5, 2001)
+
+
+class SeatsVotes(NamedTuple):
+    states: list[str]         # one row per state, then NATION
+    swings: np.ndarray        # (nswings,)
+    ndistricts: np.ndarray    # (nrows,)
+    vote_share: np.ndarray    # (nrows, nswings) Democratic two-party share
+    seats: np.ndarray         # (nrows, nswings) Democratic seats
+
+
+def swing_shares(shares: np.ndarray, swings: np.ndarray,
+                 base_share: np.ndarray, method: str) -> np.ndarray:
+    # shares and base_share are (ndistricts, 1), swings (1, nswings).
+    match method:
+        case 'uniform':
+            swung = shares + swings
+        case 'proportional':
+            # Gains are taken from the other party's share, losses from
+            # one's own, both in proportion to the district's share.
+            with np.errstate(divide='ignore', invalid='ignore'):
+                swung = np.where(
+                    swings >= 0,
+                    shares + swings * (1 - shares) / (1 - base_share),
+                    shares + swings * shares / base_share,
+                )
+        case _:
+            raise ValueError(f'Unknown swing method {method}')
+    # Large swings would push shares out of [0, 1]; they stop at 0 or 1
+    # instead, so that statewide vote shares (computed from these) do too.
+    return np.clip(swung, 0.0, 1.0)
+
+
+def seats_votes_f(
+    aggregate_vote_by_district: pl.DataFrame,
+    swings: np.ndarray = SWINGS, method: str = 'uniform',
+) -> SeatsVotes:
+    df = aggregate_vote_by_district.filter(
+        pl.col('State\nAbbr').is_in(ush.state_abbrs)
+        & (pl.col('District Vote\nMajor Parties') > 0)
+    )
+    states, state_ix = np.unique(
+        df['State\nAbbr'].to_numpy(), return_inverse=True
+    )
+    dem = df['District Vote\nDemocrat'].to_numpy().astype(np.float64)
+    major = df['District Vote\nMajor Parties'].to_numpy().astype(np.float64)
+    nstates = len(states)
+
+    # Rows 0..nstates-1 are the states, row nstates the nation.
+    membership = np.zeros((nstates + 1, len(df)))
+    membership[state_ix, np.arange(len(df))] = 1.0
+    membership[nstates] = 1.0
+    row_major = membership @ major
+    base_share = (membership @ dem) / row_major
+
+    shares = (dem / major)[:, None]
+    swings_row = swings[None, :]
+    state_shares = swing_shares(
+        shares, swings_row, base_share[state_ix][:, None], method
+    )
+    wins = (state_shares > 0.5) + 0.5 * (state_shares == 0.5)
+    seats = membership[:nstates] @ wins
+    vote_share = (membership[:nstates] * major) @ state_shares
+    if method == 'uniform':
+        national_shares = state_shares
+    else:
+        national_shares = swing_shares(
+            shares, swings_row, base_share[nstates:], method
+        )
+    national_wins = (national_shares > 0.5) + 0.5 * (national_shares == 0.5)
+    seats = np.vstack([seats, national_wins.sum(axis=0)])
+    vote_share = np.vstack([vote_share, major @ national_shares])
+    vote_share /= row_major[:, None]
+    return SeatsVotes(
+        [*states.tolist(), NATION], swings, membership.sum(axis=1),
+        vote_share, seats,
+    )
+
+
+def seats_votes_metrics_f(sv: SeatsVotes, delta: float = 0.01
+                          ) -> pl.DataFrame:
+    # Partisan bias is the symmetric bias at an even statewide vote,
+    # (S_D(0.5) - S_R(0.5)) / 2 = S_D(0.5) - 0.5, with S_D(0.5) taken as
+    # the mean seat share over vote shares within delta of one half (so a
+    # single seat won at 50.01% counts as half a seat). Responsiveness is
+    # the slope dS/dV of the curve across +-delta around the observed vote.
+    seat_share = sv.seats / sv.ndistricts[:, None]
+    near_even = np.abs(sv.vote_share - 0.5) <= delta
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bias = (seat_share * near_even).sum(axis=1) / near_even.sum(axis=1)
+    bias -= 0.5
+
+    observed = np.argmin(np.abs(sv.swings))
+    step = max(1, int(round(delta / (sv.swings[1] - sv.swings[0]))))
+    lo = max(observed - step, 0)
+    hi = min(observed + step, len(sv.swings) - 1)
+    dvote = sv.vote_share[:, hi] - sv.vote_share[:, lo]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        responsiveness = (seat_share[:, hi] - seat_share[:, lo]) / dvote
+
+    return pl.DataFrame({
+        'State\nAbbr': sv.states,
+        'Districts': sv.ndistricts.astype(np.int32),
+        'Democrat\nvote share': (sv.vote_share[:, observed] * 100).round(1),
+        'Democrat\nseats': sv.seats[:, observed],
+        'Partisan bias\n(+ favors Democrats)': (bias * 100).round(1),
+        'Responsiveness': responsiveness.round(2),
+    }).fill_nan(None)
+
+
+def seats_votes_curve_f(sv: SeatsVotes, state_abbr: str) -> pl.DataFrame:
+    row = sv.states.index(state_abbr)
+    return pl.DataFrame({
+        'Swing': sv.swings,
+        'Democrat\nvote share': sv.vote_share[row],
+        'Democrat\nseat share': sv.seats[row] / sv.ndistricts[row],
+    })
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import io
+import os
+import zipfile as zf
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+
+from hrelectviz.lazyimport import lazy_import
+
+shpf = lazy_import('shapefile')
+
+# Selective reading of shapefiles, on disk or inside a zip archive (as
+# downloaded from TIGER or NTAD), without extracting it. The DBF is
+# scanned first, decoding only the fields a selection needs; the shapes
+# of the selected records alone are then decoded, located through the
+# .shx index and read in file order.
+#
+# A shapefile path is either a .shp file, a .zip holding one shapefile,
+# or a path to a .shp inside a zip, e.g. tl_2024_us_cd119.zip/x.shp.
+
+type Selector = Callable[[dict], bool]
+
+
+class ZipMember(io.RawIOBase):
+    # A zip member as a seekable binary file of known size. Seeking is
+    # lazy, so the seek to the end that readers do to find the size does
+    # not decompress the member; a forward seek decompresses and skips.
+
+    def __init__(self, archive: zf.ZipFile, name: str):
+        self.info = archive.getinfo(name)
+        self.fh = archive.open(self.info)
+        self.size = self.info.file_size
+        self.pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        match whence:
+            case io.SEEK_SET:
+                self.pos = offset
+            case io.SEEK_CUR:
+                self.pos += offset
+            case io.SEEK_END:
+                self.pos = self.size + offset
+        return self.pos
+
+    def tell(self) -> int:
+        return self.pos
+
+    def readinto(self, buffer) -> int:
+        if self.pos >= self.size:
+            return 0
+        if self.fh.tell() != self.pos:
+            self.fh.seek(self.pos)
+        nread = self.fh.readinto(buffer)
+        self.pos += nread
+        return nread
+
+    def close(self) -> None:
+        self.fh.close()
+        super().close()
+
+
+def split_zip_path(path: str) -> tuple[str, str | None] | None:
+    # (zip path, member path or None) when path is or points into a zip.
+    parts = os.path.normpath(path).split(os.sep)
+    for partno in range(len(parts), 0, -1):
+        head = os.sep.join(parts[:partno]) or os.sep
+        if head.lower().endswith('.zip') and os.path.isfile(head):
+            member = '/'.join(parts[partno:])
+            return head, member or None
+    return None
+
+
+def zip_member_base(archive: zf.ZipFile, member: str | None) -> str:
+    if member is not None:
+        return os.path.splitext(member)[0]
+    bases = {
+        os.path.splitext(name)[0]
+        for name in archive.namelist()
+        if name.lower().endswith('.shp')
+    }
+    if len(bases) != 1:
+        raise ValueError(
+            f'{archive.filename} holds {len(bases)} shapefiles; '
+            'name one as <zip>/<member>.shp'
+        )
+    return bases.pop()
+
+
+@contextmanager
+def open_shapefile(path: str) -> Iterator[shpf.Reader]:
+    if (zip_parts := split_zip_path(path)) is None:
+        with shpf.Reader(path) as reader:
+            yield reader
+        return
+    zip_path, member = zip_parts
+    with zf.ZipFile(zip_path) as archive:
+        base = zip_member_base(archive, member)
+        names = {name.lower(): name for name in archive.namelist()}
+
+        def part(ext: str):
+            name = names.get(f'{base}{ext}'.lower())
+            if name is None:
+                return None
+            if ext == '.shp':
+                return ZipMember(archive, name)
+            # The index, attributes and encoding are small, and read whole.
+            return io.BytesIO(archive.read(name))
+
+        with shpf.Reader(shp=part('.shp'), shx=part('.shx'),
+                         dbf=part('.dbf'), cpg=part('.cpg')) as reader:
+            yield reader
+
+
+def select_records(
+    reader: shpf.Reader, fields: Sequence[str], select: Selector,
+) -> list[int]:
+    # Indices of the records for which select(record) holds, where record
+    # maps each of fields to its value.
+    return [
+        record.oid
+        for record in reader.iterRecords(fields=list(fields))
+        if select(record.as_dict())
+    ]
+
+
+def read_features(
+    path: str, select_fields: Sequence[str] = (),
+    select: Selector | None = None,
+) -> dict:
+    # The FeatureCollection of the shapefile at path, as
+    # shpf.Reader(path).__geo_interface__ gives it, restricted to the
+    # records select chooses (by the values of select_fields); its bbox
+    # is that of the features read.
+    with open_shapefile(path) as reader:
+        if select is None:
+            return reader.__geo_interface__
+        features = []
+        bbox = [float('inf'), float('inf'), float('-inf'), float('-inf')]
+        for recno in select_records(reader, select_fields, select):
+            shape_rec = reader.shapeRecord(recno)
+            if shape_rec is None:
+                continue
+            features.append(shape_rec.__geo_interface__)
+            if shape_rec.shape.shapeType != shpf.NULL:
+                x0, y0, x1, y1 = shape_rec.shape.bbox
+                bbox = [min(bbox[0], x0), min(bbox[1], y0),
+                        max(bbox[2], x1), max(bbox[3], y1)]
+        return {
+            'bbox': bbox if features else list(reader.bbox),
+            'type': 'FeatureCollection',
+            'features': features,
+        }
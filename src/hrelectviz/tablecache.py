@@ -0,0 +1,139 @@
+import weakref
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, Mapping, MutableMapping
+
+import polars as pl
+
+from hrelectviz.tracing import span
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# table name -> (names of its input tables, function computing it from them)
+type TableGraph = Mapping[str, tuple[tuple[str, ...], Callable]]
+
+
+class TableCache(MutableMapping[str, pl.DataFrame]):
+    # Memoized tables of a dependency graph. Source tables (those not in
+    # the graph, e.g. 'states_and_territories') are set from outside;
+    # derived tables are computed on first access from their inputs, which
+    # are looked up in this cache or, for names it does not know, in the
+    # upstream cache.
+    #
+    # `name in cache` tells whether a table is materialized, cache[name]
+    # materializes it. Assigning or deleting a table invalidates every
+    # table derived from it, here and in downstream caches. When the
+    # derived tables held exceed max_bytes, the least recently used ones
+    # are evicted, to be recomputed when next needed; source tables are
+    # never evicted.
+
+    def __init__(
+        self, graph: TableGraph, name: str = '',
+        upstream: 'TableCache | None' = None,
+        max_bytes: int | None = DEFAULT_MAX_BYTES,
+        compute: Callable[[list[str]], dict[str, pl.DataFrame]] | None = None,
+        on_invalidate: Callable[[str], object] | None = None,
+    ):
+        # compute, if given, replaces computing missing tables one by one
+        # (e.g. lazy HrElection collects their plans together);
+        # on_invalidate is called with the name of every table invalidated
+        # (e.g. so that lazy HrElection drops its plan).
+        self.graph = graph
+        self.name = name
+        self.upstream = upstream
+        self.max_bytes = max_bytes
+        self.compute = compute
+        self.on_invalidate = on_invalidate
+        self.frames: OrderedDict[str, pl.DataFrame] = OrderedDict()
+        self.sizes: dict[str, int] = {}
+        self.downstream: list[weakref.ref[TableCache]] = []
+        if upstream is not None:
+            upstream.downstream.append(weakref.ref(self))
+        self.dependents: dict[str, set[str]] = {}
+        for table, (inputs, _) in graph.items():
+            for input_name in inputs:
+                self.dependents.setdefault(input_name, set()).add(table)
+
+    def __contains__(self, name) -> bool:
+        return name in self.frames
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self.frames))
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __getitem__(self, name: str) -> pl.DataFrame:
+        if name in self.frames:
+            self.frames.move_to_end(name)
+            return self.frames[name]
+        if name not in self.graph:
+            if self.upstream is not None:
+                return self.upstream[name]
+            raise KeyError(name)
+        if self.compute is not None:
+            frames = self.compute([name])
+        else:
+            inputs, table_f = self.graph[name]
+            input_frames = [self[input_name] for input_name in inputs]
+            with span(f'{self.name}.compute', table=name) as sp:
+                frames = {name: table_f(*input_frames)}
+                sp.frame(frames[name])
+        for table, df in frames.items():
+            self.store(table, df)
+        self.evict(keep=name)
+        return frames[name]
+
+    def __setitem__(self, name: str, df: pl.DataFrame) -> None:
+        # Even when name is not materialized, tables computed from it (or
+        # plans of them) may be.
+        self.invalidate(name)
+        self.store(name, df)
+        self.evict(keep=name)
+
+    def __delitem__(self, name: str) -> None:
+        if name not in self.frames:
+            raise KeyError(name)
+        self.invalidate(name)
+
+    def store(self, name: str, df: pl.DataFrame) -> None:
+        # Stores a table without invalidating its dependents.
+        self.frames[name] = df
+        self.frames.move_to_end(name)
+        self.sizes[name] = df.estimated_size()
+
+    def invalidate(self, name: str) -> None:
+        # Drops name and every table computed from it, directly or not.
+        self.frames.pop(name, None)
+        self.sizes.pop(name, None)
+        if self.on_invalidate is not None:
+            self.on_invalidate(name)
+        for dependent in self.dependents.get(name, ()):
+            self.invalidate(dependent)
+        for cache_ref in self.downstream:
+            if (cache := cache_ref()) is not None:
+                cache.invalidate_inputs(name)
+
+    def invalidate_inputs(self, input_name: str) -> None:
+        # An upstream table changed; drops the tables computed from it.
+        for dependent in self.dependents.get(input_name, ()):
+            self.invalidate(dependent)
+
+    def nbytes(self) -> int:
+        return sum(
+            self.sizes[name] for name in self.frames if name in self.graph
+        )
+
+    def evict(self, keep: str | None = None) -> list[str]:
+        if self.max_bytes is None:
+            return []
+        evicted = []
+        held = self.nbytes()
+        for name in list(self.frames):  # least recently used first
+            if held <= self.max_bytes:
+                break
+            if name == keep or name not in self.graph:
+                continue
+            held -= self.sizes.pop(name)
+            del self.frames[name]
+            evicted.append(name)
+        return evicted
@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from hrelectviz.lazyimport import lazy_import
+
+np = lazy_import('numpy')
+shapely = lazy_import('shapely')
+
+# TopoJSON (https://github.com/topojson/topojson-specification) encoding of
+# polygon FeatureCollections. Coordinates are quantized to a
+# quantization x quantization grid over the bounding box, every ring is
+# cut at its junctions (points where the rings through it part ways) and
+# each resulting arc is stored once, delta-encoded, however many rings
+# use it. Shared borders are thus written once, and simplifying arcs
+# rather than polygons cannot open gaps between neighbours.
+
+type Topology = dict[str, Any]
+
+DEFAULT_QUANTIZATION = 100_000
+
+
+def polygons_of(geometry: dict | None) -> list[list]:
+    # The polygons (lists of rings) of a Polygon or MultiPolygon.
+    if not geometry:
+        return []
+    match geometry['type']:
+        case 'Polygon':
+            return [geometry['coordinates']]
+        case 'MultiPolygon':
+            return geometry['coordinates']
+        case _:
+            raise ValueError(
+                f'Cannot encode {geometry["type"]} geometry as TopoJSON'
+            )
+
+
+class RingTable:
+    # The rings of all features, quantized, with consecutive repeated
+    # points removed, in flat arrays: ring r holds point ids
+    # ids[offsets[r]:offsets[r + 1]] (without repeating its first point).
+
+    def __init__(self, rings: list[np.ndarray], quantization: int,
+                 bbox: list[float]):
+        x0, y0, x1, y1 = bbox
+        self.kx = (quantization - 1) / (x1 - x0) if x1 > x0 else 1.0
+        self.ky = (quantization - 1) / (y1 - y0) if y1 > y0 else 1.0
+        self.quantization = quantization
+        lengths = np.array([len(ring) for ring in rings], dtype=np.int64)
+        xy = np.concatenate(rings) if rings else np.empty((0, 2))
+        qx = np.round((xy[:, 0] - x0) * self.kx).astype(np.int64)
+        qy = np.round((xy[:, 1] - y0) * self.ky).astype(np.int64)
+        codes = qx * quantization + qy
+
+        # Drop points equal to the previous point of their ring.
+        ring_ix = np.repeat(np.arange(len(rings)), lengths)
+        starts = np.zeros(len(rings) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=starts[1:])
+        first, last = starts[:-1][lengths > 0], starts[1:][lengths > 0] - 1
+        prev = np.roll(codes, 1)
+        prev[first] = codes[last]
+        keep = codes != prev
+        keep[first[first == last]] = True
+        codes, ring_ix = codes[keep], ring_ix[keep]
+        lengths = np.bincount(ring_ix, minlength=len(rings))
+        self.offsets = np.zeros(len(rings) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=self.offsets[1:])
+
+        self.points, self.ids = np.unique(codes, return_inverse=True)
+        self.junction = self.find_junctions()
+
+    def find_junctions(self) -> np.ndarray:
+        # A point is a junction when the (unordered) pairs of neighbours
+        # it has in the rings through it are not all the same.
+        ids, offsets = self.ids, self.offsets
+        if not len(ids):
+            return np.zeros(0, dtype=bool)
+        index = np.arange(len(ids))
+        prev_ix, next_ix = index - 1, index + 1
+        starts, ends = offsets[:-1], offsets[1:]
+        nonempty = ends > starts
+        prev_ix[starts[nonempty]] = ends[nonempty] - 1
+        next_ix[ends[nonempty] - 1] = starts[nonempty]
+        lo = np.minimum(ids[prev_ix], ids[next_ix])
+        hi = np.maximum(ids[prev_ix], ids[next_ix])
+        pair = lo * len(self.points) + hi
+
+        order = np.lexsort((pair, ids))
+        sorted_ids, sorted_pair = ids[order], pair[order]
+        group_starts = np.flatnonzero(
+            np.r_[True, sorted_ids[1:] != sorted_ids[:-1]]
+        )
+        group_ends = np.r_[group_starts[1:], len(ids)] - 1
+        junction = np.zeros(len(self.points), dtype=bool)
+        junction[sorted_ids[group_starts]] = (
+            sorted_pair[group_starts] != sorted_pair[group_ends]
+        )
+        return junction
+
+    def ring(self, ringno: int) -> np.ndarray:
+        return self.ids[self.offsets[ringno]:self.offsets[ringno + 1]]
+
+
+class ArcTable:
+    def __init__(self):
+        self.arcs: list[tuple[int, ...]] = []
+        self.index: dict[tuple[int, ...], int] = {}
+
+    def add(self, arc: tuple[int, ...]) -> int:
+        # The index of arc, or ~index of its reverse, adding it if new.
+        if (arcno := self.index.get(arc)) is not None:
+            return arcno
+        if (arcno := self.index.get(arc[::-1])) is not None:
+            return ~arcno
+        self.index[arc] = len(self.arcs)
+        self.arcs.append(arc)
+        return len(self.arcs) - 1
+
+    def add_ring(self, ring: np.ndarray, junction: np.ndarray) -> list[int]:
+        cuts = np.flatnonzero(junction[ring])
+        if not len(cuts):
+            # A ring touching no other ring is one closed arc, started at
+            # its smallest point so that the same ring (e.g. an enclave and
+            # the hole around it) is found again.
+            start = int(np.argmin(ring))
+            ids = np.r_[ring[start:], ring[:start], ring[start]].tolist()
+            return [self.add(tuple(ids))]
+        ids = np.r_[ring[cuts[0]:], ring[:cuts[0] + 1]].tolist()
+        cuts = (cuts - cuts[0]).tolist() + [len(ring)]
+        return [
+            self.add(tuple(ids[first:last + 1]))
+            for first, last in zip(cuts, cuts[1:])
+        ]
+
+
+def geojson_to_topology(
+    geojson_data: dict, object_name: str = 'districts',
+    quantization: int = DEFAULT_QUANTIZATION, id_property: str | None = None,
+) -> Topology:
+    features = geojson_data['features']
+    rings: list[np.ndarray] = []
+    # feature -> polygons -> ring numbers
+    layout: list[list[list[int]]] = []
+    for feature in features:
+        feature_polys = []
+        for polygon in polygons_of(feature.get('geometry')):
+            ring_nos = []
+            for ring in polygon:
+                xy = np.asarray(ring, dtype=np.float64).reshape(-1, 2)
+                if len(xy) > 1 and np.array_equal(xy[0], xy[-1]):
+                    xy = xy[:-1]
+                ring_nos.append(len(rings))
+                rings.append(xy)
+            feature_polys.append(ring_nos)
+        layout.append(feature_polys)
+
+    if rings:
+        all_xy = np.concatenate(rings)
+        bbox = [*all_xy.min(axis=0).tolist(), *all_xy.max(axis=0).tolist()]
+    else:
+        bbox = [0.0, 0.0, 0.0, 0.0]
+    table = RingTable(rings, quantization, bbox)
+    arcs = ArcTable()
+
+    geometries = []
+    for feature, feature_polys in zip(features, layout):
+        polys = []
+        for ring_nos in feature_polys:
+            poly = [
+                arcs.add_ring(table.ring(ringno), table.junction)
+                for ringno in ring_nos
+                if len(table.ring(ringno)) >= 3
+            ]
+            # A polygon whose exterior collapsed in quantization is dropped.
+            if poly and len(table.ring(ring_nos[0])) >= 3:
+                polys.append(poly)
+        geometry: dict[str, Any]
+        if not polys:
+            geometry = {'type': None}
+        elif len(polys) == 1:
+            geometry = {'type': 'Polygon', 'arcs': polys[0]}
+        else:
+            geometry = {'type': 'MultiPolygon', 'arcs': polys}
+        if feature.get('properties') is not None:
+            geometry['properties'] = feature['properties']
+            if id_property and id_property in feature['properties']:
+                geometry['id'] = feature['properties'][id_property]
+        geometries.append(geometry)
+
+    qx = table.points // quantization
+    qy = table.points % quantization
+    encoded_arcs = []
+    for arc in arcs.arcs:
+        ids = np.array(arc)
+        qxy = np.column_stack((qx[ids], qy[ids]))
+        qxy[1:] = np.diff(qxy, axis=0)
+        encoded_arcs.append(qxy.tolist())
+    return {
+        'type': 'Topology',
+        'bbox': bbox,
+        'transform': {
+            'scale': [1 / table.kx, 1 / table.ky],
+            'translate': bbox[:2],
+        },
+        'objects': {
+            object_name: {'type': 'GeometryCollection',
+                          'geometries': geometries},
+        },
+        'arcs': encoded_arcs,
+    }
+
+
+def decode_arcs(topology: Topology) -> list[np.ndarray]:
+    # Absolute coordinates of every arc.
+    scale = np.array(topology['transform']['scale'])
+    translate = np.array(topology['transform']['translate'])
+    return [
+        np.cumsum(np.array(arc, dtype=np.float64).reshape(-1, 2), axis=0)
+        * scale + translate
+        for arc in topology['arcs']
+    ]
+
+
+def encode_arcs(topology: Topology, arcs: list[np.ndarray]) -> list[list]:
+    scale = np.array(topology['transform']['scale'])
+    translate = np.array(topology['transform']['translate'])
+    encoded = []
+    for xy in arcs:
+        qxy = np.round((xy - translate) / scale).astype(np.int64)
+        qxy[1:] = np.diff(qxy, axis=0)
+        encoded.append(qxy.tolist())
+    return encoded
+
+
+def simplify_topology(topology: Topology, tolerance: float) -> Topology:
+    # Douglas-Peucker simplification of each arc, in the units of the
+    # decoded coordinates. Arc ends are kept, so rings stay closed and
+    # neighbours keep sharing their simplified border. Closed arcs that
+    # would collapse below a triangle are left as they are.
+    arcs = decode_arcs(topology)
+    if not arcs:
+        return topology
+    lines = shapely.linestrings(
+        np.concatenate(arcs),
+        indices=np.repeat(np.arange(len(arcs)), [len(xy) for xy in arcs]),
+    )
+    simplified = shapely.simplify(lines, tolerance, preserve_topology=False)
+    new_arcs = []
+    for xy, line in zip(arcs, simplified):
+        new_xy = shapely.get_coordinates(line)
+        closed = np.array_equal(xy[0], xy[-1])
+        new_arcs.append(xy if closed and len(new_xy) < 4 else new_xy)
+    return {**topology, 'arcs': encode_arcs(topology, new_arcs)}
+
+
+def stitch_ring(arc_nos: list[int], arcs: list[list]) -> list:
+    ring: list = []
+    for arcno in arc_nos:
+        coords = arcs[arcno] if arcno >= 0 else arcs[~arcno][::-1]
+        ring.extend(coords[1:] if ring else coords)
+    return ring
+
+
+def topology_to_geojson(
+    topology: Topology, object_name: str | None = None, places: int = 5,
+) -> dict:
+    # The FeatureCollection of one object of topology (by default its
+    # first), with coordinates rounded to places decimals.
+    object_name = object_name or next(iter(topology['objects']))
+    arcs = [
+        np.round(xy, places).tolist() for xy in decode_arcs(topology)
+    ]
+    features = []
+    for geometry in topology['objects'][object_name]['geometries']:
+        match geometry.get('type'):
+            case 'Polygon':
+                geojson_geometry = {
+                    'type': 'Polygon',
+                    'coordinates': [
+                        stitch_ring(ring, arcs) for ring in geometry['arcs']
+                    ],
+                }
+            case 'MultiPolygon':
+                geojson_geometry = {
+                    'type': 'MultiPolygon',
+                    'coordinates': [
+                        [stitch_ring(ring, arcs) for ring in polygon]
+                        for polygon in geometry['arcs']
+                    ],
+                }
+            case _:
+                geojson_geometry = None
+        feature = {
+            'type': 'Feature',
+            'geometry': geojson_geometry,
+            'properties': geometry.get('properties', {}),
+        }
+        if 'id' in geometry:
+            feature['id'] = geometry['id']
+        features.append(feature)
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def dumps(topology: Topology) -> str:
+    return json.dumps(topology, separators=(',', ':'))
+
+
+def write_topology(topology: Topology, path: str) -> None:
+    with open(path, 'w') as fh:
+        fh.write(dumps(topology))
+
+
+def read_topology(path: str) -> Topology:
+    with open(path) as fh:
+        return json.load(fh)
@@ -0,0 +1,240 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+
+try:
+    import resource
+except ImportError:  # e.g. Windows
+    resource = None
+
+# Opt-in tracing of named spans. Each span records wall time, process CPU
+# time (all threads, so polars' worker threads are counted), the peak RSS
+# of the process when the span ends (where the resource module is
+# available) and, for spans that produce a polars
+# DataFrame or a GeoJSON FeatureCollection, its row count and size.
+#
+# Tracing is off unless enable() is called or HRELECTVIZ_TRACE is set,
+# e.g. HRELECTVIZ_TRACE=trace.json; the trace is then written at exit in
+# Chrome trace format (open it in https://ui.perfetto.dev or
+# chrome://tracing) and a summary is printed to stderr. When tracing is
+# off, span() returns a shared no-op object and @traced functions cost
+# one global lookup per call.
+
+TRACE_ENV = 'HRELECTVIZ_TRACE'
+DEFAULT_TRACE_PATH = 'hrelectviz-trace.json'
+
+
+def peak_rss_kib() -> int | None:
+    # ru_maxrss is in KiB on Linux and in bytes on macOS.
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss // 1024 if sys.platform == 'darwin' else maxrss
+
+
+def frame_stats(obj) -> dict[str, int]:
+    if hasattr(obj, 'estimated_size') and hasattr(obj, 'height'):
+        return {'rows': obj.height, 'bytes': obj.estimated_size()}
+    if isinstance(obj, dict) and isinstance(obj.get('features'), list):
+        return {'rows': len(obj['features'])}
+    return {}
+
+
+class Tracer:
+    def __init__(self):
+        self.pid = os.getpid()
+        self.start_ns = time.perf_counter_ns()
+        self.events: list[dict] = []
+        self.lock = threading.Lock()
+
+    def record(self, name: str, start_ns: int, end_ns: int, cpu_ns: int,
+               rss_kib: int | None, rss_start_kib: int | None,
+               args: dict) -> None:
+        if rss_kib is not None and rss_start_kib is not None:
+            args = {'peak_rss_kib': rss_kib,
+                    'peak_rss_growth_kib': rss_kib - rss_start_kib, **args}
+        event = {
+            'name': name,
+            'cat': name.split('.', 1)[0],
+            'ph': 'X',
+            'ts': (start_ns - self.start_ns) / 1000,
+            'dur': (end_ns - start_ns) / 1000,
+            'pid': self.pid,
+            'tid': threading.get_ident(),
+            'args': {'cpu_ms': cpu_ns / 1e6, **args},
+        }
+        with self.lock:
+            self.events.append(event)
+
+    def chrome_trace(self) -> dict:
+        with self.lock:
+            events = list(self.events)
+        counters = [
+            {
+                'name': 'peak RSS', 'ph': 'C', 'pid': self.pid,
+                'ts': event['ts'] + event['dur'],
+                'args': {'MiB': event['args']['peak_rss_kib'] / 1024},
+            }
+            for event in events if 'peak_rss_kib' in event['args']
+        ]
+        return {
+            'traceEvents': [
+                {'name': 'process_name', 'ph': 'M', 'pid': self.pid,
+                 'args': {'name': 'hrelectviz'}},
+                *events, *counters,
+            ],
+            'displayTimeUnit': 'ms',
+        }
+
+    def write_chrome_trace(self, path: str) -> None:
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(self.chrome_trace(), fh)
+        os.replace(tmp_path, path)
+
+    def summary(self) -> str:
+        # One line per span name, slowest (by total wall time) first.
+        totals: dict[str, dict] = defaultdict(
+            lambda: {'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'rss': None,
+                     'rows': None}
+        )
+        with self.lock:
+            for event in self.events:
+                total = totals[event['name']]
+                total['calls'] += 1
+                total['wall'] += event['dur'] / 1000
+                total['cpu'] += event['args']['cpu_ms']
+                if (rss := event['args'].get('peak_rss_kib')) is not None:
+                    total['rss'] = max(total['rss'] or 0, rss)
+                total['rows'] = event['args'].get('rows', total['rows'])
+        lines = [
+            f'{"span":50s} {"calls":>6s} {"wall ms":>10s} {"cpu ms":>10s} '
+            f'{"peak RSS MiB":>13s} {"rows":>9s}'
+        ]
+        for name, total in sorted(
+            totals.items(), key=lambda item: -item[1]['wall']
+        ):
+            rows = '' if total['rows'] is None else f'{total["rows"]:,}'
+            rss = '' if total['rss'] is None else f'{total["rss"] / 1024:.1f}'
+            lines.append(
+                f'{name:50s} {total["calls"]:6d} {total["wall"]:10.2f} '
+                f'{total["cpu"]:10.2f} {rss:>13s} {rows:>9s}'
+            )
+        return '\n'.join(lines)
+
+
+_tracer: Tracer | None = None
+
+
+class Span:
+    __slots__ = ('name', 'args', 'start_ns', 'cpu_start_ns', 'rss_start_kib')
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+
+    def set(self, **args) -> None:
+        self.args.update(args)
+
+    def frame(self, obj) -> None:
+        self.args.update(frame_stats(obj))
+
+    def __enter__(self):
+        self.rss_start_kib = peak_rss_kib()
+        self.cpu_start_ns = time.process_time_ns()
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        end_ns = time.perf_counter_ns()
+        cpu_ns = time.process_time_ns() - self.cpu_start_ns
+        if _tracer is not None:
+            _tracer.record(self.name, self.start_ns, end_ns, cpu_ns,
+                           peak_rss_kib(), self.rss_start_kib, self.args)
+        return False
+
+
+class NoSpan:
+    __slots__ = ()
+
+    def set(self, **args) -> None:
+        pass
+
+    def frame(self, obj) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        return False
+
+
+NO_SPAN = NoSpan()
+
+
+def enable() -> Tracer:
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
+
+
+def disable() -> Tracer | None:
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def get_tracer() -> Tracer | None:
+    return _tracer
+
+
+def span(name: str, **args) -> Span | NoSpan:
+    # with span('HrElection.load', year=2024) as sp:
+    #     df = ...
+    #     sp.frame(df)
+    if _tracer is None:
+        return NO_SPAN
+    return Span(name, args)
+
+
+def traced(name: str | None = None):
+    # Decorator tracing each call in a span named name (by default the
+    # function's qualified name); a DataFrame or FeatureCollection result
+    # has its rows and size recorded.
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with Span(span_name, {}) as sp:
+                result = func(*args, **kwargs)
+                sp.frame(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def trace_path() -> str:
+    path = os.environ.get(TRACE_ENV, '')
+    return DEFAULT_TRACE_PATH if path in ('', '1') else path
+
+
+def _write_at_exit(path: str) -> None:
+    if _tracer is not None and _tracer.events:
+        _tracer.write_chrome_trace(path)
+        print(_tracer.summary(), file=sys.stderr)
+        print(f'trace written to {path}', file=sys.stderr)
+
+
+if os.environ.get(TRACE_ENV):
+    enable()
+    atexit.register(_write_at_exit, trace_path())
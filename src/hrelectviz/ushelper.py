@@ -1,39 +1,31 @@
 import os
 
-os.environ['DC_STATEHOOD'] = '1'
-import us  # type: ignore
-
-fips_to_abbr = us.states.mapping('fips', 'abbr')
-abbr_to_fips = us.states.mapping('abbr', 'fips')
-ucname_to_abbr: dict[str, str] = {
-    name.upper(): abbr
-    for name, abbr in us.states.mapping('name', 'abbr').items()
-}
-ucname_to_fips: dict[str, str] = {
-    name.upper(): fips
-    for name, fips in us.states.mapping('name', 'fips').items()
-}
-abbr_to_name = us.states.mapping('abbr', 'name')
-states_sans_dc = [st for st in us.states.STATES if st != us.states.DC]
-at_large_states_abbrs: list[str] = ['AK', 'DE', 'ND', 'SD', 'VT', 'WY']
-state_names: list[str] = sorted([st.name.upper() for st in states_sans_dc])
-state_territory_names: list[str] = sorted(
-    [st.name.upper() for st in us.STATES_AND_TERRITORIES]
-)
-state_abbrs: list[str] = sorted([st.abbr for st in states_sans_dc])
-territory_abbrs: list[str] = sorted(
-    [st.abbr for st in us.states.TERRITORIES] + ['DC']
+# The tables are precomputed in usdata (see scripts/make_usdata.py); the
+# us package itself is only imported for states_sans_dc, its State
+# objects.
+from hrelectviz.usdata import (  # noqa: F401
+    abbr_to_fips, abbr_to_name, fips_to_abbr, lower48_abbrs, lower48_fips,
+    state_abbrs, state_names, state_territory_names, territory_abbrs,
+    ucname_to_abbr, ucname_to_fips,
 )
 
+at_large_states_abbrs: list[str] = ['AK', 'DE', 'ND', 'SD', 'VT', 'WY']
+
+
+def load_us():
+    os.environ['DC_STATEHOOD'] = '1'
+    import us  # type: ignore
+    return us
+
+
+def __getattr__(name: str):
+    if name == 'states_sans_dc':
+        us = load_us()
+        return [st for st in us.states.STATES if st != us.states.DC]
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
-lower48_abbrs: list[str] = sorted(
-    [st.abbr for st in states_sans_dc if st.is_contiguous]
-)
-lower48_fips: list[str] = sorted(
-    [st.fips for st in states_sans_dc if st.is_contiguous]
-)
 
 if __name__ == '__main__':
     print(f'{lower48_abbrs=}')
     print(f'{territory_abbrs=}')
-    print(f'{us.states.STATES_AND_TERRITORIES=}')
+    print(f'{load_us().states.STATES_AND_TERRITORIES=}')
@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from hrelectviz.ensemble import (
+    UnitVotes, evaluate_ensemble, percentile_ranks_f, save_ensemble,
+)
+from hrelectviz.geocache import DEFAULT_CACHE_DIR
+from hrelectviz.hrelection import std_polars_config
+
+# Benchmark of ensemble evaluation on a synthetic state:
+#   bench_ensemble.py [--plans 20000] [--units 5000] [--districts 14]
+# Units are points in the unit square, with a Democratic share rising
+# towards one corner; each plan assigns every unit to the nearest of
+# `districts` random seed points. The ensemble is written once under
+# BENCH_DIR, then evaluated memory-mapped, and ranked against plan 0.
+
+BENCH_DIR = os.path.join(DEFAULT_CACHE_DIR, 'bench', 'ensemble')
+GENERATE_CHUNK = 200
+
+
+def make_units(nunits: int, seed: int = 2024
+               ) -> tuple[np.ndarray, UnitVotes]:
+    rng = np.random.default_rng(seed)
+    xy = rng.random((nunits, 2))
+    turnout = rng.integers(500, 3000, nunits).astype(np.float64)
+    share = np.clip(0.25 + 0.5 * xy.mean(axis=1)
+                    + rng.normal(0.0, 0.1, nunits), 0.0, 1.0)
+    dem = np.round(share * turnout)
+    return xy, UnitVotes(np.arange(nunits), dem, turnout - dem)
+
+
+def write_voronoi_ensemble(path: str, xy: np.ndarray, nplans: int,
+                           ndistricts: int, seed: int = 2024) -> None:
+    rng = np.random.default_rng(seed)
+    plans = np.empty((nplans, len(xy)), dtype=np.int16)
+    for start in range(0, nplans, GENERATE_CHUNK):
+        stop = min(start + GENERATE_CHUNK, nplans)
+        seeds = rng.random((stop - start, ndistricts, 2))
+        dist = ((xy[None, :, None, :] - seeds[:, None, :, :]) ** 2).sum(-1)
+        plans[start:stop] = dist.argmin(axis=2)
+    save_ensemble(path, plans, ndistricts)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plans', type=int, default=20_000)
+    parser.add_argument('--units', type=int, default=5000)
+    parser.add_argument('--districts', type=int, default=14)
+    parser.add_argument('--workers', type=int)
+    args = parser.parse_args()
+
+    xy, votes = make_units(args.units)
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    path = os.path.join(
+        BENCH_DIR, f'{args.plans}-{args.units}-{args.districts}.npy'
+    )
+    if not os.path.exists(path):
+        print(f'generating {args.plans:,} plans in {path}', file=sys.stderr)
+        write_voronoi_ensemble(path, xy, args.plans, args.districts)
+
+    start = time.perf_counter()
+    ensemble_df = evaluate_ensemble(votes, path, args.districts,
+                                    workers=args.workers)
+    seconds = time.perf_counter() - start
+    print(f'{args.plans:,} plans x {args.units:,} units: {seconds:.2f} s, '
+          f'{args.plans / seconds:,.0f} plans/s')
+    enacted = np.load(path, mmap_mode='r')[0]
+    with std_polars_config():
+        print(percentile_ranks_f(ensemble_df, np.asarray(enacted), votes,
+                                 args.districts))
@@ -0,0 +1,91 @@
+import argparse
+import os
+import resource
+import sys
+import time
+
+import numpy as np
+import polars as pl
+
+from hrelectviz.geocache import DEFAULT_CACHE_DIR
+from hrelectviz.geoelection import STATE_LEGISLATURES, GeoElection
+import hrelectviz.ushelper as ush
+
+# Precinct-scale benchmark of GeoElection:
+#   bench_geoelection.py [--rows 20_000_000] [--districts 150]
+# Synthetic precinct returns of two chambers in every state (districts
+# per chamber, precincts per district to make up the rows, and three
+# parties per precinct) are written once as Parquet part files under
+# BENCH_DIR, then rolled up to metrics. Prints the time and the peak
+# resident memory of the roll-up, which should stay far below the size
+# of the data.
+
+BENCH_DIR = os.path.join(DEFAULT_CACHE_DIR, 'bench', 'precincts')
+PARTIES = ['Democrat', 'Republican', 'Libertarian']
+CHAMBERS = ['Lower', 'Upper']
+ROWS_PER_PART = 2_000_000
+
+
+def write_synthetic_precincts(dest_dir: str, nrows: int, ndistricts: int,
+                              seed: int = 2024) -> None:
+    rng = np.random.default_rng(seed)
+    states = ush.lower48_abbrs
+    nunits = len(states) * len(CHAMBERS) * ndistricts
+    nprecincts = max(1, nrows // (nunits * len(PARTIES)))
+    os.makedirs(dest_dir, exist_ok=True)
+    # District-level lean, so that seats and votes differ by state.
+    lean = rng.normal(0.0, 0.15, nunits)
+    unit = np.arange(nunits)
+    nparts = -(-nunits * nprecincts * len(PARTIES) // ROWS_PER_PART)
+    for partno, units in enumerate(np.array_split(unit, nparts)):
+        rows = np.repeat(units, nprecincts * len(PARTIES))
+        party = np.tile(np.arange(len(PARTIES)), len(units) * nprecincts)
+        dem_share = np.clip(
+            0.5 + lean[rows] + rng.normal(0.0, 0.1, len(rows)), 0.05, 0.95
+        )
+        share = np.choose(party, [dem_share, 0.95 - dem_share,
+                                  np.full(len(rows), 0.05)])
+        turnout = rng.integers(200, 2000, len(rows))
+        state = rows // (len(CHAMBERS) * ndistricts)
+        chamber = rows // ndistricts % len(CHAMBERS)
+        pl.DataFrame({
+            'State': np.asarray(states)[state],
+            'Chamber': np.asarray(CHAMBERS)[chamber],
+            'District': (rows % ndistricts + 1).astype(np.int16),
+            'Precinct': units[0] * nprecincts
+                        + np.arange(len(rows)) // len(PARTIES),
+            'Party': np.asarray(PARTIES)[party],
+            'Vote': (share * turnout).round().astype(np.int32),
+        }).write_parquet(os.path.join(dest_dir, f'part-{partno:05d}.parquet'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=20_000_000)
+    parser.add_argument('--districts', type=int, default=150,
+                        help='per chamber and state')
+    parser.add_argument('--regenerate', action='store_true')
+    args = parser.parse_args()
+
+    data_dir = os.path.join(BENCH_DIR, f'{args.rows}-{args.districts}')
+    if args.regenerate or not os.path.isdir(data_dir):
+        print(f'generating {args.rows:,} rows in {data_dir}', file=sys.stderr)
+        write_synthetic_precincts(data_dir, args.rows, args.districts)
+    nbytes = sum(
+        os.path.getsize(os.path.join(data_dir, fname))
+        for fname in os.listdir(data_dir)
+    )
+    start_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    election = GeoElection(os.path.join(data_dir, '*.parquet'),
+                           STATE_LEGISLATURES)
+    metrics_df = election.get_gerrymander_metrics()
+    seconds = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    nrows = election.source.select(pl.len()).collect().item()
+    print(f'{nrows:,} rows ({nbytes / 2**20:,.0f} MiB Parquet) -> '
+          f'{len(election.get_district_party_vote()):,} district x party '
+          f'rows -> {len(metrics_df)} plans')
+    print(f'{seconds:.2f} s, {nrows / seconds / 1e6:.1f} M rows/s, '
+          f'peak RSS {peak_rss / 1024:,.0f} MiB '
+          f'(+{(peak_rss - start_rss) / 1024:,.0f} MiB)')
@@ -0,0 +1,74 @@
+import sys
+import time
+
+import polars as pl
+from polars.testing import assert_frame_equal
+
+from hrelectviz.gerrymeter import GerryMeter
+from hrelectviz.hrelection import TABLES, HrElection
+
+
+def time_metrics(lazy: bool, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        GerryMeter(HrElection(lazy=lazy)).get_gerrymander_metrics()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def time_all_tables(lazy: bool, repeats: int) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        hr_elect = HrElection(lazy=lazy)
+        if lazy:
+            hr_elect.collect(*TABLES)
+        else:
+            for name in TABLES:
+                if name != 'states':
+                    getattr(hr_elect, f'get_{name}')()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_invalidation(state_abbr: str = 'NC') -> None:
+    # Narrowing the source table after tables were computed must give
+    # the same, narrowed, tables in both modes: the lazy plans built on
+    # the old source are dropped with the tables.
+    meters = [GerryMeter(HrElection(lazy=lazy)) for lazy in (False, True)]
+    for gm in meters:
+        gm.get_gerrymander_metrics()
+        source = gm.hr_elect.collect('states_and_territories')
+        gm.hr_elect.dfs['states_and_territories'] = (
+            source['states_and_territories']
+            .filter(pl.col('State\nAbbr') == state_abbr)
+        )
+    eager_gm, lazy_gm = meters
+    for name in ['aggregate_vote_by_state', 'district_winners']:
+        eager_df = eager_gm.hr_elect.dfs[name]
+        assert eager_df['State\nAbbr'].unique().to_list() == [state_abbr]
+        assert_frame_equal(eager_df, lazy_gm.hr_elect.dfs[name])
+    assert_frame_equal(
+        eager_gm.get_gerrymander_metrics(), lazy_gm.get_gerrymander_metrics()
+    )
+
+
+if __name__ == '__main__':
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    eager_gm = GerryMeter(HrElection())
+    lazy_gm = GerryMeter(HrElection(lazy=True))
+    assert_frame_equal(
+        eager_gm.get_gerrymander_metrics(), lazy_gm.get_gerrymander_metrics()
+    )
+    check_invalidation()
+
+    for label, time_f in [
+        ('gerrymander metrics', time_metrics),
+        ('all HrElection tables', time_all_tables),
+    ]:
+        t_eager, t_lazy = time_f(False, repeats), time_f(True, repeats)
+        print(f'{label}:')
+        print(f'    eager: {t_eager * 1000:8.2f} ms')
+        print(f'    lazy:  {t_lazy * 1000:8.2f} ms ({t_eager / t_lazy:.2f}x)')
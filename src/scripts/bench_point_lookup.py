@@ -0,0 +1,91 @@
+import sys
+import time
+
+import numpy as np
+import polars as pl
+import shapely
+from shapely.geometry import Point, mapping
+
+from hrelectviz.districtsgeodata import DistrictsGeoData, GeoJSONfcb
+
+LOWER48_BOX = (-124.0, 25.0, -67.0, 49.0)
+
+
+def make_synthetic_tessellation(
+    nfeatures: int = 435, spacing: float = 0.01, seed: int = 2024
+) -> GeoJSONfcb:
+    # Voronoi cells tiling the lower 48 bounding box, with vertices every
+    # spacing degrees along their (shared) borders, in EPSG:4269.
+    rng = np.random.default_rng(seed)
+    box = shapely.box(*LOWER48_BOX)
+    seeds = shapely.multipoints(
+        rng.uniform(LOWER48_BOX[:2], LOWER48_BOX[2:], (nfeatures, 2))
+    )
+    cells = shapely.get_parts(shapely.voronoi_polygons(seeds, extend_to=box))
+    cells = shapely.segmentize(shapely.intersection(cells, box), spacing)
+    features = []
+    for featno, cell in enumerate(cells):
+        statefp = f'{featno // 9 + 1:02d}'
+        features.append({
+            'type': 'Feature',
+            'geometry': mapping(cell),
+            'properties': {
+                'STATEFP': statefp, 'GEOID': f'{statefp}{featno % 9 + 1:02d}',
+            },
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def naive_lookup(gd: DistrictsGeoData, x: np.ndarray, y: np.ndarray
+                 ) -> list[str | None]:
+    geoms = [
+        shapely.geometry.shape(feature['geometry'])
+        for feature in gd.geojson_data['features']
+    ]
+    geoids = [feature['properties']['GEOID']
+              for feature in gd.geojson_data['features']]
+    result: list[str | None] = []
+    for px, py in zip(x, y):
+        point = Point(px, py)
+        for geom, geoid in zip(geoms, geoids):
+            if geom.contains(point):
+                result.append(geoid)
+                break
+        else:
+            result.append(None)
+    return result
+
+
+if __name__ == '__main__':
+    npoints = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    nnaive = min(npoints, 2_000)
+    gd = DistrictsGeoData.from_geojson(
+        make_synthetic_tessellation(), 'epsg:4269'
+    )
+    rng = np.random.default_rng(0)
+    x = rng.uniform(LOWER48_BOX[0] - 1, LOWER48_BOX[2] + 1, npoints)
+    y = rng.uniform(LOWER48_BOX[1] - 1, LOWER48_BOX[3] + 1, npoints)
+
+    start = time.perf_counter()
+    naive = naive_lookup(gd, x[:nnaive], y[:nnaive])
+    t_naive = (time.perf_counter() - start) / nnaive
+
+    start = time.perf_counter()
+    gd.locator
+    t_build = time.perf_counter() - start
+    start = time.perf_counter()
+    geoids = gd.lookup_points(x, y)
+    t_batch = (time.perf_counter() - start) / npoints
+    assert geoids[:nnaive].tolist() == naive
+
+    df = pl.DataFrame({'lon': x, 'lat': y})
+    start = time.perf_counter()
+    tagged = gd.tag_points(df)
+    t_tag = (time.perf_counter() - start) / npoints
+    print(f'features: {len(gd.geojson_data["features"])}, '
+          f'points: {npoints:,}, outside: {tagged["GEOID"].null_count():,}')
+    print(f'naive contains: {1 / t_naive:12,.0f} points/s')
+    print(f'STRtree build:  {t_build * 1000:12.1f} ms')
+    print(f'STRtree batch:  {1 / t_batch:12,.0f} points/s '
+          f'({t_naive / t_batch:,.0f}x)')
+    print(f'tag_points:     {1 / t_tag:12,.0f} points/s')
@@ -0,0 +1,56 @@
+import multiprocessing as mp
+import os
+import resource
+import statistics
+import sys
+import time
+
+from hrelectviz.resultstore import (
+    RESULT_STORE_DIR, ingest_year, result_store_path, scan_clerk_csv,
+    scan_election_results,
+)
+import hrelectviz.ushelper as ush
+
+# Each load runs in a fresh process, so that timings are cold (no polars
+# caches) and ru_maxrss reflects that one load.
+
+
+def load(source: str, year: int, conn) -> None:
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    match source:
+        case 'csv':
+            df = scan_clerk_csv(year).collect()
+        case 'parquet':
+            df = scan_election_results(year).collect()
+        case 'parquet, lower 48, 2 columns':
+            df = scan_election_results(
+                year, ush.lower48_abbrs, ['Party', 'Vote']
+            ).collect()
+    elapsed = time.perf_counter() - start
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    conn.send((elapsed, rss_after - rss_before, df.estimated_size()))
+
+
+def cold_load(source: str, year: int) -> tuple[float, int, int]:
+    parent_conn, child_conn = mp.Pipe()
+    proc = mp.get_context('spawn').Process(
+        target=load, args=(source, year, child_conn)
+    )
+    proc.start()
+    result = parent_conn.recv()
+    proc.join()
+    return result
+
+
+if __name__ == '__main__':
+    year = int(sys.argv[1]) if len(sys.argv) > 1 else 2024
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    if not os.path.exists(result_store_path(year, RESULT_STORE_DIR)):
+        ingest_year(year)
+    for source in ['csv', 'parquet', 'parquet, lower 48, 2 columns']:
+        runs = [cold_load(source, year) for _ in range(repeats)]
+        elapsed = statistics.median(run[0] for run in runs)
+        rss_kb = statistics.median(run[1] for run in runs)
+        print(f'{source:30s} {elapsed * 1000:8.2f} ms  '
+              f'peak RSS +{rss_kb:,} KiB  frame {runs[0][2]:,} bytes')
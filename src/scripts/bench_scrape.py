@@ -0,0 +1,160 @@
+import io
+import itertools
+import sys
+import time
+from collections.abc import Iterable, Iterator
+
+import polars as pl
+
+from scripts.scrape import (
+    CandidateRecord, extract_state_results, iter_candidate_records,
+    parse_district_record, split_state_results, state_territories,
+    write_records,
+)
+
+
+def make_statistics_lines(
+    clerk_df: pl.DataFrame, copies: int = 1
+) -> Iterator[str]:
+    # Lines laid out like the text of the House Clerk statistics PDF,
+    # rebuilt from a scraped elections CSV. Each copy of the document
+    # repeats all results.
+    for _ in range(copies):
+        yield 'STATISTICS OF THE PRESIDENTIAL AND CONGRESSIONAL ELECTION'
+        for (state_terr,), state_df in clerk_df.group_by(
+            'StateTerritory', maintain_order=True
+        ):
+            yield state_terr
+            districts = state_df['District'].unique(maintain_order=True)
+            if districts[0] in ['DELEGATE', 'RESIDENT COMMISSIONER']:
+                yield f'FOR {districts[0]}'
+            else:
+                yield 'FOR UNITED STATES REPRESENTATIVE'
+            for district in districts:
+                cands = state_df.filter(pl.col('District') == district)
+                if not district.isdigit() and district != 'DELEGATE' \
+                        and district != 'RESIDENT COMMISSIONER':
+                    yield district
+                for candno, (name, party, vote) in enumerate(
+                    cands.select('Name', 'Party', 'Vote').iter_rows()
+                ):
+                    if name == 'None':
+                        record = f'Scattering ........ {vote:,}'
+                    else:
+                        record = f'{name}, {party} ........ {vote:,}'
+                    if candno == 0 and district.isdigit():
+                        record = f'{district}. {record}'
+                    yield record
+                yield f'Total ........ {cands["Vote"].sum():,}'
+            yield 'Recapitulation of votes cast'
+
+
+def legacy_csv(lines: list[str]) -> str:
+    out = io.StringIO()
+    results = extract_state_results(lines)
+    print('StateTerritory,District,Name,Party,Vote', file=out)
+    for stateterr in state_territories:
+        by_district = split_state_results(results[stateterr])
+        for district, res in by_district.items():
+            for record in res:
+                name, party, votecount = parse_district_record(record)
+                print(f'{stateterr},{district},{name},{party},{votecount}',
+                      file=out)
+    return out.getvalue()
+
+
+def streaming_csv(lines: Iterable[str]) -> str:
+    return records_csv(iter_candidate_records(lines))
+
+
+def records_csv(records: Iterable[CandidateRecord]) -> str:
+    out = io.StringIO()
+    write_records(records, out)
+    return out.getvalue()
+
+
+def in_legacy_order(records: Iterable[CandidateRecord]
+                    ) -> list[CandidateRecord]:
+    # The streamed records as the legacy path returns them: states in
+    # state_territories order, each from its last section, in which a
+    # repeated district keeps its first place but its last records.
+    last_sections = {
+        state_terr: list(section)
+        for state_terr, section in itertools.groupby(
+            records, key=lambda record: record.StateTerritory
+        )
+    }
+    ordered = []
+    for state_terr in state_territories:
+        by_district: dict[str, list[CandidateRecord]] = {}
+        for district, run in itertools.groupby(
+            last_sections.get(state_terr, []),
+            key=lambda record: record.District,
+        ):
+            by_district[district] = list(run)
+        ordered += itertools.chain.from_iterable(by_district.values())
+    return ordered
+
+
+def shuffled_lines(clerk_df: pl.DataFrame) -> list[str]:
+    # The document with states in reverse order, then the first state's
+    # section again with other vote counts.
+    states = clerk_df['StateTerritory'].unique(maintain_order=True)
+    reversed_df = pl.concat([
+        clerk_df.filter(pl.col('StateTerritory') == state_terr)
+        for state_terr in reversed(states.to_list())
+    ])
+    repeated_df = clerk_df.filter(
+        pl.col('StateTerritory') == states[0]
+    ).with_columns(pl.col('Vote') + 1)
+    return [
+        *make_statistics_lines(reversed_df),
+        *list(make_statistics_lines(repeated_df))[1:],  # no title
+    ]
+
+
+def check_equivalence(clerk_df: pl.DataFrame) -> None:
+    check_equivalence(clerk_df)
+    lines = list(make_statistics_lines(clerk_df))
+
+    # Out of order, with a state repeated: the streaming parser keeps
+    # document order and both sections (see scrape.py), the legacy one
+    # state_territories order and the last section.
+    lines = shuffled_lines(clerk_df)
+    records = list(iter_candidate_records(lines))
+    states = [state_terr for state_terr, _ in itertools.groupby(
+        record.StateTerritory for record in records
+    )]
+    first_state = clerk_df['StateTerritory'][0]
+    assert states == [
+        *clerk_df['StateTerritory'].unique(maintain_order=True).reverse(),
+        first_state,
+    ]
+    assert len(records) == len(clerk_df) + (
+        clerk_df['StateTerritory'] == first_state
+    ).sum()
+    assert legacy_csv(lines) == records_csv(in_legacy_order(records))
+
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else \
+        './election-data/elections2024.csv'
+    clerk_df = pl.read_csv(csv_path, schema_overrides={'District': pl.String})
+    lines = list(make_statistics_lines(clerk_df))
+    assert legacy_csv(lines) == streaming_csv(lines)
+
+    for copies in [1, 10, 100]:
+        doc_lines = lines * copies
+        start = time.perf_counter()
+        nrecords = write_records(
+            iter_candidate_records(doc_lines), io.StringIO()
+        )
+        elapsed = time.perf_counter() - start
+        print(f'{copies:4d}x: {len(doc_lines):9,} lines '
+              f'{nrecords:9,} records '
+              f'{elapsed:8.3f} s ({nrecords / elapsed:10,.0f} records/s)')
+    # Legacy path at 1x for comparison.
+    start = time.perf_counter()
+    legacy_csv(lines)
+    elapsed = time.perf_counter() - start
+    print(f'legacy 1x: {elapsed:.3f} s')
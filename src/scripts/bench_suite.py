@@ -0,0 +1,314 @@
+import argparse
+import copy
+import io
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Callable
+
+import numpy as np
+import polars as pl
+import shapefile as shpf
+
+from hrelectviz.districtsgeodata import DistrictsGeoData
+from hrelectviz.gerrymeter import GerryMeter
+from hrelectviz.geocache import DEFAULT_CACHE_DIR
+from hrelectviz.hrelection import TABLES, HrElection
+from hrelectviz.resultstore import (
+    election_csv_path, ingest_year, result_store_path,
+)
+import hrelectviz.ushelper as ush
+from scripts.bench_scrape import make_statistics_lines
+from scripts.bench_xform_geometry import make_synthetic_geometry
+from scripts.scrape import iter_candidate_records, write_records
+
+# Benchmarks of the whole pipeline on synthetic data at multiples of the
+# 2024 size:
+#   bench_suite.py generate [--scales 1 10 100]
+#   bench_suite.py run [--scales 1 10] [--output results.json]
+#   bench_suite.py compare baseline.json results.json [--threshold 0.1]
+# A scale k election has k times the districts of every state (with
+# jittered votes); a scale k shapefile has k times as many districts.
+# Data is generated once per scale under BENCH_DATA_DIR, the election
+# ingested into a result store there with Int16 district numbers (scaled
+# states have more districts than the Int8 of real results holds).
+
+BENCH_DATA_DIR = os.path.join(DEFAULT_CACHE_DIR, 'bench')
+BENCH_YEAR = 2024
+BENCH_EPSG = 'epsg:4269'
+SHP_VERTICES = 500
+SIMPLIFY_TOLERANCE = 0.01
+
+
+def scale_dir(scale: int) -> str:
+    return os.path.join(BENCH_DATA_DIR, f'{scale}x')
+
+
+def make_synthetic_election(
+    clerk_df: pl.DataFrame, scale: int, seed: int = 2024
+) -> pl.DataFrame:
+    # Copy c of a numbered district d of a state with n districts becomes
+    # district c * n + d. At-large, delegate and territory races, whose
+    # district is not a number, are kept once.
+    rng = np.random.default_rng(seed)
+    numbered = clerk_df.filter(pl.col('District').str.contains(r'^\d+$'))
+    unnumbered = clerk_df.filter(~pl.col('District').str.contains(r'^\d+$'))
+    ndistricts = pl.col('District').cast(pl.Int32).max().over('StateTerritory')
+    copies = pl.concat([
+        numbered.with_columns(
+            (pl.lit(copy) * ndistricts + pl.col('District').cast(pl.Int32))
+            .cast(pl.String).alias('District'),
+        )
+        for copy in range(scale)
+    ])
+    jitter = rng.uniform(0.8, 1.2, len(copies))
+    copies = copies.with_columns(
+        (pl.col('Vote') * pl.Series(jitter)).round().cast(pl.Int64)
+        .alias('Vote')
+    )
+    return pl.concat([copies, unnumbered]).sort(
+        'StateTerritory', maintain_order=True
+    )
+
+
+def write_synthetic_shapefile(
+    shp_path: str, scale: int, nvertices: int = SHP_VERTICES,
+    seed: int = 2024,
+) -> None:
+    # 2024 district counts per state, times scale.
+    clerk_df = pl.read_csv(election_csv_path(BENCH_YEAR),
+                           schema_overrides={'District': pl.String})
+    counts = (
+        clerk_df
+        .filter(pl.col('StateTerritory').is_in(list(ush.ucname_to_fips)))
+        .group_by('StateTerritory')
+        .agg(pl.col('District').n_unique().alias('n'))
+        .sort('StateTerritory')
+    )
+    statefps = [
+        ush.ucname_to_fips[state_terr]
+        for state_terr, n in counts.iter_rows()
+        for _ in range(n * scale)
+    ]
+    geom = make_synthetic_geometry(len(statefps), nvertices, seed)
+    with shpf.Writer(shp_path, shapeType=shpf.POLYGON) as writer:
+        writer.field('STATEFP', 'C', size=2)
+        writer.field('CD119FP', 'C', size=4)
+        writer.field('GEOID', 'C', size=6)
+        district_no = 0
+        for featno, (statefp, feature) in enumerate(
+            zip(statefps, geom['features'])
+        ):
+            if featno and statefp != statefps[featno - 1]:
+                district_no = 0
+            district_no += 1
+            writer.record(statefp, f'{district_no:02d}',
+                          f'{statefp}{district_no:02d}')
+            writer.shape(feature['geometry'])
+
+
+def generate(scale: int) -> str:
+    data_dir = scale_dir(scale)
+    csv_path = election_csv_path(BENCH_YEAR, data_dir)
+    shp_path = os.path.join(data_dir, 'districts.shp')
+    if not os.path.exists(csv_path):
+        os.makedirs(data_dir, exist_ok=True)
+        clerk_df = pl.read_csv(election_csv_path(BENCH_YEAR),
+                               schema_overrides={'District': pl.String})
+        make_synthetic_election(clerk_df, scale).write_csv(csv_path)
+    if not os.path.exists(result_store_path(BENCH_YEAR, data_dir)):
+        ingest_year(BENCH_YEAR, data_dir, data_dir, district_dtype=pl.Int16)
+    if not os.path.exists(shp_path):
+        write_synthetic_shapefile(shp_path, scale)
+    return data_dir
+
+
+# A case is a setup function returning the function to time. Setup is
+# not timed, and is repeated before every run.
+type Case = Callable[[int], Callable[[], object]]
+
+
+def hrelection_case(data_dir: str) -> Case:
+    def setup(_scale: int):
+        return lambda: HrElection(
+            BENCH_YEAR, data_dir=data_dir, store_dir=data_dir
+        )
+    return setup
+
+
+def hrelection_table_case(data_dir: str, name: str) -> Case:
+    def setup(_scale: int):
+        hr_elect = HrElection(BENCH_YEAR, data_dir=data_dir,
+                              store_dir=data_dir)
+        input_name = TABLES[name][0][0]
+        if input_name != 'states_and_territories':
+            getattr(hr_elect, f'get_{input_name}')()
+        return getattr(hr_elect, f'get_{name}')
+    return setup
+
+
+def gerrymeter_case(data_dir: str) -> Case:
+    def setup(_scale: int):
+        gm = GerryMeter(HrElection(BENCH_YEAR, data_dir=data_dir,
+                                   store_dir=data_dir))
+        return gm.get_gerrymander_metrics
+    return setup
+
+
+def geodata_cases(data_dir: str) -> dict[str, Case]:
+    shp_path = os.path.join(data_dir, 'districts.shp')
+    loaded = DistrictsGeoData(shp_path, BENCH_EPSG)
+
+    def on_fresh_copy(method: str, *args) -> Case:
+        def setup(_scale: int):
+            gd = DistrictsGeoData.from_geojson(
+                copy.deepcopy(loaded.geojson_data), BENCH_EPSG
+            )
+            return lambda: getattr(gd, method)(*args)
+        return setup
+
+    return {
+        'DistrictsGeoData.load':
+            lambda _: lambda: DistrictsGeoData(shp_path, BENCH_EPSG),
+        'DistrictsGeoData.load[CA]':
+            lambda _: lambda: DistrictsGeoData(shp_path, BENCH_EPSG, ['CA']),
+        'DistrictsGeoData.xform_geometry':
+            on_fresh_copy('xform_geometry', 'epsg:3857'),
+        'DistrictsGeoData.simplify':
+            on_fresh_copy('simplify', SIMPLIFY_TOLERANCE),
+        'DistrictsGeoData.simplify[coverage]':
+            on_fresh_copy('simplify', SIMPLIFY_TOLERANCE, 'coverage'),
+        'DistrictsGeoData.filter_by_state':
+            on_fresh_copy('filter_by_state', ush.lower48_abbrs),
+        'DistrictsGeoData.to_topology': on_fresh_copy('to_topology'),
+    }
+
+
+def scrape_case(clerk_df: pl.DataFrame) -> Case:
+    def setup(scale: int):
+        lines = list(make_statistics_lines(clerk_df, scale))
+        return lambda: write_records(
+            iter_candidate_records(lines), io.StringIO()
+        )
+    return setup
+
+
+def time_case(setup: Case, scale: int, repeats: int) -> dict:
+    times = []
+    for _ in range(repeats):
+        run = setup(scale)
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return {
+        'min_s': min(times),
+        'median_s': statistics.median(times),
+        'repeats': repeats,
+    }
+
+
+def cases_for_scale(scale: int) -> dict[str, Case]:
+    data_dir = generate(scale)
+    clerk_df = pl.read_csv(election_csv_path(BENCH_YEAR),
+                           schema_overrides={'District': pl.String})
+    cases: dict[str, Case] = {'HrElection': hrelection_case(data_dir)}
+    for name in TABLES:
+        if name != 'states':
+            cases[f'HrElection.get_{name}'] = hrelection_table_case(
+                data_dir, name
+            )
+    cases['GerryMeter.get_gerrymander_metrics'] = gerrymeter_case(data_dir)
+    cases.update(geodata_cases(data_dir))
+    cases['scrape.iter_candidate_records'] = scrape_case(clerk_df)
+    return cases
+
+
+def run(scales: list[int], repeats: int, pattern: str | None) -> dict:
+    results: dict[str, dict] = {}
+    for scale in scales:
+        for name, setup in cases_for_scale(scale).items():
+            if pattern and pattern not in name:
+                continue
+            # Fewer repeats at larger scales keep a full run bounded.
+            nrepeats = max(1, repeats // max(1, int(math.log10(scale)) * 2))
+            key = f'{name}@{scale}x'
+            results[key] = time_case(setup, scale, nrepeats)
+            print(f'{key:55s} {results[key]["median_s"] * 1000:10.2f} ms',
+                  file=sys.stderr)
+    return {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'polars': pl.__version__,
+            'numpy': np.__version__,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float,
+            min_delta: float) -> list[str]:
+    # A case regresses when its median time grew by more than threshold
+    # (relative) and by more than min_delta seconds (absolute), so that
+    # timer noise on very fast cases is not reported.
+    regressions = []
+    base_results, cur_results = baseline['results'], current['results']
+    for key in sorted(base_results.keys() & cur_results.keys()):
+        base = base_results[key]['median_s']
+        cur = cur_results[key]['median_s']
+        ratio = cur / base if base else math.inf
+        flag = ''
+        if ratio > 1 + threshold and cur - base > min_delta:
+            flag = 'REGRESSION'
+            regressions.append(key)
+        elif ratio < 1 - threshold and base - cur > min_delta:
+            flag = 'improved'
+        print(f'{key:55s} {base * 1000:10.2f} {cur * 1000:10.2f} ms '
+              f'{ratio:6.2f}x {flag}')
+    if missing := len(base_results.keys() - cur_results.keys()):
+        print(f'{missing} baseline cases not in current results')
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    commands = parser.add_subparsers(dest='command', required=True)
+    gen_parser = commands.add_parser('generate')
+    gen_parser.add_argument('--scales', type=int, nargs='+',
+                            default=[1, 10, 100])
+    run_parser = commands.add_parser('run')
+    run_parser.add_argument('--scales', type=int, nargs='+', default=[1, 10])
+    run_parser.add_argument('--repeats', type=int, default=10)
+    run_parser.add_argument('--match', help='only cases containing this')
+    run_parser.add_argument('--output', '-o')
+    cmp_parser = commands.add_parser('compare')
+    cmp_parser.add_argument('baseline')
+    cmp_parser.add_argument('current')
+    cmp_parser.add_argument('--threshold', type=float, default=0.10)
+    cmp_parser.add_argument('--min-delta', type=float, default=0.001)
+    args = parser.parse_args()
+
+    match args.command:
+        case 'generate':
+            for scale in args.scales:
+                print(generate(scale))
+        case 'run':
+            report = run(args.scales, args.repeats, args.match)
+            if args.output:
+                with open(args.output, 'w') as fh:
+                    json.dump(report, fh, indent=2)
+            else:
+                json.dump(report, sys.stdout, indent=2)
+        case 'compare':
+            with open(args.baseline) as fh:
+                baseline = json.load(fh)
+            with open(args.current) as fh:
+                current = json.load(fh)
+            if compare(baseline, current, args.threshold, args.min_delta):
+                sys.exit(1)
@@ -0,0 +1,85 @@
+import copy
+import math
+import sys
+import time
+
+import numpy as np
+import shapefile as shpf
+
+from hrelectviz.districtsgeodata import (
+    GeoJSONfcb, flatten_coords, transform_geometry,
+    transform_geometry_per_point,
+)
+
+
+def make_synthetic_geometry(
+    nfeatures: int = 435, nvertices: int = 2000, seed: int = 2024
+) -> GeoJSONfcb:
+    # Jagged lon/lat (EPSG:4269) polygons scattered over the lower 48;
+    # every third feature is a two-part MultiPolygon.
+    rng = np.random.default_rng(seed)
+    features = []
+    angles = np.linspace(0.0, 2 * math.pi, nvertices)
+    for featno in range(nfeatures):
+        lon0, lat0 = rng.uniform(-124.0, -67.0), rng.uniform(25.0, 49.0)
+        radius = 0.2 + 0.3 * rng.random(nvertices)
+        ring = np.column_stack((
+            lon0 + radius * np.cos(angles), lat0 + radius * np.sin(angles)
+        ))
+        ring[-1] = ring[0]
+        ring_coords = [tuple(pt) for pt in ring.tolist()]
+        if featno % 3 == 0:
+            islet = [(x + 1.0, y) for x, y in ring_coords]
+            geometry = {
+                'type': 'MultiPolygon',
+                'coordinates': [[ring_coords], [islet]],
+            }
+        else:
+            geometry = {'type': 'Polygon', 'coordinates': [ring_coords]}
+        features.append({
+            'type': 'Feature',
+            'geometry': geometry,
+            'properties': {'GEOID': f'{featno:04d}'},
+        })
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def time_xform(xform_f, geom: GeoJSONfcb, src: str, dest: str,
+               repeats: int) -> float:
+    best = math.inf
+    for _ in range(repeats):
+        data = copy.deepcopy(geom)
+        start = time.perf_counter()
+        xform_f(data, src, dest)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def flat_xy(geom: GeoJSONfcb) -> np.ndarray:
+    seqs: list = []
+    for feature in geom['features']:
+        flatten_coords(feature['geometry']['coordinates'], seqs, set())
+    return np.array([pt for seq in seqs for pt in seq], dtype=np.float64)
+
+
+if __name__ == '__main__':
+    src, dest = 'epsg:4269', 'epsg:3857'
+    if len(sys.argv) > 1:
+        geom = shpf.Reader(sys.argv[1]).__geo_interface__
+        src = sys.argv[2] if len(sys.argv) > 2 else src
+    else:
+        geom = make_synthetic_geometry()
+    nverts = len(flat_xy(geom))
+    per_point = copy.deepcopy(geom)
+    transform_geometry_per_point(per_point, src, dest)
+    vectorized = copy.deepcopy(geom)
+    transform_geometry(vectorized, src, dest)
+
+    t_point = time_xform(transform_geometry_per_point, geom, src, dest, 3)
+    t_vect = time_xform(transform_geometry, geom, src, dest, 3)
+    print(f'features: {len(geom["features"])}, vertices: {nverts:,}')
+    print(f'per-point:  {t_point * 1000:10.1f} ms')
+    print(f'vectorized: {t_vect * 1000:10.1f} ms')
+    print(f'speedup:    {t_point / t_vect:10.1f}x')
+    diff = np.max(np.abs(flat_xy(per_point) - flat_xy(vectorized)))
+    print(f'max |diff|: {diff:.2e}')
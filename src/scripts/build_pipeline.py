@@ -0,0 +1,179 @@
+import argparse
+import os
+import sys
+
+from hrelectviz.datasources import (
+    DownloadManager, us_census_states_shp_url, us_house_election_stats_url,
+)
+from hrelectviz.gerrymeter import major_parties
+from hrelectviz.pipeline import (
+    DEFAULT_STATE_PATH, Pipeline, Stage, source_digest,
+)
+from hrelectviz.resultstore import (
+    available_years, election_csv_path, ingest_year, result_store_path,
+)
+
+# The incremental build from the House Clerk's statistics PDFs to the
+# finished metrics and maps, e.g. from the repo root
+#   PYTHONPATH=src python -m scripts.build_pipeline --years 2022 2024
+# Per year:
+#   fetch-pdf   data/statistics<year>.pdf
+#   to-text     data/statistics<year>.txt
+#   scrape      election-data/elections<year>.csv
+#   ingest      election-data/store/Year=<year>/results.parquet
+#   metrics     out/metrics/gerrymander_metrics<year>.parquet
+#   maps        out/maps/<metric>-<party>-<year>.html (with --maps)
+# A stage reruns only when the content of one of its inputs changed (see
+# hrelectviz/pipeline.py), so a revised PDF for one year rebuilds that
+# year's artifacts only, and the years build in parallel. With --offline
+# the downloads are skipped and whatever files exist are the sources;
+# a stage whose inputs are missing keeps its existing outputs.
+
+PDF_DIR = './data'
+METRICS_DIR = os.path.join('.', 'out', 'metrics')
+MAPS_DIR = os.path.join('.', 'out', 'maps')
+SHP_YEAR = '2024'
+
+# The code each stage's outputs are computed by, as stage params.
+INGEST_MODULES = ['hrelectviz.resultstore', 'hrelectviz.ushelper',
+                  'hrelectviz.usdata']
+METRICS_MODULES = [*INGEST_MODULES, 'hrelectviz.hrelection',
+                   'hrelectviz.gerrymeter', 'hrelectviz.seatsvotes',
+                   'hrelectviz.tablecache']
+MAPS_MODULES = ['scripts.render_maps', 'scripts.gerrymander_metrics_plotly',
+                'hrelectviz.districtsgeodata', 'hrelectviz.geosimplify']
+
+
+def metrics_path(year: int) -> str:
+    return os.path.join(METRICS_DIR, f'gerrymander_metrics{year}.parquet')
+
+
+def fetch(url: str, dest_path: str) -> None:
+    path, _ = DownloadManager().download(url, os.path.dirname(dest_path))
+    if os.path.abspath(path) != os.path.abspath(dest_path):
+        # The server named the file otherwise.
+        os.replace(path, dest_path)
+
+
+def scrape(txt_path: str, csv_path: str) -> None:
+    from scripts.scrape import (
+        iter_candidate_records, iter_lines, write_records,
+    )
+
+    tmp_path = f'{csv_path}.tmp'
+    write_records(iter_candidate_records(iter_lines(txt_path)), tmp_path)
+    os.replace(tmp_path, csv_path)
+
+
+def to_text(pdf_path: str, workers: int | None) -> None:
+    from scripts.to_text import convert_to_text
+
+    convert_to_text(pdf_path, workers)
+
+
+def compute_metrics(year: int, dest_path: str) -> None:
+    from hrelectviz.gerrymeter import GerryMeter
+    from hrelectviz.hrelection import HrElection
+
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    metrics_df = GerryMeter(HrElection(year)).get_gerrymander_metrics()
+    metrics_df.write_parquet(f'{dest_path}.tmp')
+    os.replace(f'{dest_path}.tmp', dest_path)
+
+
+def render_year_maps(year: int, shp_path: str, workers: int | None) -> None:
+    from scripts import render_maps
+
+    counts = render_maps.render_all(
+        [year], render_maps.METRICS, major_parties, ['html'], MAPS_DIR,
+        shp_path, workers,
+    )
+    if counts['failed']:
+        raise RuntimeError(f'{counts["failed"]} maps of {year} failed')
+
+
+def year_stages(year: int, offline: bool, maps: bool, shp_path: str,
+                workers: int | None) -> list[Stage]:
+    url = us_house_election_stats_url(str(year))
+    pdf_path = os.path.join(PDF_DIR, os.path.basename(url))
+    txt_path = pdf_path.removesuffix('.pdf') + '.txt'
+    csv_path = election_csv_path(year)
+    store_path = result_store_path(year)
+    stages = [
+        Stage(f'to-text-{year}', (pdf_path,), (txt_path,),
+              lambda: to_text(pdf_path, workers),
+              source_digest('scripts.to_text')),
+        Stage(f'scrape-{year}', (txt_path,), (csv_path,),
+              lambda: scrape(txt_path, csv_path),
+              source_digest('scripts.scrape')),
+        Stage(f'ingest-{year}', (csv_path,), (store_path,),
+              lambda: ingest_year(year), source_digest(*INGEST_MODULES)),
+        Stage(f'metrics-{year}', (store_path,), (metrics_path(year),),
+              lambda: compute_metrics(year, metrics_path(year)),
+              source_digest(*METRICS_MODULES)),
+    ]
+    if not offline:
+        stages.append(Stage(f'fetch-pdf-{year}', (), (pdf_path,),
+                            lambda: fetch(url, pdf_path), url, volatile=True))
+    if maps:
+        from scripts.render_maps import METRICS, output_stem
+        stages.append(Stage(
+            f'maps-{year}', (metrics_path(year), shp_path),
+            tuple(
+                os.path.join(MAPS_DIR, f'{output_stem(year, code, party)}.html')
+                for code in METRICS for party in major_parties
+            ),
+            lambda: render_year_maps(year, shp_path, workers),
+            source_digest(*MAPS_MODULES),
+        ))
+    return stages
+
+
+def build_stages(years: list[int], offline: bool, maps: bool,
+                 workers: int | None) -> list[Stage]:
+    shp_url = us_census_states_shp_url(SHP_YEAR)
+    shp_path = os.path.join(PDF_DIR, os.path.basename(shp_url))
+    stages = [
+        stage for year in years
+        for stage in year_stages(year, offline, maps, shp_path, workers)
+    ]
+    if maps and not offline:
+        stages.append(Stage('fetch-states-shp', (), (shp_path,),
+                            lambda: fetch(shp_url, shp_path), shp_url,
+                            volatile=True))
+    return stages
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('stages', nargs='*',
+                        help='build only stages whose names contain one of '
+                             'these (and what they depend on)')
+    parser.add_argument('--years', type=int, nargs='+',
+                        help='default: every year with election data')
+    parser.add_argument('--offline', action='store_true',
+                        help='skip downloads; build from the files at hand')
+    parser.add_argument('--maps', action='store_true',
+                        help='also render the HTML maps of each year')
+    parser.add_argument('--jobs', type=int,
+                        help='stages to run at once')
+    parser.add_argument('--workers', type=int,
+                        help='processes per PDF conversion or map batch')
+    parser.add_argument('--state', default=DEFAULT_STATE_PATH)
+    parser.add_argument('--force', action='store_true',
+                        help='rebuild even up-to-date stages')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='show what would be built, and why')
+    args = parser.parse_args()
+
+    years = args.years or available_years()
+    os.makedirs(PDF_DIR, exist_ok=True)
+    pipeline = Pipeline(
+        build_stages(years, args.offline, args.maps, args.workers),
+        args.state, args.jobs,
+    )
+    status = pipeline.run(args.stages, args.force, args.dry_run)
+    for name in pipeline.order(set(status)):
+        print(f'{name:24s} {status[name]}')
+    if 'failed' in status.values():
+        sys.exit(1)
@@ -0,0 +1,164 @@
+import os
+import sys
+import tempfile
+import threading
+import zipfile
+from http.server import ThreadingHTTPServer
+
+import requests
+
+from hrelectviz.datasources import DownloadManager, file_sha256
+from scripts.serve_artifacts import ArtifactHandler
+
+# Check of hrelectviz.datasources.DownloadManager against a local
+# scripts/serve_artifacts.py server:
+#   python -m scripts.check_downloads
+# In a scratch directory, a PDF and a zip are fetched (200), fetched again
+# (304, zip not re-extracted, but deleted or edited members restored),
+# the PDF is changed and its download cut
+# off halfway then resumed (206), and the zip is changed (200,
+# re-extracted). Files in the destination must be copies of the mirror's
+# blobs. Run with src on PYTHONPATH. Exits 1 on any failure.
+
+
+class CheckHandler(ArtifactHandler):
+    # Records the status of each request; a path in server.cut_off has
+    # its next response cut off after cut_off[path] bytes.
+    def do_GET(self) -> None:
+        if (limit := self.server.cut_off.pop(self.path, None)) is not None:
+            self.wfile = CutOffWriter(self.wfile, limit)
+        try:
+            super().do_GET()
+        except ConnectionAbortedError:
+            self.close_connection = True
+
+    def log_request(self, code='-', size='-') -> None:
+        self.server.statuses.append(int(code))
+
+
+class CutOffWriter:
+    def __init__(self, wfile, limit: int):
+        self.wfile = wfile
+        self.remaining = limit
+
+    def write(self, data: bytes) -> int:
+        if len(data) > self.remaining:
+            self.wfile.write(data[:self.remaining])
+            self.wfile.flush()
+            raise ConnectionAbortedError('cut off')
+        self.remaining -= len(data)
+        return self.wfile.write(data)
+
+    def __getattr__(self, name: str):
+        return getattr(self.wfile, name)
+
+
+def write_zip(path: str, member: str, data: bytes) -> None:
+    with zipfile.ZipFile(path, 'w') as archive:
+        archive.writestr(member, data)
+
+
+class Checker:
+    def __init__(self, server: ThreadingHTTPServer):
+        self.server = server
+        self.ok = True
+
+    def expect(self, label: str, condition: bool) -> None:
+        print(f'{label:48s} {"ok" if condition else "FAILED"}')
+        self.ok &= condition
+
+    def statuses(self) -> list[int]:
+        statuses = list(self.server.statuses)
+        self.server.statuses.clear()
+        return statuses
+
+
+def run_checks(work_dir: str, checker: Checker, base_url: str) -> None:
+    root = os.path.join(work_dir, 'root')
+    dest_dir = os.path.join(work_dir, 'data')
+    os.makedirs(root)
+    pdf_path = os.path.join(root, 'statistics.pdf')
+    zip_path = os.path.join(root, 'shapes.zip')
+    with open(pdf_path, 'wb') as fh:
+        fh.write(os.urandom(1 << 20))
+    write_zip(zip_path, 'shapes.shp', b'version 1')
+    pdf_url, zip_url = f'{base_url}/statistics.pdf', f'{base_url}/shapes.zip'
+    manager = DownloadManager(os.path.join(work_dir, 'mirror'),
+                              chunk_size=1 << 12)
+    member_path = os.path.join(dest_dir, 'shapes.shp')
+
+    path, digest = manager.download(pdf_url, dest_dir)
+    manager.download_and_unzip(zip_url, dest_dir)
+    checker.expect('first fetch: 200', checker.statuses() == [200, 200])
+    checker.expect('PDF downloaded', digest == file_sha256(pdf_path)
+                   and file_sha256(path) == digest)
+    with open(member_path, 'rb') as fh:
+        checker.expect('zip extracted', fh.read() == b'version 1')
+    blob = manager.blob_path(digest)
+    checker.expect('PDF is a copy of its blob',
+                   not os.path.samefile(path, blob))
+    with open(path, 'ab') as fh:
+        fh.write(b'edited')
+    checker.expect('editing the PDF leaves its blob',
+                   file_sha256(blob) == digest)
+
+    member_mtime = os.stat(member_path).st_mtime_ns
+    path, _ = manager.download(pdf_url, dest_dir)
+    manager.download_and_unzip(zip_url, dest_dir)
+    checker.expect('second fetch: 304', checker.statuses() == [304, 304])
+    checker.expect('edited PDF restored', file_sha256(path) == digest)
+    checker.expect('unchanged zip not re-extracted',
+                   os.stat(member_path).st_mtime_ns == member_mtime)
+    os.remove(member_path)
+    manager.download_and_unzip(zip_url, dest_dir)
+    with open(member_path, 'rb') as fh:
+        checker.expect('deleted member restored', fh.read() == b'version 1')
+    with open(member_path, 'wb') as fh:
+        fh.write(b'version X')  # same size, other CRC
+    manager.download_and_unzip(zip_url, dest_dir)
+    with open(member_path, 'rb') as fh:
+        checker.expect('edited member restored', fh.read() == b'version 1')
+    checker.statuses()
+
+    with open(pdf_path, 'wb') as fh:
+        fh.write(os.urandom(1 << 20))
+    checker.server.cut_off['/statistics.pdf'] = 1 << 19
+    try:
+        manager.download(pdf_url, dest_dir)
+        checker.expect('cut-off download raises', False)
+    except requests.exceptions.RequestException:
+        pass
+    statuses = checker.statuses()
+    path, digest = manager.download(pdf_url, dest_dir)
+    checker.expect('changed PDF cut off, then resumed: 200, 206',
+                   statuses + checker.statuses() == [200, 206])
+    checker.expect('resumed PDF complete',
+                   digest == file_sha256(pdf_path)
+                   and file_sha256(path) == digest)
+
+    write_zip(zip_path, 'shapes.shp', b'version 2')
+    manager.download_and_unzip(zip_url, dest_dir)
+    checker.expect('changed zip: 200', checker.statuses() == [200])
+    with open(member_path, 'rb') as fh:
+        checker.expect('changed zip re-extracted', fh.read() == b'version 2')
+
+
+if __name__ == '__main__':
+    with tempfile.TemporaryDirectory() as work_dir:
+        server = ThreadingHTTPServer(
+            ('127.0.0.1', 0),
+            lambda *args, **kwargs: CheckHandler(
+                *args, directory=os.path.join(work_dir, 'root'), **kwargs
+            ),
+        )
+        server.statuses = []
+        server.cut_off = {}
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        checker = Checker(server)
+        try:
+            run_checks(work_dir, checker,
+                       f'http://127.0.0.1:{server.server_port}')
+        finally:
+            server.shutdown()
+    if not checker.ok:
+        sys.exit(1)
@@ -0,0 +1,102 @@
+import argparse
+import re
+import subprocess
+import sys
+
+# Startup budget check for the package, the CLI scripts and the app:
+#   python -m scripts.check_import_time [--repeats 5] [--scale 1.0]
+# Each module is imported in a fresh interpreter with -X importtime. A
+# module fails when its best cumulative import time over the repeats
+# exceeds its budget (times --scale, for slower machines), or when it
+# imports one of the heavy dependencies it must only load at first use.
+# A module that cannot be imported fails too, unless what is missing is
+# an optional dependency (then there is nothing to measure). Exits 1 on
+# any failure. Run from src/, like the scripts themselves.
+
+# (The plotly package itself is light; lazy_import of one of its
+# submodules imports it to locate the submodule.)
+HEAVY = ('us', 'shapely', 'pyproj', 'shapefile', 'plotly.graph_objects',
+         'plotly.express')
+
+# module -> (budget in ms, heavy modules it may import eagerly)
+BUDGETS: dict[str, tuple[float, tuple[str, ...]]] = {
+    'hrelectviz.ushelper': (15, ()),
+    'hrelectviz.districtsgeodata': (120, ()),
+    'hrelectviz.hrelection': (350, ()),
+    'hrelectviz.gerrymeter': (450, ()),
+    'hrelectviz.multiyear': (450, ()),
+    'scripts.gerrymander_metrics_plotly': (450, ()),
+    'hr_election_explorer': (1500, ()),
+}
+
+# Dependencies of the app only, which may not be installed.
+OPTIONAL = ('streamlit',)
+
+MISSING_MODULE = re.compile(r"ModuleNotFoundError: No module named '([\w.]+)'")
+IMPORTTIME_LINE = re.compile(
+    r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)\s*$'
+)
+
+
+def import_profile(module: str) -> tuple[float, set[str]]:
+    # (cumulative ms of importing module, every module imported)
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        last = (proc.stderr.strip().splitlines() or [''])[-1]
+        missing = m[1] if (m := MISSING_MODULE.match(last)) else None
+        raise ImportError(f'{module}: {last}', name=missing)
+    cumulative_ms = 0.0
+    imported = set()
+    for line in proc.stderr.splitlines():
+        if (m := IMPORTTIME_LINE.match(line)) is None:
+            continue
+        imported.add(m[4])
+        if m[4] == module and m[3] == ' ':  # top level
+            cumulative_ms = int(m[2]) / 1000
+    return cumulative_ms, imported
+
+
+def check(module: str, budget_ms: float, allowed: tuple[str, ...],
+          repeats: int) -> list[str]:
+    profiles = [import_profile(module) for _ in range(repeats)]
+    best_ms = min(ms for ms, _ in profiles)
+    imported = profiles[0][1]
+    eager = sorted(
+        heavy for heavy in HEAVY
+        if heavy not in allowed and heavy in imported
+    )
+    problems = []
+    if best_ms > budget_ms:
+        problems.append(f'{best_ms:.0f} ms > budget {budget_ms:.0f} ms')
+    if eager:
+        problems.append(f'imports {", ".join(eager)} eagerly')
+    status = '; '.join(problems) or 'ok'
+    print(f'{module:40s} {best_ms:8.1f} ms  {status}')
+    return problems
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('modules', nargs='*', default=list(BUDGETS))
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiply every budget by this')
+    args = parser.parse_args()
+
+    failed = []
+    for module in args.modules:
+        budget_ms, allowed = BUDGETS.get(module, (float('inf'), ()))
+        try:
+            if check(module, budget_ms * args.scale, allowed, args.repeats):
+                failed.append(module)
+        except ImportError as exc:
+            if (exc.name or '').split('.')[0] in OPTIONAL:
+                print(f'{module:40s}  skipped ({exc})')
+            else:
+                print(f'{module:40s}  failed ({exc})')
+                failed.append(module)
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import zipfile
+
+from hrelectviz.resultstore import election_csv_path
+from scripts.bench_suite import scale_dir
+from hrelectviz.gerrymeter import major_parties
+from scripts.build_pipeline import MAPS_DIR, SHP_YEAR
+from scripts.render_maps import MANIFEST, METRICS, output_stem
+
+# Smoke run of scripts/build_pipeline.py, maps stage included:
+#   python -m scripts.check_pipeline [--year 2024] [--shp states.shp]
+# In a scratch directory holding the year's elections CSV and the
+# shapefile zipped as the pipeline's states shapefile, the pipeline is
+# run offline twice: the first run must build the ingest, metrics and
+# maps stages, the second find them all fresh. The same is then done
+# for three years at once (each a copy of the year's CSV), whose maps
+# stages run in parallel into one directory; every map must also be
+# recorded in its year's manifest. The shapefile defaults to the
+# synthetic one of bench_suite.py generate --scales 1. Run from the
+# repo root, with src on PYTHONPATH. Exits 1 on any failure.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)
+)))
+EXPECTED = ['ingest', 'metrics', 'maps']
+
+
+def run_pipeline(work_dir: str, years: list[int]) -> dict[str, str]:
+    proc = subprocess.run(
+        [sys.executable, '-m', 'scripts.build_pipeline', '--offline',
+         '--maps', '--years', *map(str, years), '--state',
+         os.path.join(work_dir, 'state.json')],
+        cwd=work_dir, capture_output=True, text=True,
+        env={**os.environ, 'PYTHONPATH': os.path.join(REPO_ROOT, 'src')},
+    )
+    if proc.returncode != 0:
+        print(proc.stderr, file=sys.stderr)
+    status = {}
+    for line in proc.stdout.splitlines():
+        name, _, stage_status = line.rpartition(' ')
+        status[name.strip()] = stage_status
+    return status
+
+
+def check(statuses: dict[str, str], years: list[int],
+          wanted: set[str]) -> bool:
+    ok = True
+    for year in years:
+        for stage in EXPECTED:
+            name = f'{stage}-{year}'
+            got = statuses.get(name)
+            print(f'{name:16s} {got}')
+            if got not in wanted:
+                print(f'  expected {" or ".join(sorted(wanted))}')
+                ok = False
+    return ok
+
+
+def check_manifests(work_dir: str, years: list[int]) -> bool:
+    ok = True
+    for year in years:
+        path = os.path.join(work_dir, MAPS_DIR, MANIFEST.format(year=year))
+        try:
+            with open(path) as fh:
+                recorded = set(json.load(fh))
+        except FileNotFoundError:
+            recorded = set()
+        missing = {
+            output_stem(year, code, party)
+            for code in METRICS for party in major_parties
+        } - recorded
+        print(f'manifest-{year}     {len(missing)} maps missing')
+        ok &= not missing
+    return ok
+
+
+def setup_work_dir(work_dir: str, year: int, years: list[int],
+                   shp_path: str) -> None:
+    for copy_year in years:
+        csv_path = election_csv_path(copy_year, os.path.join(
+            work_dir, 'election-data'
+        ))
+        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        shutil.copy(
+            election_csv_path(year,
+                              os.path.join(REPO_ROOT, 'election-data')),
+            csv_path,
+        )
+    os.makedirs(os.path.join(work_dir, 'data'))
+    base = f'tl_{SHP_YEAR}_us_state'
+    with zipfile.ZipFile(
+        os.path.join(work_dir, 'data', f'{base}.zip'), 'w'
+    ) as archive:
+        for ext in ['.shp', '.shx', '.dbf']:
+            archive.write(os.path.splitext(shp_path)[0] + ext, base + ext)
+
+
+def check_years(year: int, years: list[int], shp_path: str) -> bool:
+    with tempfile.TemporaryDirectory() as work_dir:
+        setup_work_dir(work_dir, year, years, shp_path)
+        print('first run:')
+        ok = check(run_pipeline(work_dir, years), years, {'built'})
+        ok &= check_manifests(work_dir, years)
+        print('second run:')
+        ok &= check(run_pipeline(work_dir, years), years, {'fresh'})
+    return ok
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--year', type=int, default=2024)
+    parser.add_argument('--shp', default=os.path.join(
+        REPO_ROOT, scale_dir(1), 'districts.shp'
+    ))
+    args = parser.parse_args()
+
+    ok = check_years(args.year, [args.year], args.shp)
+    ok &= check_years(args.year, [args.year - 4, args.year - 2, args.year],
+                      args.shp)
+    if not ok:
+        sys.exit(1)
@@ -1,12 +1,16 @@
+from __future__ import annotations
+
 import re
-import plotly.express as px  # type: ignore
-import plotly.graph_objects as go   # type: ignore
 import polars as pl
 
 import hrelectviz.ushelper as ush
 from hrelectviz.hrelection import HrElection
 from hrelectviz.districtsgeodata import DistrictsGeoData
 from hrelectviz.gerrymeter import GerryMeter, major_parties
+from hrelectviz.lazyimport import lazy_import
+from hrelectviz.tracing import traced
+
+go = lazy_import('plotly.graph_objects')
 
 nl = '\n'
 color_column_names: dict[str, dict[str, str]] = {
@@ -23,21 +27,17 @@ color_column_names: dict[str, dict[str, str]] = {
 
 
 
+@traced('plotly.get_districts_geodata')
 def get_districts_geodata(path: str, projection: str) -> DistrictsGeoData:
-    gd = DistrictsGeoData(path, projection)
-    gd.filter_by_state(ush.lower48_abbrs)
-
     # Transform to quasi-mercator so that geometry ccan be simplified;
-    # simplify with a tolerance of 1 km; then transform back to lon-lat
-    if projection != 'epsg:3857':
-        gd.xform_geometry('epsg:3857')
-    gd.simplify(1000.0)
-    if projection != 'epsg:3857':
-        gd.xform_geometry(projection)
-    return gd
-
-def get_gerrymander_metrics() -> pl.DataFrame:
-    hr_elect = HrElection()
+    # simplify with a tolerance of 1 km; then transform back to lon-lat.
+    # The result is cached on disk, keyed by the shapefile contents.
+    return DistrictsGeoData.load_processed(
+        path, projection, ush.lower48_abbrs, 1000.0, work_epsg='epsg:3857'
+    )
+
+def get_gerrymander_metrics(year: int = 2024) -> pl.DataFrame:
+    hr_elect = HrElection(year)
     gerry_meter = GerryMeter(hr_elect)
     metrics_df = gerry_meter.get_gerrymander_metrics()
     return metrics_df
@@ -55,33 +55,45 @@ def get_plot_df_for_metric(
     )
     return plot_df
 
-def make_plotly_representation_of_metric(
-        plot_df: pl.DataFrame, gd: DistrictsGeoData,
-        metric_code: str, party: str, year: int) -> go.Figure:
+def make_base_figure(geojson: dict | str) -> go.Figure:
+    # The map without metric values. geojson may also be the URL of a
+    # GeoJSON file, which plotly.js then fetches (and the browser caches)
+    # instead of it being embedded in every figure sent to the page.
+    fig = go.Figure(go.Choropleth(
+        geojson=geojson,
+        featureidkey='properties.GEOID',
+        colorbar=dict(x=-0.15, y=0.6, len=0.4),
+    ))
+    fig.update_geos(fitbounds='locations', visible=False)
+    fig.update_layout(autosize=False, width=800, height=600)
+    return fig
+
+
+def metric_trace_props(
+        plot_df: pl.DataFrame, metric_code: str, party: str) -> dict:
     color_col_name = color_column_names[metric_code][party]
     red_to_blue = [(0.0, 'red'), (0.5, 'white'), (1.0, 'blue')]
     blue_to_red = [(0.0, 'blue'), (0.5, 'white'), (1.0, 'red')]
 
     col_names = ['State\nAbbr', color_col_name]
     columns_stack = plot_df.select(col_names).to_numpy().tolist()
-    fig = go.Figure(go.Choropleth(
-        geojson=gd.geojson_data,
-        featureidkey='properties.GEOID',
-        locations=plot_df['State\nFIPS'],
-        z=plot_df['normalized_color_col'],
+    return dict(
+        locations=plot_df['State\nFIPS'].to_list(),
+        z=plot_df['normalized_color_col'].to_list(),
         colorscale=red_to_blue if party == 'Democrat' else blue_to_red,
-        colorbar=dict(x=-0.15, y=0.6, len=0.4),
         customdata=columns_stack,
         hovertemplate=('<b>State: %{customdata[0]}</b><br>' +
-            color_column_names[metric_code][party] + ': (%{customdata[1]:.2f}')
+            color_column_names[metric_code][party] + ': (%{customdata[1]:.2f}'
         ),
     )
-    fig.update_geos(fitbounds='locations', visible=False)
+
+
+def apply_metric(
+        fig: go.Figure, plot_df: pl.DataFrame,
+        metric_code: str, party: str, year: int) -> go.Figure:
+    fig.update_traces(**metric_trace_props(plot_df, metric_code, party))
     metric_name = re.sub('[-_]', ' ', metric_code)
     fig.update_layout(
-        autosize=False,
-        width=800,
-        height=600,
         title=dict(
             text='U.S. House of Representatives <br>'
             + f'{year} Election {metric_name}',
@@ -93,6 +105,15 @@ def make_plotly_representation_of_metric(
     )
     return fig
 
+
+@traced('plotly.make_figure')
+def make_plotly_representation_of_metric(
+        plot_df: pl.DataFrame, gd: DistrictsGeoData,
+        metric_code: str, party: str, year: int) -> go.Figure:
+    return apply_metric(
+        make_base_figure(gd.geojson_data), plot_df, metric_code, party, year
+    )
+
 if __name__ == '__main__':
     metric_df = get_gerrymander_metrics()
     skew_df = get_plot_df_for_metric(metric_df, 'partisan_skew', 'Democrat')
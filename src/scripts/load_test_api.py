@@ -0,0 +1,102 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from urllib.parse import urlsplit
+
+# Load test of scripts/serve_api.py (or any HTTP/1.1 server), e.g.
+#   load_test_api.py http://127.0.0.1:8080 \
+#       /metrics/2024/gerrymander_metrics.json /geometry/states.topojson \
+#       --connections 32 --seconds 10
+# Each connection issues GETs for the paths in turn over one keep-alive
+# connection. Reports requests per second and the p50 / p99 latency.
+# With --revalidate, every request after the first of a path sends the
+# ETag it received, as a caching client would.
+
+
+async def read_response(reader: asyncio.StreamReader
+                        ) -> tuple[int, dict[str, str]]:
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Connection closed')
+    status = int(status_line.split()[1])
+    headers: dict[str, str] = {}
+    while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers
+
+
+async def client(host: str, port: int, paths: list[str], deadline: float,
+                 gzip: bool, revalidate: bool, latencies: list[float],
+                 statuses: dict[int, int]) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    etags: dict[str, str] = {}
+    n = 0
+    try:
+        while time.perf_counter() < deadline:
+            path = paths[n % len(paths)]
+            n += 1
+            lines = [f'GET {path} HTTP/1.1', f'Host: {host}:{port}']
+            if gzip:
+                lines.append('Accept-Encoding: gzip')
+            if revalidate and path in etags:
+                lines.append(f'If-None-Match: {etags[path]}')
+            start = time.perf_counter()
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode())
+            await writer.drain()
+            status, headers = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+            if 'etag' in headers:
+                etags[path] = headers['etag']
+    finally:
+        writer.close()
+
+
+async def run(url: str, paths: list[str], connections: int, seconds: float,
+              gzip: bool, revalidate: bool) -> tuple[list[float],
+                                                     dict[int, int], float]:
+    parts = urlsplit(url)
+    host, port = parts.hostname or '127.0.0.1', parts.port or 80
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        client(host, port, paths[i % len(paths):] + paths[:i % len(paths)],
+               start + seconds, gzip, revalidate, latencies, statuses)
+        for i in range(connections)
+    ])
+    return latencies, statuses, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('url')
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--connections', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--no-gzip', action='store_true')
+    parser.add_argument('--revalidate', action='store_true')
+    args = parser.parse_args()
+
+    latencies, statuses, elapsed = asyncio.run(run(
+        args.url, args.paths, args.connections, args.seconds,
+        not args.no_gzip, args.revalidate,
+    ))
+    if not latencies:
+        print('no responses', file=sys.stderr)
+        sys.exit(1)
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    print(f'{len(latencies):,} requests in {elapsed:.1f} s: '
+          f'{len(latencies) / elapsed:,.0f} req/s')
+    print(f'latency p50 {cuts[49] * 1000:.2f} ms, '
+          f'p99 {cuts[98] * 1000:.2f} ms, '
+          f'max {max(latencies) * 1000:.2f} ms')
+    print('statuses: ' + ', '.join(
+        f'{status}: {count:,}' for status, count in sorted(statuses.items())
+    ))
+    if any(status >= 500 for status in statuses):
+        sys.exit(1)
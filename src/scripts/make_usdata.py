@@ -0,0 +1,75 @@
+import os
+
+os.environ['DC_STATEHOOD'] = '1'
+import us  # type: ignore
+
+# Writes hrelectviz/usdata.py, the FIPS, abbreviation and name tables
+# hrelectviz.ushelper re-exports, so that importing the package does not
+# import the us package and rebuild them. Rerun after upgrading us:
+#   python -m scripts.make_usdata
+
+USDATA_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'hrelectviz', 'usdata.py',
+)
+
+
+def make_tables() -> dict[str, dict | list]:
+    states_sans_dc = [st for st in us.states.STATES if st != us.states.DC]
+    return {
+        'fips_to_abbr': us.states.mapping('fips', 'abbr'),
+        'abbr_to_fips': us.states.mapping('abbr', 'fips'),
+        'ucname_to_abbr': {
+            name.upper(): abbr
+            for name, abbr in us.states.mapping('name', 'abbr').items()
+        },
+        'ucname_to_fips': {
+            name.upper(): fips
+            for name, fips in us.states.mapping('name', 'fips').items()
+        },
+        'abbr_to_name': us.states.mapping('abbr', 'name'),
+        'state_names': sorted(st.name.upper() for st in states_sans_dc),
+        'state_territory_names': sorted(
+            st.name.upper() for st in us.STATES_AND_TERRITORIES
+        ),
+        'state_abbrs': sorted(st.abbr for st in states_sans_dc),
+        'territory_abbrs': sorted(
+            [st.abbr for st in us.states.TERRITORIES] + ['DC']
+        ),
+        'lower48_abbrs': sorted(
+            st.abbr for st in states_sans_dc if st.is_contiguous
+        ),
+        'lower48_fips': sorted(
+            st.fips for st in states_sans_dc if st.is_contiguous
+        ),
+    }
+
+
+def render_value(value: dict | list) -> str:
+    if isinstance(value, dict):
+        items = [f'    {key!r}: {val!r},' for key, val in value.items()]
+        return '{\n' + '\n'.join(items) + '\n}'
+    lines = ['   ']
+    for item in value:
+        if len(lines[-1]) + len(f' {item!r},') > 79:
+            lines.append('   ')
+        lines[-1] += f' {item!r},'
+    body = '\n'.join(lines)
+    return '[\n' + body + '\n]'
+
+
+def render(tables: dict[str, dict | list]) -> str:
+    version = getattr(us, '__version__', '?')
+    lines = [f'# Generated by scripts/make_usdata.py from us {version}; '
+             'do not edit.']
+    for name, value in tables.items():
+        kind = 'dict[str, str]' if isinstance(value, dict) else 'list[str]'
+        lines.append('')
+        lines.append(f'{name}: {kind} = {render_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+if __name__ == '__main__':
+    with open(USDATA_PATH, 'w') as fh:
+        fh.write(render(make_tables()))
+    print(USDATA_PATH)
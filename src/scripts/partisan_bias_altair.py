@@ -42,11 +42,15 @@ with std_polars_config():
 gd = DistrictsGeoData(
     '../../../map-data-ntad/Congressional_Districts.shp', 'epsg:3857'
 )
-gd.simplify(1000.0)
-gd.xform_geometry('epsg:4326')
 gd.filter_by_state(ush.lower48_abbrs)
 # gd.filter_by_state(['NJ'])
-geodata = alt.Data(values=gd.geojson_data['features'])
+gd.simplify_topology(1000.0)
+gd.xform_geometry('epsg:4326')
+# TopoJSON stores each border shared by two districts once.
+geodata = alt.Data(
+    values=gd.to_topology(),
+    format=alt.DataFormat(type='topojson', feature='districts'),
+)
 
 
 base = (
@@ -12,17 +12,12 @@ def get_skew_column_name(party: str) -> str:
 
 
 def get_districts_geodata(path: str, projection: str) -> DistrictsGeoData:
-    gd = DistrictsGeoData(path, projection)
-    gd.filter_by_state(ush.lower48_abbrs)
-
     # Transform to quasi-mercator so that geometry ccan be simplified;
-    # simplify with a tolerance of 1 km; then transform back to lon-lat
-    if projection != 'epsg:3857':
-        gd.xform_geometry('epsg:3857')
-    gd.simplify(1000.0)
-    if projection != 'epsg:3857':
-        gd.xform_geometry(projection)
-    return gd
+    # simplify with a tolerance of 1 km; then transform back to lon-lat.
+    # The result is cached on disk, keyed by the shapefile contents.
+    return DistrictsGeoData.load_processed(
+        path, projection, ush.lower48_abbrs, 1000.0, work_epsg='epsg:3857'
+    )
 
 def get_skew_df() -> pl.DataFrame:
     hr_elect = HrElection()
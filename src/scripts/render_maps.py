@@ -0,0 +1,257 @@
+import argparse
+import atexit
+import hashlib
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import plotly  # type: ignore
+import polars as pl
+
+from hrelectviz.districtsgeodata import DistrictsGeoData
+from hrelectviz.gerrymeter import major_parties
+from hrelectviz.geojsonio import write_features
+from hrelectviz.multiyear import MultiYearHrElection
+from hrelectviz.tracing import span
+import scripts.gerrymander_metrics_plotly as gmp
+
+# Batch rendering of the gerrymandering maps of every year x metric x
+# party, e.g. from the repo root
+#   PYTHONPATH=src python -m scripts.render_maps --formats html png
+# HTML pages load one shared plotly.js and fetch one
+# shared GeoJSON file next to them, so they must be served over HTTP
+# (python -m http.server, or scripts/serve_artifacts.py) rather than
+# opened as files. PNG and SVG images embed the geometry and are drawn
+# by kaleido, one persistent renderer per worker process.
+#
+# Each output is fingerprinted by its metric values, the geometry, the
+# formats and the plotting code; a run skips those whose fingerprint is
+# unchanged since the last run recorded it in the year's MANIFEST. Runs
+# for different years (e.g. the pipeline's maps stages, which run in
+# parallel) can share out_dir: the shared files are written atomically
+# under unique temporary names, and each year has its own manifest.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)
+)))
+DEFAULT_SHP_PATH = os.path.join(
+    REPO_ROOT, 'map-data-census', 'tl_2024_us_state.shp'
+)
+DEFAULT_OUT_DIR = os.path.join(REPO_ROOT, 'out', 'maps')
+GEO_EPSG = 'epsg:4269'
+MANIFEST = 'manifest-{year}.json'
+IMAGE_FORMATS = ('png', 'svg')
+METRICS = list(gmp.color_column_names)
+
+type Job = tuple[int, str, str]  # year, metric code, party
+
+
+def output_stem(year: int, metric_code: str, party: str) -> str:
+    return f'{metric_code}-{party.lower()}-{year}'
+
+
+def code_digest() -> str:
+    hasher = hashlib.sha256(plotly.__version__.encode())
+    for module_file in [gmp.__file__, __file__]:
+        with open(module_file, 'rb') as fh:
+            hasher.update(fh.read())
+    return hasher.hexdigest()
+
+
+def write_atomically(path: str, text: str) -> None:
+    # Concurrent writers each use their own temporary file; as they write
+    # the same contents, whichever replaces path last is as good.
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=f'.{os.path.basename(path)}.',
+        suffix='.tmp',
+    )
+    try:
+        with os.fdopen(fd, 'w') as fh:
+            fh.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_shared_files(out_dir: str, geojson_data: dict) -> tuple[str, str]:
+    # The plotly.js bundle and the geometry, named by version and content,
+    # so that a file already there is the one wanted.
+    js_name = f'plotly-{plotly.__version__}.min.js'
+    js_path = os.path.join(out_dir, js_name)
+    if not os.path.exists(js_path):
+        write_atomically(js_path, plotly.offline.get_plotlyjs())
+
+    buffer = io.StringIO()
+    write_features(buffer, geojson_data['features'])
+    text = buffer.getvalue()
+    geo_name = f'states-{hashlib.sha256(text.encode()).hexdigest()[:16]}'
+    geo_path = os.path.join(out_dir, f'{geo_name}.geojson')
+    if not os.path.exists(geo_path):
+        write_atomically(geo_path, text)
+    return js_name, f'{geo_name}.geojson'
+
+
+def fingerprint(plot_df: pl.DataFrame, metric_code: str, party: str,
+                geo_name: str, formats: list[str], code: str) -> str:
+    color_col = gmp.color_column_names[metric_code][party]
+    values = plot_df.select(
+        'State\nFIPS', 'State\nAbbr', color_col, 'normalized_color_col'
+    ).sort('State\nFIPS').write_csv()
+    parts = [values, geo_name, ','.join(sorted(formats)), code]
+    return hashlib.sha256('\x00'.join(parts).encode()).hexdigest()
+
+
+def load_manifest(out_dir: str, year: int) -> dict[str, str]:
+    try:
+        with open(os.path.join(out_dir, MANIFEST.format(year=year))) as fh:
+            return json.load(fh)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(out_dir: str, year: int, manifest: dict[str, str]) -> None:
+    write_atomically(os.path.join(out_dir, MANIFEST.format(year=year)),
+                     json.dumps(manifest, indent=1, sort_keys=True))
+
+
+# Per worker process: the geometry, sent once, and the kaleido server.
+_geodata: DistrictsGeoData | None = None
+
+
+def init_worker(geojson_data: dict, start_kaleido: bool) -> None:
+    global _geodata
+    _geodata = DistrictsGeoData.from_geojson(geojson_data, GEO_EPSG)
+    if start_kaleido:
+        import kaleido  # type: ignore
+        kaleido.start_sync_server(silence_warnings=True)
+        atexit.register(kaleido.stop_sync_server, silence_warnings=True)
+
+
+def render(job: Job, plot_df: pl.DataFrame, out_dir: str, formats: list[str],
+           js_name: str, geo_name: str) -> tuple[Job, float]:
+    year, metric_code, party = job
+    assert _geodata is not None
+    start = time.perf_counter()
+    stem = os.path.join(out_dir, output_stem(*job))
+    if image_formats := [fmt for fmt in formats if fmt in IMAGE_FORMATS]:
+        fig = gmp.make_plotly_representation_of_metric(
+            plot_df, _geodata, metric_code, party, year
+        )
+        for fmt in image_formats:
+            fig.write_image(f'{stem}.{fmt}', format=fmt)
+    if 'html' in formats:
+        # The same figure, with the geometry fetched from the sidecar.
+        fig = gmp.apply_metric(
+            gmp.make_base_figure(geo_name), plot_df, metric_code, party, year
+        )
+        fig.write_html(f'{stem}.html', include_plotlyjs=js_name,
+                       full_html=True)
+    return job, time.perf_counter() - start
+
+
+def render_all(
+    years: list[int] | None, metrics: list[str], parties: list[str],
+    formats: list[str], out_dir: str, shp_path: str,
+    workers: int | None = None, force: bool = False,
+) -> dict[str, int]:
+    os.makedirs(out_dir, exist_ok=True)
+    multi_year = MultiYearHrElection(years)
+    geodata = gmp.get_districts_geodata(shp_path, GEO_EPSG)
+    js_name, geo_name = write_shared_files(out_dir, geodata.geojson_data)
+    code = code_digest()
+    manifests = {
+        year: {} if force else load_manifest(out_dir, year)
+        for year in multi_year.years
+    }
+
+    todo: dict[Job, tuple[pl.DataFrame, str]] = {}
+    skipped = 0
+    for year in multi_year.years:
+        metric_df = multi_year.get_gerrymander_metrics_for_year(year)
+        for metric_code in metrics:
+            for party in parties:
+                plot_df = gmp.get_plot_df_for_metric(
+                    metric_df, metric_code, party
+                )
+                digest = fingerprint(plot_df, metric_code, party, geo_name,
+                                     formats, code)
+                stem = output_stem(year, metric_code, party)
+                outputs_exist = all(
+                    os.path.exists(os.path.join(out_dir, f'{stem}.{fmt}'))
+                    for fmt in formats
+                )
+                if manifests[year].get(stem) == digest and outputs_exist:
+                    skipped += 1
+                else:
+                    todo[(year, metric_code, party)] = (plot_df, digest)
+
+    failed = 0
+    if todo:
+        start_kaleido = any(fmt in IMAGE_FORMATS for fmt in formats)
+        if start_kaleido and importlib.util.find_spec('kaleido') is None:
+            # Rather than every worker dying in its initializer.
+            raise ModuleNotFoundError(
+                'PNG and SVG output needs kaleido', name='kaleido'
+            )
+        nworkers = min(workers or os.cpu_count() or 1, len(todo))
+        with span('render_maps.render_all', jobs=len(todo)), \
+                ProcessPoolExecutor(
+                    # Forking after polars has started its thread pool
+                    # can deadlock the children.
+                    mp_context=multiprocessing.get_context('spawn'),
+                    max_workers=nworkers, initializer=init_worker,
+                    initargs=(geodata.geojson_data, start_kaleido),
+                ) as executor:
+            futures = {
+                executor.submit(render, job, plot_df, out_dir, formats,
+                                js_name, geo_name): job
+                for job, (plot_df, _) in todo.items()
+            }
+            for future in as_completed(futures):
+                job = futures[future]
+                stem = output_stem(*job)
+                try:
+                    _, seconds = future.result()
+                except Exception as exc:
+                    failed += 1
+                    manifests[job[0]].pop(stem, None)
+                    print(f'{stem}: {exc}', file=sys.stderr)
+                    continue
+                manifests[job[0]][stem] = todo[job][1]
+                print(f'{stem:45s} {seconds * 1000:8.0f} ms', file=sys.stderr)
+        for year in {job[0] for job in todo}:
+            save_manifest(out_dir, year, manifests[year])
+    return {'rendered': len(todo) - failed, 'skipped': skipped,
+            'failed': failed}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--years', type=int, nargs='+',
+                        help='default: every year with election data')
+    parser.add_argument('--metrics', nargs='+', choices=METRICS,
+                        default=METRICS)
+    parser.add_argument('--parties', nargs='+', choices=major_parties,
+                        default=list(major_parties))
+    parser.add_argument('--formats', nargs='+',
+                        choices=['html', *IMAGE_FORMATS], default=['html'])
+    parser.add_argument('--out', default=DEFAULT_OUT_DIR)
+    parser.add_argument('--shp', default=DEFAULT_SHP_PATH)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--force', action='store_true',
+                        help='render even unchanged maps')
+    args = parser.parse_args()
+
+    counts = render_all(args.years, args.metrics, args.parties, args.formats,
+                        args.out, args.shp, args.workers, args.force)
+    print(f'rendered {counts["rendered"]}, skipped {counts["skipped"]} '
+          f'unchanged, {counts["failed"]} failed', file=sys.stderr)
+    if counts['failed']:
+        sys.exit(1)
@@ -1,6 +1,13 @@
+import os
 import re
 import sys
-from typing import Tuple
+import time
+from collections.abc import Iterable, Iterator
+from typing import IO, NamedTuple, Tuple
+
+import polars as pl
+
+from hrelectviz.tracing import span
 
 state_territories = [
     'ALABAMA',
@@ -62,6 +69,20 @@ state_territories = [
 ]
 
 
+state_territory_set = frozenset(state_territories)
+
+startmarker = re.compile(
+    'FOR UNITED STATES REPRESENTATIVE|FOR DELEGATE|FOR RESIDENT COMMISSIONER'
+)
+endmarker = 'Recapitulation'
+skipped_line = re.compile(
+    r'Continued|^\d+$|^Total|Continuing Ballots|Exhausted Ballots'
+)
+district_head = re.compile(
+    r'(AT LARGE|DELEGATE|RESIDENT COMMISSIONER)|(\d+)\. (.*)'
+)
+
+
 def get_text(fname: str) -> list[str]:
     with open(fname) as fh:
         text = fh.read()
@@ -69,12 +90,132 @@ def get_text(fname: str) -> list[str]:
     return lines
 
 
+def iter_lines(fname: str) -> Iterator[str]:
+    with open(fname) as fh:
+        for line in fh:
+            yield line.rstrip('\n')
+
+
+# The streaming parser is a chain of generators, each a small state
+# machine over the output of the previous one:
+#   lines -> (state, result line) -> (state, district, record)
+#         -> CandidateRecord
+# so a results document of any size is parsed in constant memory.
+# Records are yielded in document order, and a state (or district) whose
+# section appears twice yields the records of both. The legacy
+# extract_state_results / split_state_results path instead ordered
+# states as in state_territories and kept only the last section of each.
+# The two agree on the Clerk's documents, which list every state once,
+# alphabetically.
+
+
+def iter_state_result_lines(
+    lines: Iterable[str],
+) -> Iterator[tuple[str, str]]:
+    state_terr: str | None = None
+    collecting = False
+    for line in lines:
+        if collecting:
+            if line.startswith(endmarker):
+                state_terr, collecting = None, False
+            elif not skipped_line.search(line):
+                yield state_terr, line  # type: ignore[misc]
+        elif state_terr is not None:
+            if startmarker.match(line.strip()):
+                collecting = True
+                if line.startswith(('FOR RESIDENT COMMISSIONER',
+                                    'FOR DELEGATE')):
+                    yield state_terr, line.replace('FOR ', '')
+        elif line.strip() in state_territory_set:
+            state_terr = line.strip()
+
+
+def iter_district_records(
+    state_lines: Iterable[tuple[str, str]],
+) -> Iterator[tuple[str, str, str]]:
+    current_state, district = '', ''
+    for state_terr, line in state_lines:
+        if state_terr != current_state:
+            current_state, district = state_terr, ''
+        if matchobj := district_head.match(line):
+            if matchobj.group(1):
+                district = matchobj.group(1)
+                continue
+            district, line = matchobj.group(2), matchobj.group(3).strip()
+        yield state_terr, district, line
+
+
+class CandidateRecord(NamedTuple):
+    StateTerritory: str
+    District: str
+    Name: str
+    Party: str
+    Vote: int
+
+
+def iter_candidate_records(lines: Iterable[str]) -> Iterator[CandidateRecord]:
+    for state_terr, district, record in iter_district_records(
+        iter_state_result_lines(lines)
+    ):
+        yield CandidateRecord(
+            state_terr, district, *parse_district_record(record)
+        )
+
+
+record_schema = {
+    'StateTerritory': pl.String,
+    'District': pl.String,
+    'Name': pl.String,
+    'Party': pl.String,
+    'Vote': pl.Int64,
+}
+
+
+def write_records(
+    records: Iterable[CandidateRecord], dest: str | IO[str],
+    fmt: str = 'csv', batch_size: int = 100_000,
+) -> int:
+    # Records are gathered into columns and flushed every batch_size
+    # records: appended to one CSV file (dest may be an open text file
+    # such as sys.stdout), or as numbered part files in the Parquet
+    # directory dest.
+    columns: list[list] = [[] for _ in record_schema]
+    nrecords, nbatches = 0, 0
+    fh = open(dest, 'w') if fmt == 'csv' and isinstance(dest, str) else dest
+    if fmt == 'parquet':
+        os.makedirs(dest, exist_ok=True)  # type: ignore[arg-type]
+
+    def flush() -> None:
+        nonlocal nbatches
+        batch = pl.DataFrame(columns, schema=record_schema, orient='col')
+        if fmt == 'csv':
+            batch.write_csv(fh, include_header=nbatches == 0)  # type: ignore
+        else:
+            batch.write_parquet(
+                os.path.join(dest, f'part-{nbatches:05d}.parquet'),  # type: ignore
+                compression='zstd',
+            )
+        nbatches += 1
+        for column in columns:
+            column.clear()
+
+    try:
+        for record in records:
+            for column, value in zip(columns, record):
+                column.append(value)
+            nrecords += 1
+            if nrecords % batch_size == 0:
+                flush()
+        if columns[0] or nbatches == 0:
+            flush()
+    finally:
+        if fh is not dest:
+            fh.close()  # type: ignore[union-attr]
+    return nrecords
+
+
 def extract_state_results(lines: list[str]) -> dict[str, list[str]]:
     lineno = 0
-    startmarker = re.compile(
-        'FOR UNITED STATES REPRESENTATIVE|FOR DELEGATE|FOR RESIDENT COMMISSIONER'
-    )
-    endmarker = 'Recapitulation'
     all_results: dict[str, list[str]] = {}
     while lineno < len(lines):
         state_terr = lines[lineno].strip()
@@ -86,7 +227,7 @@ def extract_state_results(lines: list[str]) -> dict[str, list[str]]:
         else:
             state_terr_results = []
 
-            while not re.match(startmarker, lines[lineno].strip()):
+            while not startmarker.match(lines[lineno].strip()):
                 lineno += 1
 
             if lines[lineno].startswith('FOR RESIDENT COMMISSIONER'):
@@ -97,11 +238,7 @@ def extract_state_results(lines: list[str]) -> dict[str, list[str]]:
             while lineno < len(lines) and not lines[lineno].startswith(
                 endmarker
             ):
-                if re.search(
-                    r'Continued|^\d+$|^Total|Continuing Ballots|'
-                    'Exhausted Ballots',
-                    lines[lineno],
-                ):
+                if skipped_line.search(lines[lineno]):
                     lineno += 1
                     continue
                 state_terr_results.append(lines[lineno])
@@ -116,18 +253,15 @@ def split_state_results(results: list[str]) -> dict[str, list[str]]:
     by_district: dict[str, list[str]] = {}
     while lno < len(results):
         line = results[lno]
-        if matchobj := re.match(
-            'AT LARGE|DELEGATE|RESIDENT COMMISSIONER', line
-        ):
+        if matchobj := district_head.match(line):
             if candstrings:
                 by_district[district] = candstrings
-            candstrings = []
-            district = matchobj.group(0)
-        elif matchobj := re.match(r'(\d+)\. (.*)', line):
-            if candstrings:
-                by_district[district] = candstrings
-            district = matchobj.group(1)
-            candstrings = [matchobj.group(2).strip()]
+            if matchobj.group(1):
+                district = matchobj.group(1)
+                candstrings = []
+            else:
+                district = matchobj.group(2)
+                candstrings = [matchobj.group(3).strip()]
         else:
             candstrings.append(line)
         lno += 1
@@ -145,30 +279,39 @@ districtparser2 = re.compile(
 )
 
 
+name_suffix = re.compile(', ?(Jr|Sr)')
+votecount_junk = str.maketrans('', '', ',()')
+
+
 def parse_district_record(record: str) -> Tuple[str, str, int]:
-    record = re.sub(', ?(Jr|Sr)', r' \1', record)
+    record = name_suffix.sub(r' \1', record)
     name, party, votecountstr = '', '', ''
-    matchobj = re.match(districtparser1, record)
+    matchobj = districtparser1.match(record)
     if matchobj:
         name, party, votecountstr = matchobj.groups()
     else:
-        matchobj = re.match(districtparser2, record)
+        matchobj = districtparser2.match(record)
         if matchobj:
             name, party, votecountstr = 'None', 'None', matchobj.group(2)
         else:
             print(f'Cannot parse record {record}', file=sys.stderr)
             exit(1)
     party = party.replace(',', ' ').strip()
-    votecount = int(re.sub('[,()]', '', votecountstr))
+    votecount = int(votecountstr.translate(votecount_junk))
     return name, party, votecount
 
 
 if __name__ == '__main__':
-    results = extract_state_results(get_text('statistics2024.txt'))
-    print('StateTerritory,District,Name,Party,Vote')
-    for stateterr in state_territories:
-        by_district = split_state_results(results[stateterr])
-        for district, res in by_district.items():
-            for record in res:
-                name, party, votecount = parse_district_record(record)
-                print(f'{stateterr},{district},{name},{party},{votecount}')
+    # usage: scrape.py [statistics.txt [out.csv | out-parquet-dir]]
+    txt_fname = sys.argv[1] if len(sys.argv) > 1 else 'statistics2024.txt'
+    dest = sys.argv[2] if len(sys.argv) > 2 else sys.stdout
+    fmt = 'csv' if dest is sys.stdout or dest.endswith('.csv') else 'parquet'
+    start = time.perf_counter()
+    with span('scrape.write_records', fmt=fmt) as sp:
+        nrecords = write_records(
+            iter_candidate_records(iter_lines(txt_fname)), dest, fmt
+        )
+        sp.set(rows=nrecords)
+    elapsed = time.perf_counter() - start
+    print(f'{nrecords:,} records in {elapsed:.3f} s '
+          f'({nrecords / elapsed:,.0f} records/s)', file=sys.stderr)
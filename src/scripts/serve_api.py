@@ -0,0 +1,374 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import io
+import json
+import re
+import sys
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import NamedTuple
+from urllib.parse import unquote, urlsplit
+
+import polars as pl
+
+from hrelectviz.districtsgeodata import DistrictsGeoData
+from hrelectviz.geocache import file_digest, shapefile_digest, source_digest
+from hrelectviz.gerrymeter import METRICS, GerryMeter
+from hrelectviz.hrelection import TABLES, HrElection
+from hrelectviz.resultstore import available_years, results_path
+import hrelectviz.ushelper as ush
+
+# A small HTTP API over the election tables, the gerrymandering metrics
+# and the processed geometry, e.g. from the repo root
+#   PYTHONPATH=src python -m scripts.serve_api --port 8080 \
+#       --layer states=map-data-census/tl_2024_us_state.shp
+# Routes:
+#   /years                                 election years, JSON
+#   /elections/<year>/<table>.json|.arrow  HrElection tables
+#   /metrics/<year>/<metric>.json|.arrow   GerryMeter metrics
+#   /geometry/<layer>.geojson|.topojson    DistrictsGeoData of a layer
+# JSON is a list of row objects; .arrow is an Arrow IPC file.
+#
+# A response's ETag is a digest of its inputs (the result file or the
+# shapefile contents) and of the code computing it, so a conditional GET
+# is answered 304 without computing anything. Bodies are computed once
+# per ETag on a worker thread, with concurrent requests for the same one
+# waiting on the first, and kept, gzipped once if compressible, in an
+# in-process cache bounded by CACHE_BYTES. Connections are handled by
+# asyncio, with HTTP/1.1 keep-alive.
+
+CACHE_BYTES = 256 * 1024 * 1024
+GEO_EPSG = 'epsg:4269'
+GEO_TOLERANCE = 1000.0  # meters, as for the plotly maps
+GEO_WORK_EPSG = 'epsg:3857'
+GZIP_MIN_BYTES = 1024
+# Request bodies (which no route takes) up to this size are read and
+# dropped, to keep the connection; larger ones close it.
+MAX_DISCARD_BYTES = 64 * 1024
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'arrow': 'application/vnd.apache.arrow.file',
+    'geojson': 'application/geo+json',
+    'topojson': 'application/json',
+}
+COMPRESSIBLE = {'json', 'geojson', 'topojson'}
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request',
+           404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error', 501: 'Not Implemented'}
+
+ROUTES = [
+    (re.compile(r'/years'), 'years'),
+    (re.compile(r'/elections/(\d{4})/(\w+)\.(json|arrow)'), 'election'),
+    (re.compile(r'/metrics/(\d{4})/(\w+)\.(json|arrow)'), 'metrics'),
+    (re.compile(r'/geometry/(\w+)\.(geojson|topojson)'), 'geometry'),
+]
+
+
+# Every module the responses are computed from.
+CODE_MODULES = [
+    f'hrelectviz.{module}' for module in [
+        'hrelection', 'gerrymeter', 'seatsvotes', 'bootstrap', 'tablecache',
+        'resultstore', 'ushelper', 'usdata', 'districtsgeodata',
+        'geocache', 'geosimplify', 'shpreader', 'topojson', 'geojsonio',
+    ]
+]
+
+
+def code_digest() -> str:
+    return source_digest(*CODE_MODULES)
+
+
+def make_etag(*parts: str) -> str:
+    return '"' + hashlib.sha256(
+        '\x00'.join(parts).encode()
+    ).hexdigest()[:20] + '"'
+
+
+def frame_body(df: pl.DataFrame, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == 'arrow':
+        df.write_ipc(buffer, compression='uncompressed')
+    else:
+        df.write_json(buffer)
+    return buffer.getvalue()
+
+
+class NotFound(Exception):
+    pass
+
+
+class Resource(NamedTuple):
+    etag: str
+    content_type: str
+    compressible: bool
+    compute: Callable[[], bytes]
+
+
+class Body(NamedTuple):
+    plain: bytes
+    gzipped: bytes | None
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.plain) + len(self.gzipped or b'')
+
+
+class Api:
+    def __init__(self, layers: dict[str, str], cache_bytes: int = CACHE_BYTES):
+        self.layers = layers
+        self.code = code_digest()
+        self.cache_bytes = cache_bytes
+        self.cache: OrderedDict[str, Body] = OrderedDict()
+        self.inflight: dict[str, asyncio.Future] = {}
+        # Per year, the meter of the results with the given digest.
+        self.meters: dict[int, tuple[str, GerryMeter]] = {}
+        # Per year and per layer: models are not safe to fill from two
+        # threads at once.
+        self.locks: dict[object, threading.Lock] = {}
+        self.locks_lock = threading.Lock()
+
+    def lock(self, key: object) -> threading.Lock:
+        with self.locks_lock:
+            return self.locks.setdefault(key, threading.Lock())
+
+    def results_digest(self, year: int) -> str:
+        # Of the file HrElection reads (see scan_election_results).
+        if (path := results_path(year)) is None:
+            raise NotFound(f'No results for {year}')
+        return file_digest(path)
+
+    def meter(self, year: int, digest: str) -> GerryMeter:
+        # Rebuilt when the results changed since the meter was made.
+        if year not in self.meters or self.meters[year][0] != digest:
+            self.meters[year] = (digest, GerryMeter(HrElection(year)))
+        return self.meters[year][1]
+
+    def table_body(self, year: int, digest: str, name: str,
+                   fmt: str) -> bytes:
+        with self.lock(year):
+            meter = self.meter(year, digest)
+            df = meter.dfs[name] if name in METRICS \
+                else meter.hr_elect.dfs[name]
+            return frame_body(df, fmt)
+
+    def geometry_body(self, layer: str, fmt: str) -> bytes:
+        with self.lock(layer):
+            geodata = DistrictsGeoData.load_processed(
+                self.layers[layer], GEO_EPSG, ush.lower48_abbrs,
+                GEO_TOLERANCE, work_epsg=GEO_WORK_EPSG,
+            )
+            if fmt == 'topojson':
+                return geodata.as_topojson_str().encode()
+            return geodata.as_str(places=5).encode()
+
+    def resolve(self, path: str) -> Resource:
+        for pattern, route in ROUTES:
+            if m := pattern.fullmatch(path):
+                break
+        else:
+            raise NotFound(path)
+        match route:
+            case 'years':
+                years = available_years()
+                return Resource(
+                    make_etag('years', *map(str, years)), CONTENT_TYPES['json'],
+                    False, lambda: json.dumps(years).encode(),
+                )
+            case 'election' | 'metrics':
+                year, name, fmt = int(m[1]), m[2], m[3]
+                names = TABLES if route == 'election' else METRICS
+                if name not in names:
+                    raise NotFound(f'No table {name}')
+                digest = self.results_digest(year)
+                return Resource(
+                    make_etag(path, digest, self.code),
+                    CONTENT_TYPES[fmt], fmt in COMPRESSIBLE,
+                    lambda: self.table_body(year, digest, name, fmt),
+                )
+            case _:
+                layer, fmt = m[1], m[2]
+                if layer not in self.layers:
+                    raise NotFound(f'No layer {layer}')
+                shp_path = self.layers[layer]
+                return Resource(
+                    make_etag(path, shapefile_digest(shp_path), self.code,
+                              ','.join(ush.lower48_abbrs), str(GEO_TOLERANCE),
+                              GEO_WORK_EPSG),
+                    CONTENT_TYPES[fmt], True,
+                    lambda: self.geometry_body(layer, fmt),
+                )
+
+    async def body(self, resource: Resource) -> Body:
+        key = resource.etag
+        if (body := self.cache.get(key)) is not None:
+            self.cache.move_to_end(key)
+            return body
+        if key in self.inflight:
+            return await self.inflight[key]
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            body = await asyncio.to_thread(self.make_body, resource)
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # retrieved, if nobody else waits
+            raise
+        finally:
+            del self.inflight[key]
+        future.set_result(body)
+        self.store(key, body)
+        return body
+
+    @staticmethod
+    def make_body(resource: Resource) -> Body:
+        plain = resource.compute()
+        gzipped = None
+        if resource.compressible and len(plain) >= GZIP_MIN_BYTES:
+            gzipped = gzip.compress(plain, compresslevel=6)
+        return Body(plain, gzipped)
+
+    def store(self, key: str, body: Body) -> None:
+        self.cache[key] = body
+        total = sum(cached.nbytes for cached in self.cache.values())
+        while total > self.cache_bytes and len(self.cache) > 1:
+            _, evicted = self.cache.popitem(last=False)
+            total -= evicted.nbytes
+
+    async def handle(self, method: str, target: str,
+                     headers: dict[str, str]
+                     ) -> tuple[int, dict[str, str], bytes]:
+        if method not in ('GET', 'HEAD'):
+            status, response_headers, body = error(
+                405, f'{method} not allowed'
+            )
+            return status, {**response_headers, 'Allow': 'GET, HEAD'}, body
+        path = unquote(urlsplit(target).path).rstrip('/') or '/'
+        try:
+            resource = self.resolve(path)
+            response_headers = {
+                'ETag': resource.etag, 'Cache-Control': 'no-cache',
+                'Vary': 'Accept-Encoding',
+            }
+            if resource.etag in {
+                tag.strip()
+                for tag in headers.get('if-none-match', '').split(',')
+            }:
+                return 304, response_headers, b''
+            body = await self.body(resource)
+        except NotFound as exc:
+            return error(404, str(exc))
+        except Exception as exc:
+            print(f'{target}: {exc!r}', file=sys.stderr)
+            return error(500, 'Internal error')
+        response_headers['Content-Type'] = resource.content_type
+        if body.gzipped is not None and 'gzip' in headers.get(
+            'accept-encoding', ''
+        ):
+            response_headers['Content-Encoding'] = 'gzip'
+            return 200, response_headers, body.gzipped
+        return 200, response_headers, body.plain
+
+    async def serve_connection(self, reader: asyncio.StreamReader,
+                               writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = \
+                        request_line.decode('latin-1').split()
+                except ValueError:
+                    status, headers, body = error(400, 'Bad request line')
+                    await respond(writer, status, headers, body, False)
+                    break
+                headers: dict[str, str] = {}
+                while (line := await reader.readline()) not in (b'\r\n',
+                                                                b'\n', b''):
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = (
+                    headers.get('connection', '').lower() != 'close'
+                    if version == 'HTTP/1.1'
+                    else headers.get('connection', '').lower() == 'keep-alive'
+                )
+                # A request body must be consumed, or it would be read as
+                # the next request; one that cannot be is refused, and the
+                # connection closed.
+                length = headers.get('content-length', '0')
+                if 'transfer-encoding' in headers:
+                    status, response_headers, body = error(
+                        501, 'Transfer-Encoding not supported'
+                    )
+                    keep_alive = False
+                elif not length.isdigit():
+                    status, response_headers, body = error(
+                        400, 'Bad Content-Length'
+                    )
+                    keep_alive = False
+                else:
+                    if int(length) > MAX_DISCARD_BYTES:
+                        keep_alive = False
+                    elif int(length):
+                        await reader.readexactly(int(length))
+                    status, response_headers, body = await self.handle(
+                        method, target, headers
+                    )
+                await respond(writer, status, response_headers,
+                              b'' if method == 'HEAD' else body, keep_alive,
+                              len(body))
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def error(status: int, message: str) -> tuple[int, dict[str, str], bytes]:
+    return (status, {'Content-Type': CONTENT_TYPES['json']},
+            json.dumps({'error': message}).encode())
+
+
+async def respond(writer: asyncio.StreamWriter, status: int,
+                  headers: dict[str, str], body: bytes, keep_alive: bool,
+                  length: int | None = None) -> None:
+    lines = [f'HTTP/1.1 {status} {REASONS[status]}']
+    headers = {
+        **headers,
+        'Content-Length': str(len(body) if length is None else length),
+        'Connection': 'keep-alive' if keep_alive else 'close',
+    }
+    lines += [f'{name}: {value}' for name, value in headers.items()]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+
+
+async def serve(api: Api, host: str, port: int) -> None:
+    server = await asyncio.start_server(api.serve_connection, host, port)
+    print(f'serving on http://{host}:{port}', file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--layer', action='append', default=[],
+                        metavar='NAME=SHP',
+                        help='a geometry layer and its shapefile')
+    parser.add_argument('--cache-mb', type=int,
+                        default=CACHE_BYTES // (1024 * 1024))
+    args = parser.parse_args()
+
+    layers = dict(layer.split('=', 1) for layer in args.layer)
+    api = Api(layers, args.cache_mb * 1024 * 1024)
+    try:
+        asyncio.run(serve(api, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
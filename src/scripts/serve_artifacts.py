@@ -0,0 +1,77 @@
+import email.utils
+import hashlib
+import os
+import sys
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+# A local stand-in for the House Clerk and Census TIGER servers: serves a
+# directory laid out like their URLs, with ETag / Last-Modified validators,
+# conditional GETs and single-range requests, so that
+# hrelectviz.datasources.DownloadManager can be exercised offline, e.g.
+#   serve_artifacts.py ./mirror-root 8000
+# and DownloadManager().fetch_all(artifacts_for_year(
+#     '2024', './data', 'http://localhost:8000/clerk',
+#     'http://localhost:8000/tiger'))
+
+
+class ArtifactHandler(SimpleHTTPRequestHandler):
+    def do_GET(self) -> None:
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        st = os.stat(path)
+        etag = '"' + hashlib.sha256(
+            f'{st.st_size}-{st.st_mtime_ns}'.encode()
+        ).hexdigest()[:16] + '"'
+        last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        start, end = 0, st.st_size - 1
+        range_header = self.headers.get('Range', '')
+        if_range = self.headers.get('If-Range')
+        partial = range_header.startswith('bytes=') and if_range in (
+            None, etag
+        )
+        if partial:
+            first, _, last = range_header[6:].partition('-')
+            start = int(first)
+            end = int(last) if last else end
+            if start >= st.st_size:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{st.st_size}')
+                self.end_headers()
+                return
+
+        self.send_response(206 if partial else 200)
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', last_modified)
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(end - start + 1))
+        if partial:
+            self.send_header('Content-Range',
+                             f'bytes {start}-{end}/{st.st_size}')
+        self.end_headers()
+        with open(path, 'rb') as fh:
+            fh.seek(start)
+            remaining = end - start + 1
+            while remaining and (chunk := fh.read(min(remaining, 1 << 16))):
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+
+def serve(root: str, port: int = 8000) -> ThreadingHTTPServer:
+    def handler(*args, **kwargs):
+        return ArtifactHandler(*args, directory=root, **kwargs)
+    return ThreadingHTTPServer(('127.0.0.1', port), handler)
+
+
+if __name__ == '__main__':
+    root = sys.argv[1] if len(sys.argv) > 1 else '.'
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8000
+    serve(root, port).serve_forever()
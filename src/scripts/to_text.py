@@ -1,18 +1,149 @@
+import hashlib
+import multiprocessing
+import os
 import re
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 
 import pdfplumber
+from pdfminer.pdftypes import PDFObjRef, PDFStream, resolve1
+from pdfminer.psparser import PSLiteral
+from pdfplumber.page import Page
 
+from hrelectviz.geocache import DEFAULT_CACHE_DIR
+from hrelectviz.tracing import traced
 
-def convert_to_text(fname: str) -> None:
+PAGE_CACHE_DIR = os.path.join(DEFAULT_CACHE_DIR, 'pdftext')
+PAGES_PER_SHARD = 8
+
+
+def object_digest(obj, memo: dict[int, bytes],
+                  active: frozenset[int] = frozenset()) -> bytes:
+    # Digest of a PDF object with the objects it references, resolved:
+    # dictionaries, arrays and streams (their decoded data), but not
+    # object numbers, which change when a PDF is revised. Digests of
+    # indirect objects are memoized by object number in memo, which is
+    # thus only valid for one document; a reference back to an object
+    # being hashed (e.g. a form XObject naming itself) is hashed as such.
+    if isinstance(obj, PDFObjRef):
+        if obj.objid in active:
+            return b'cycle'
+        if obj.objid not in memo:
+            memo[obj.objid] = object_digest(
+                obj.resolve(), memo, active | {obj.objid}
+            )
+        return memo[obj.objid]
+    hasher = hashlib.sha256()
+    if isinstance(obj, PDFStream):
+        hasher.update(b'stream')
+        hasher.update(object_digest(obj.attrs, memo, active))
+        hasher.update(obj.get_data())
+    elif isinstance(obj, dict):
+        hasher.update(b'dict')
+        for key in sorted(obj):
+            if key != 'Parent':  # the page tree, not the object's content
+                hasher.update(repr(key).encode())
+                hasher.update(object_digest(obj[key], memo, active))
+    elif isinstance(obj, list):
+        hasher.update(b'list')
+        for item in obj:
+            hasher.update(object_digest(item, memo, active))
+    elif isinstance(obj, PSLiteral):
+        hasher.update(b'name' + repr(obj.name).encode())
+    else:
+        hasher.update(repr(obj).encode())
+    return hasher.digest()
+
+
+def page_digest(page: Page, memo: dict[int, bytes] | None = None) -> str:
+    # Hash of what is drawn on the page: its geometry, content streams
+    # and resources (fonts with their embedded programs and ToUnicode
+    # maps, form XObjects, images, ...). A revised Clerk PDF with
+    # unchanged pages yields the same digests for those pages.
+    memo = {} if memo is None else memo
+    hasher = hashlib.sha256()
+    hasher.update(repr((page.bbox, page.rotation)).encode())
+    for stream in page.page_obj.contents:
+        hasher.update(resolve1(stream).get_data())
+    hasher.update(object_digest(page.page_obj.resources, memo))
+    return hasher.hexdigest()
+
+
+def read_cached_text(cache_dir: str, digest: str) -> str | None:
+    try:
+        with open(os.path.join(cache_dir, f'{digest}.txt')) as fh:
+            return fh.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_cached_text(cache_dir: str, digest: str, text: str) -> None:
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    with os.fdopen(fd, 'w') as fh:
+        fh.write(text)
+    os.replace(tmp_path, os.path.join(cache_dir, f'{digest}.txt'))
+
+
+def extract_shard(
+    fname: str, first: int, last: int, cache_dir: str | None
+) -> list[str]:
+    # Text of pages first..last-1 (0-based), each released after use.
     ptext: list[str] = []
-    with pdfplumber.open(fname) as pdf:
+    memo: dict[int, bytes] = {}  # resources shared by the pages
+    with pdfplumber.open(fname, pages=range(first + 1, last + 1)) as pdf:
         for page in pdf.pages:
-            ptext.append(page.extract_text())
-    text = '\n'.join(ptext)
+            text = None
+            if cache_dir:
+                digest = page_digest(page, memo)
+                text = read_cached_text(cache_dir, digest)
+            if text is None:
+                text = page.extract_text()
+                if cache_dir:
+                    write_cached_text(cache_dir, digest, text)
+            ptext.append(text)
+            page.close()
+    return ptext
+
+
+@traced('to_text.convert_to_text')
+def convert_to_text(
+    fname: str, workers: int | None = None,
+    pages_per_shard: int = PAGES_PER_SHARD,
+    cache_dir: str | None = PAGE_CACHE_DIR,
+) -> None:
+    with pdfplumber.open(fname) as pdf:
+        npages = len(pdf.pages)
+    shards = [
+        (first, min(first + pages_per_shard, npages))
+        for first in range(0, npages, pages_per_shard)
+    ]
     txt_fname = re.sub('.pdf$', '.txt', fname)
-    with open(txt_fname, 'w') as wfh:
-        wfh.write(text)
+    if not shards:
+        open(txt_fname, 'w').close()
+        return
+    # Executor.map yields shards in page order as soon as each one (and
+    # all before it) is done, so text is streamed to the output file
+    # without holding the whole document in memory.
+    with (
+        ProcessPoolExecutor(
+            # The pipeline converts on one thread while others may be
+            # running polars; forking then can deadlock the children.
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+        ) as executor,
+        open(txt_fname, 'w') as wfh,
+    ):
+        ptexts = executor.map(
+            extract_shard,
+            *zip(*[(fname, first, last, cache_dir)
+                   for first, last in shards]),
+        )
+        for shardno, ptext in enumerate(ptexts):
+            if shardno > 0:
+                wfh.write('\n')
+            wfh.write('\n'.join(ptext))
 
 
 if __name__ == '__main__':